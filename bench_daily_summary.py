@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for /api/nutrition/daily-summary.
+
+Compares the old implementation (load every entry as an ORM object, sum the
+macros in Python, then re-scan the list once per meal type) against
+build_daily_summary() at 10, 100 and 1000 entries for one day.
+
+    python bench_daily_summary.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['RESPONSE_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'response_cache.db')
+os.environ['PROFILE_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'profile_cache.db')
+
+from diet_planner.app import (MEAL_TYPES, NutritionEntry, User, app, build_daily_summary, db,
+                              rollup_entry)
+
+DAY = date(2026, 3, 1)
+
+
+def legacy_daily_summary(user_id, day):
+    entries = NutritionEntry.query.filter_by(user_id=user_id, date=day).all()
+    total_calories = sum(entry.calories for entry in entries)
+    total_protein = sum(entry.protein for entry in entries)
+    total_carbs = sum(entry.carbs for entry in entries)
+    total_fat = sum(entry.fat for entry in entries)
+    meals = {}
+    for meal_type in MEAL_TYPES:
+        meal_entries = [entry.to_dict() for entry in entries if entry.meal_type == meal_type]
+        meals[meal_type] = {
+            'entries': meal_entries,
+            'total_calories': sum(entry['calories'] for entry in meal_entries),
+            'total_protein': sum(entry['protein'] for entry in meal_entries),
+            'total_carbs': sum(entry['carbs'] for entry in meal_entries),
+            'total_fat': sum(entry['fat'] for entry in meal_entries)
+        }
+    return {'date': day.isoformat(), 'summary': {
+        'total_calories': total_calories, 'total_protein': total_protein,
+        'total_carbs': total_carbs, 'total_fat': total_fat
+    }, 'meals': meals}
+
+
+def seed_user(entry_count):
+    user = User(email=f'bench{entry_count}@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.flush()
+    for i in range(entry_count):
+        entry = NutritionEntry(user_id=user.id, food_name=f'Food {i}', quantity=1, unit='plate',
+                               meal_type=MEAL_TYPES[i % 4], calories=100 + i % 50, protein=5.5,
+                               carbs=12.0, fat=3.25, date=DAY)
+        db.session.add(entry)
+        rollup_entry(entry)
+    db.session.commit()
+    return user.id
+
+
+def fresh_session(summary, user_id):
+    # Each request gets a new session, so the identity map starts empty
+    result = summary(user_id, DAY)
+    db.session.remove()
+    return result
+
+
+def main():
+    with app.app_context():
+        print(f"{'entries':>8} {'legacy ms':>10} {'sql ms':>10} {'speedup':>8}")
+        for entry_count in (10, 100, 1000):
+            user_id = seed_user(entry_count)
+            assert legacy_daily_summary(user_id, DAY) == build_daily_summary(user_id, DAY)
+            runs = max(5, 2000 // entry_count)
+            legacy = min(timeit.repeat(lambda: fresh_session(legacy_daily_summary, user_id), number=runs, repeat=3)) / runs
+            fast = min(timeit.repeat(lambda: fresh_session(build_daily_summary, user_id), number=runs, repeat=3)) / runs
+            print(f"{entry_count:>8} {legacy * 1000:>10.2f} {fast * 1000:>10.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
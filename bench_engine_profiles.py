@@ -0,0 +1,111 @@
+"""
+Request latency under the serverless and server DB_RUNTIME_PROFILEs.
+
+Each profile runs in its own process (the engine is built at import time)
+against a local Postgres, and times /api/nutrition/daily-summary through the
+Flask test client from a few concurrent threads. The serverless profile opens
+a connection per request, the server profile reuses its warm pool.
+
+    BENCH_DATABASE_URL=postgresql://postgres@localhost:5432/postgres python bench_engine_profiles.py
+
+Skips when no Postgres is reachable at BENCH_DATABASE_URL.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', 'postgresql://postgres@localhost:5432/postgres')
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 400))
+THREADS = int(os.environ.get('BENCH_THREADS', 4))
+DAY = date(2026, 3, 1)
+
+
+def postgres_available():
+    try:
+        import psycopg2
+        psycopg2.connect(DATABASE_URL, connect_timeout=2).close()
+        return True
+    except Exception as e:
+        print(f"Skipping: no Postgres at {DATABASE_URL} ({str(e).strip()})")
+        return False
+
+
+def run_profile(profile):
+    """Child process: seed one user and time daily-summary requests."""
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    from diet_planner.app import MEAL_TYPES, NutritionEntry, User, app, db, rollup_entry
+
+    with app.app_context():
+        user = User(email=f'bench-{uuid.uuid4().hex[:12]}@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(40):
+            entry = NutritionEntry(user_id=user.id, food_name=f'Food {i}', quantity=1, unit='plate',
+                                   meal_type=MEAL_TYPES[i % 4], calories=100 + i, protein=5.5,
+                                   carbs=12.0, fat=3.25, date=DAY)
+            db.session.add(entry)
+            rollup_entry(entry)
+        db.session.commit()
+        user_id = user.id
+
+    latencies = []
+    lock = threading.Lock()
+    url = f'/api/nutrition/daily-summary?date={DAY.isoformat()}'
+
+    def worker(count):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            assert response.status_code == 200, response.get_data(as_text=True)
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(REQUESTS // THREADS,)) for _ in range(THREADS)]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+
+    with app.app_context():
+        NutritionEntry.query.filter_by(user_id=user_id).delete()
+        db.session.execute(db.text('DELETE FROM daily_nutrition_summary WHERE user_id = :user_id'), {'user_id': user_id})
+        User.query.filter_by(id=user_id).delete()
+        db.session.commit()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{profile:>10}: {len(latencies)} requests, {THREADS} threads, "
+          f"mean {statistics.mean(latencies):.2f} ms, p50 {statistics.median(latencies):.2f} ms, "
+          f"p95 {p95:.2f} ms, {len(latencies) / wall:.0f} req/s")
+
+
+def main():
+    if not postgres_available():
+        return
+    env = dict(os.environ, DATABASE_URL=DATABASE_URL, GEMINI_API_KEY='',
+               RESPONSE_CACHE_PATH=os.path.join(tempfile.mkdtemp(), 'response_cache.db'),
+               PROFILE_CACHE_PATH=os.path.join(tempfile.mkdtemp(), 'profile_cache.db'))
+    for profile in ('serverless', 'server'):
+        subprocess.run([sys.executable, __file__, '--profile', profile],
+                       env=dict(env, DB_RUNTIME_PROFILE=profile), check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--profile':
+        run_profile(sys.argv[2])
+    else:
+        main()
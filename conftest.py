@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+# Keep the test run hermetic: local SQLite instead of the hosted Postgres,
+# no Gemini key, throwaway caches and job queue, and no background job threads.
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['GEMINI_API_KEY'] = ''
+TEST_DIR = tempfile.mkdtemp(prefix='diet-planner-tests-')
+os.environ['RESPONSE_CACHE_PATH'] = os.path.join(TEST_DIR, 'response_cache.db')
+os.environ['PROFILE_CACHE_PATH'] = os.path.join(TEST_DIR, 'profile_cache.db')
+os.environ['FOOD_STORE_PATH'] = os.path.join(TEST_DIR, 'foods')
+os.environ['IMAGE_CACHE_DIR'] = os.path.join(TEST_DIR, 'image_cache')
+os.environ['JOB_QUEUE_PATH'] = os.path.join(TEST_DIR, 'jobs.db')
+os.environ['JOB_WORKERS'] = '0'
+
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+@pytest.fixture
+def user_client():
+    """A test client logged in as a fresh user; yields (client, user_id)."""
+    from diet_planner.app import User, app, db
+
+    with app.app_context():
+        user = User(email=f'{uuid.uuid4().hex[:12]}@example.com', daily_calories=2000)
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client, user_id
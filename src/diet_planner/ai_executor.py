@@ -0,0 +1,122 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+
+class AIExecutorBusy(Exception):
+    """Raised when the AI pool already has as many calls in flight as it allows."""
+
+
+class AIExecutor:
+    """
+    One bounded thread pool for every Gemini call in the process.
+
+    ``max_workers`` calls run at once and at most ``max_queue`` more may wait;
+    anything beyond that is rejected immediately with AIExecutorBusy instead
+    of piling up request threads. Every call carries a deadline: queued calls
+    whose deadline has passed are dropped before they start, and the deadline
+    is also handed to the Gemini client so a hung request releases its thread.
+    """
+
+    def __init__(self, max_workers=8, max_queue=16, default_timeout=30):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-call')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise AIExecutorBusy('Too many AI requests in progress, please try again shortly.')
+        with self._lock:
+            self._in_flight += 1
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        """Schedule ``fn`` and return its future, or raise AIExecutorBusy when full."""
+        self._acquire()
+        deadline = time.monotonic() + (timeout or self.default_timeout)
+
+        def call():
+            if time.monotonic() >= deadline:
+                raise concurrent.futures.TimeoutError('AI call expired while queued')
+            return fn(*args, **kwargs)
+
+        try:
+            future = self._pool.submit(call)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def reserve(self):
+        """
+        Hold one slot for a call made outside the pool, such as a streamed
+        response read on the request thread, or raise AIExecutorBusy when full.
+        Returns the function that frees it; calls after the first do nothing.
+        """
+        self._acquire()
+        held = [True]
+
+        def release():
+            with self._lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            self._release(None)
+        return release
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run ``fn`` on the pool and wait at most ``timeout`` seconds for it.
+
+        On timeout the call is cancelled if it has not started yet and
+        concurrent.futures.TimeoutError is raised; the caller is never
+        blocked waiting for a stuck thread.
+        """
+        timeout = timeout or self.default_timeout
+        future = self.submit(fn, *args, timeout=timeout, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise
+
+    def generate(self, model, prompt, timeout=None, **kwargs):
+        """Call ``model.generate_content`` on the pool with a real per-call deadline."""
+        timeout = timeout or self.default_timeout
+        request_options = dict(kwargs.pop('request_options', None) or {})
+        request_options.setdefault('timeout', timeout)
+        return self.run(model.generate_content, prompt, timeout=timeout, request_options=request_options, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out
+            }
+
+
+def create_executor():
+    return AIExecutor(
+        max_workers=int(os.environ.get('AI_EXECUTOR_MAX_WORKERS', 8)),
+        max_queue=int(os.environ.get('AI_EXECUTOR_MAX_QUEUE', 16)),
+        default_timeout=float(os.environ.get('AI_CALL_TIMEOUT', 30))
+    )
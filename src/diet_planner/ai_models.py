@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import google.generativeai as genai
+
+
+# Models are tried in this order; the first one that answers a probe wins
+GEMINI_MODEL_CANDIDATES = ['gemini-2.5-flash', 'gemini-2.5-pro', 'gemini-flash-latest']
+
+
+class ModelRegistry:
+    """
+    Resolves the Gemini model off the import path.
+
+    Importing the app used to list models and fire up to three test prompts
+    before the module finished loading. The registry does the same probing
+    in a daemon thread instead, so routes can serve their fallbacks while
+    the model warms up.
+    """
+
+    def __init__(self, api_key=None, candidates=None, mode='background'):
+        self.api_key = api_key
+        self.candidates = list(candidates or GEMINI_MODEL_CANDIDATES)
+        self.mode = mode
+        self.state = 'disabled' if not api_key else 'pending'
+        self.model = None
+        self.model_name = None
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        if not api_key:
+            self._ready.set()
+
+    def start(self):
+        """Start resolving the model in the background (idempotent)."""
+        with self._lock:
+            if self.state != 'pending':
+                return
+            self.state = 'warming'
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._resolve, name='gemini-warmup', daemon=True)
+            self._thread.start()
+
+    def _resolve(self):
+        try:
+            genai.configure(api_key=self.api_key)
+
+            try:
+                available_models = [
+                    m.name for m in genai.list_models()
+                    if 'generateContent' in m.supported_generation_methods
+                ]
+                print(f"Available models: {available_models}")
+            except Exception as e:
+                print(f"Error listing models: {e}")
+
+            errors = []
+            for name in self.candidates:
+                try:
+                    candidate = genai.GenerativeModel(name)
+                    candidate.generate_content("Hello")
+                    self.model = candidate
+                    self.model_name = name
+                    self.state = 'ready'
+                    print(f"Gemini model ({name}) configured successfully")
+                    return
+                except Exception as model_error:
+                    print(f"Error with {name}: {model_error}")
+                    errors.append(f"{name}: {model_error}")
+
+            self.error = '; '.join(errors)
+            self.state = 'failed'
+            print("Setting model to None - AI features will not be available")
+        except Exception as e:
+            print(f"Error configuring Gemini API: {e}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.ready_at = time.time()
+            self._ready.set()
+
+    def get_model(self, wait=0):
+        """
+        Return the resolved model, or None while it is still warming up.
+
+        Callers keep their existing ``model is None`` fallbacks. Pass
+        ``wait`` (seconds) to block briefly for a warm-up that is in flight.
+        """
+        if self.state == 'pending':
+            self.start()
+        if wait and not self._ready.is_set():
+            self._ready.wait(wait)
+        return self.model if self.state == 'ready' else None
+
+    def is_ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        return {
+            'state': self.state,
+            'model': self.model_name,
+            'error': self.error,
+            'warmup_seconds': round(self.ready_at - self.started_at, 3) if self.ready_at and self.started_at else None
+        }
+
+
+def create_registry():
+    """Build the registry from the environment and kick off warm-up if configured."""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    mode = os.environ.get("GEMINI_WARMUP", "background").lower()
+    if not api_key:
+        print("Warning: GEMINI_API_KEY environment variable not found!")
+    registry = ModelRegistry(api_key=api_key, mode=mode)
+    # 'lazy' defers all network calls until the first request asks for the model
+    if api_key and mode == 'background':
+        registry.start()
+    return registry
@@ -1,21 +1,40 @@
-from flask import Flask, request, jsonify, render_template_string, send_from_directory, send_file, session
+from flask import Flask, request, jsonify, render_template_string, send_from_directory, session
+from flask import Response, g, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
-from functools import wraps
+from functools import lru_cache, wraps
+import hashlib
+import time
+import uuid
 from flask import redirect, url_for
 from sqlalchemy.engine import Engine
-from sqlalchemy import event
-import http
+from sqlalchemy import event, text
+import urllib.parse
 from flask import has_request_context
 
+from .ai_models import create_registry
+from .food_index import FoodIndex, normalize as normalize_food_query
+from .food_store import build_food_store, open_food_store
+from .http_pool import HTTPPool
+from .jobs import FINISHED, QUEUED, JobQueue, JobWorkerPool
+from .nutrition_calc import create_calculator
+from .image_variants import ImageVariants
+from .page_cache import Page, PageCache, page_manifest
+from .db_config import engine_options, runtime_profile, tenant_scoping_enabled
+from .ai_executor import AIExecutorBusy, create_executor
+from .response_cache import ResponseCache
+from .migrations import rebuild_daily_nutrition_summary, run_migrations
+from sqlalchemy.dialects import postgresql as postgresql_dialect, sqlite as sqlite_dialect
+from .nutrition_trends import TREND_BUCKETS, nutrition_trends
+from .meal_plans import DAY_CONCURRENCY, DAYS, describe_preferences, generate_plan_by_day, plan_bucket, scale_plan
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -37,26 +56,29 @@ if DATABASE_URL.startswith("postgres://"):
 
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# Initialize SQLAlchemy without engine options initially to avoid hstore detection
+# Pooling and timeouts depend on how the app is deployed (Vercel function vs
+# gunicorn workers), see RUNTIME_PROFILES in db_config.py
+app.config['DB_RUNTIME_PROFILE'] = runtime_profile()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DATABASE_URL, app.config['DB_RUNTIME_PROFILE'])
+app.config['TENANT_SCOPING'] = os.environ.get('TENANT_SCOPING', 'auto')
 db = SQLAlchemy(app)
 # AUTOMATIC TENANT ISOLATION — Every query is scoped to current user
-@event.listens_for(Engine, "connect")
-def set_nile_tenant(dbapi_connection, connection_record):
-    # Only set tenant if there's an active request context
-    # and avoid setting during initial connection setup/extension loading
-    
-    try:
-        # Check if we're in a request context first
-        if has_request_context():
-            user_id = session.get('user_id')
-            if user_id:
-                # Create a new cursor to set the tenant variable
-                cursor = dbapi_connection.cursor()
-                cursor.execute(f"SET nile.tenant_id = '{user_id}'")
-                cursor.close()
-    except:
-        # If session access fails during initialization, ignore
-        pass
+# The tenant is set at the start of every transaction with set_config(..., true),
+# the bound-parameter form of SET LOCAL. It is cleared when the transaction ends,
+# so a pooled connection never carries one user's tenant into another's request.
+@event.listens_for(db.session, "after_begin")
+def set_nile_tenant(session_obj, transaction, connection):
+    if not tenant_scoping_enabled(app.config.get('TENANT_SCOPING'), connection.dialect.name):
+        return
+    # Only set tenant if there's an active request context with a logged-in user
+    if not has_request_context():
+        return
+    user_id = session.get('user_id')
+    if user_id:
+        connection.execute(
+            text("SELECT set_config('nile.tenant_id', :tenant_id, true)"),
+            {'tenant_id': str(user_id)}
+        )
 
 @event.listens_for(Engine, "connect", once=True)
 def enable_extensions(dbapi_connection, connection_record):
@@ -77,6 +99,15 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_token = os.environ.get('ADMIN_TOKEN')
+        if not admin_token or request.headers.get('X-Admin-Token') != admin_token:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
 
 
 
@@ -116,58 +147,168 @@ class User(db.Model):
             'weight_goal': self.weight_goal,
             'bmi': self.bmi,
             'daily_calories': self.daily_calories,
-            'subscription_tier': 'free',  # Always return free tier since all features are free
-            'subscription_start_date': datetime.utcnow().isoformat(),  # Always return current time
-            'subscription_end_date': (datetime.utcnow() + timedelta(days=36500)).isoformat(),  # Always return long duration
-            'subscription_status': 'active'  # Always return active since all features are free
+            **free_subscription()
         }
 
+
+def free_subscription():
+    return {
+        'subscription_tier': 'free',  # Always return free tier since all features are free
+        'subscription_start_date': datetime.utcnow().isoformat(),  # Always return current time
+        'subscription_end_date': (datetime.utcnow() + timedelta(days=36500)).isoformat(),  # Always return long duration
+        'subscription_status': 'active'  # Always return active since all features are free
+    }
+
 # Configure Gemini API
-api_key = os.environ.get("GEMINI_API_KEY")
-if not api_key:
-    print("Warning: GEMINI_API_KEY environment variable not found!")
-    model = None
-else:
-    try:
-        print("Gemini API key found, attempting to configure...")
-        genai.configure(api_key=api_key)
+# The model is resolved in a background thread (see ai_models.py) so importing
+# the app never waits on Gemini; routes fall back while it is warming up.
+gemini = create_registry()
+
+# Every Gemini call goes through this bounded pool (AI_EXECUTOR_MAX_WORKERS,
+# AI_EXECUTOR_MAX_QUEUE, AI_CALL_TIMEOUT) so slow responses cannot exhaust workers
+ai_executor = create_executor()
+# How many days of one diet plan may be generated at once (see meal_plans.py)
+DIET_PLAN_DAY_CONCURRENCY = int(os.environ.get('DIET_PLAN_DAY_CONCURRENCY', DAY_CONCURRENCY))
+
+
+@app.route('/api/ai/status', methods=['GET'])
+def ai_status():
+    return jsonify({**gemini.status(), 'executor': ai_executor.stats(), 'jobs': job_queue.stats()}), 200
+
+# Shared cache for Gemini responses; one SQLite file serves every gunicorn worker
+response_cache = ResponseCache(
+    os.environ.get('RESPONSE_CACHE_PATH', os.path.join(app.instance_path, 'response_cache.db')),
+    default_ttl=int(os.environ.get('RESPONSE_CACHE_TTL', 86400)),
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 5000))
+)
 
-        available_models = []
-        try:
-            for m in genai.list_models():
-                if 'generateContent' in m.supported_generation_methods:
-                    available_models.append(m.name)
-            print(f"Available models: {available_models}")
-        except Exception as e:
-            print(f"Error listing models: {e}")
 
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            test_response = model.generate_content("Hello")
-            print("Gemini model (gemini-2.5-flash) configured successfully")
-        except Exception as model_error:
-            print(f"Error with gemini-2.5-flash: {model_error}")
-            try:
-                model = genai.GenerativeModel('gemini-2.5-pro')
-                test_response = model.generate_content("Hello")
-                print("Gemini model (gemini-2.5-pro) configured successfully")
-            except Exception as pro_error:
-                print(f"Error with gemini-2.5-pro: {pro_error}")
-                try:
-                    model = genai.GenerativeModel('gemini-flash-latest')
-                    test_response = model.generate_content("Hello")
-                    print("Gemini model (gemini-flash-latest) configured successfully")
-                except Exception as latest_error:
-                    print(f"Error with all models: {model_error}, {pro_error}, {latest_error}")
-                    model = None
-                    print("Setting model to None - AI features will not be available")
-    except Exception as e:
-        print(f"Error configuring Gemini API: {e}")
-        model = None
+# Background jobs for slow AI generation. A request to an @allow_async route
+# with ?async=1 or "Prefer: respond-async" is queued in a SQLite file and
+# answered with 202 and a job id; JOB_WORKERS threads per process (or a
+# separate `flask run-jobs` process when JOB_WORKERS=0) replay the request and
+# store its response, which clients poll at /api/jobs/<id> or receive over SSE
+# from /api/jobs/<id>/events. Disabled by default on serverless deploys, where
+# nothing runs once the response is sent.
+#
+# Long polls and event streams hold a request thread, so the Procfile runs
+# gunicorn's threaded (gthread) workers, and both are capped at JOB_HOLD_SECONDS.
+# The default (25) stays below gunicorn's 30 s default timeout in case a deploy
+# still uses sync workers; raise it only with gthread/gevent workers.
+JOB_HOLD_SECONDS = float(os.environ.get('JOB_HOLD_SECONDS', 25))
+ASYNC_JOBS = os.environ.get('ASYNC_JOBS', '0' if app.config['DB_RUNTIME_PROFILE'] == 'serverless' else '1') == '1'
+job_queue = JobQueue(
+    os.environ.get('JOB_QUEUE_PATH', os.path.join(app.instance_path, 'jobs.db')),
+    lease_seconds=int(os.environ.get('JOB_LEASE_SECONDS', 120)),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    retention=int(os.environ.get('JOB_RETENTION', 86400))
+)
+job_handlers = {}
+job_workers = JobWorkerPool(job_queue, job_handlers, workers=int(os.environ.get('JOB_WORKERS', 2)))
 
 
+def run_view_job(payload):
+    """Replay a queued request against its view and return ``(json body, status code)``."""
+    with app.test_request_context(payload['path'], method=payload['method'],
+                                  query_string=payload['args'], json=payload['json']):
+        if payload['user_id']:
+            session['user_id'] = payload['user_id']
+        g.job_id = payload['job_id']
+        response = app.make_response(app.view_functions[payload['endpoint']]())
+        return response.get_json(silent=True), response.status_code
 
 
+def wants_async():
+    body = request.get_json(silent=True)
+    return (request.args.get('async') in ('1', 'true')
+            or 'respond-async' in request.headers.get('Prefer', '')
+            or (isinstance(body, dict) and body.get('async') is True))
+
+
+def allow_async(f):
+    """Let clients run this view as a background job (see ASYNC_JOBS above)."""
+    job_handlers[f.__name__] = run_view_job
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ASYNC_JOBS or g.get('job_id') or not wants_async():
+            return f(*args, **kwargs)
+        job_id = uuid.uuid4().hex
+        user_id = session.get('user_id')
+        job_queue.enqueue(request.endpoint, {
+            'job_id': job_id,
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'args': request.args.to_dict(flat=False),
+            'json': request.get_json(silent=True),
+            'user_id': user_id
+        }, user_id=user_id, job_id=job_id)
+        job_workers.start()
+        return jsonify({
+            'job_id': job_id,
+            'status': QUEUED,
+            'status_url': url_for('get_job', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id)
+        }), 202, {'Location': url_for('get_job', job_id=job_id)}
+    return decorated_function
+
+
+@app.route('/api/admin/cache', methods=['GET', 'DELETE'])
+@admin_required
+def admin_cache():
+    if request.method == 'DELETE':
+        namespace = request.args.get('namespace')
+        removed = response_cache.invalidate(namespace)
+        return jsonify({'message': 'Cache invalidated', 'namespace': namespace, 'removed': removed}), 200
+    return jsonify({'stats': response_cache.stats()}), 200
+
+
+# Serialized profiles are cached for USER_PROFILE_CACHE_TTL seconds (0 disables)
+# so pages that call /api/current_user and /api/subscription/status back to
+# back skip the database. Every write to a user must call invalidate_user_profile.
+# They get their own file and size limit so they never evict Gemini responses,
+# and reads do not write (entries just expire).
+USER_PROFILE_CACHE_TTL = int(os.environ.get('USER_PROFILE_CACHE_TTL', 60))
+profile_cache = ResponseCache(
+    os.environ.get('PROFILE_CACHE_PATH', os.path.join(app.instance_path, 'profile_cache.db')),
+    default_ttl=USER_PROFILE_CACHE_TTL,
+    max_entries=int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 10000)),
+    track_reads=False
+)
+
+
+def get_session_user(user_id=None):
+    """The User for ``user_id`` (default: the session's), loaded at most once per request."""
+    user_id = user_id or session.get('user_id')
+    if not user_id:
+        return None
+    users = g.setdefault('users', {})
+    if user_id not in users:
+        users[user_id] = db.session.get(User, user_id)
+    return users[user_id]
+
+
+def get_user_profile(user_id):
+    """``User.to_dict()`` for ``user_id`` from the profile cache, or None if there is no such user."""
+    if USER_PROFILE_CACHE_TTL > 0:
+        profile = profile_cache.get('user_profiles', {'user_id': user_id})
+        if profile is not None:
+            return {**profile, **free_subscription()}
+    user = get_session_user(user_id)
+    if not user:
+        return None
+    profile = user.to_dict()
+    # Users still waiting for the free-access repair are not cached, so
+    # /api/subscription/status keeps seeing their stored status
+    if USER_PROFILE_CACHE_TTL > 0 and user.subscription_status == 'active':
+        profile_cache.set('user_profiles', {'user_id': user_id}, profile)
+    return profile
+
+
+def invalidate_user_profile(user_id):
+    g.get('users', {}).pop(user_id, None)
+    profile_cache.delete('user_profiles', {'user_id': user_id})
 
 
 
@@ -206,6 +347,7 @@ def google_login():
             user.subscription_start_date = datetime.utcnow()
             user.subscription_end_date = datetime.utcnow() + timedelta(days=36500)  # Long duration
             db.session.commit()
+            invalidate_user_profile(user.id)
 
         return jsonify({'message': 'Google login successful', 'user': user.to_dict()}), 200
     except Exception as e:
@@ -226,6 +368,14 @@ def init_db():
             db.create_all()
             print("Database initialized (create_all). No data deleted.")
 
+            # Versioned changes to existing tables (indexes etc.), see migrations.py.
+            # Serverless cold starts skip them; run `flask db-upgrade` when deploying.
+            default_migrate = '0' if app.config['DB_RUNTIME_PROFILE'] == 'serverless' else '1'
+            if os.environ.get('AUTO_MIGRATE', default_migrate) != '0':
+                applied = run_migrations(db.engine)
+                if applied:
+                    print(f"Applied migrations: {applied}")
+
             # Test connection without deleting data
             test_user = User.query.first()
             print("Database connection OK. Existing users:", test_user is not None)
@@ -237,8 +387,33 @@ def init_db():
             print("Database initialization failed, but no data was deleted.")
 
 
-# Initialize the database after the app is fully set up
-init_db()
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations (indexes, backfills)."""
+    with app.app_context():
+        db.create_all()
+        applied = run_migrations(db.engine)
+    print(f"Applied migrations: {applied}" if applied else "Database schema is up to date.")
+
+
+@app.cli.command('build-food-store')
+def build_food_store_command():
+    """Convert FOOD_CSV_PATH into the memory-mapped food store at FOOD_STORE_PATH."""
+    count = build_food_store(FOOD_CSV_PATH, FOOD_STORE_PATH)
+    print(f"Wrote {count} foods to {FOOD_STORE_PATH}.npy")
+
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run background jobs from JOB_QUEUE_PATH in this process until interrupted."""
+    workers = JobWorkerPool(job_queue, job_handlers, workers=max(1, job_workers.workers))
+    workers.start()
+    print(f"Running {workers.workers} job workers on {job_queue.path}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        workers.stop()
 
 def calculate_bmi(weight, height):
     if not weight or not height or height <= 0:
@@ -313,7 +488,7 @@ def register():
             if not user_id:
                 return jsonify({'error': 'User not authenticated'}), 401
 
-            user = User.query.get(user_id)
+            user = get_session_user(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
 
@@ -336,6 +511,7 @@ def register():
                 user.daily_calories = calculate_daily_calories(user.current_weight, user.height, user.gender, user.goal_type)
 
             db.session.commit()
+            invalidate_user_profile(user.id)
             return jsonify({'message': 'Profile updated successfully', 'user': user.to_dict()}), 200
 
     except Exception as e:
@@ -344,19 +520,36 @@ def register():
 
 # Local food database
 LOCAL_FOOD_DATABASE = {
-    'roti': {'name': 'Roti', 'calories': 70, 'carbs': 15, 'protein': 3, 'fat': 0.5},
-    'biryani': {'name': 'Biryani', 'calories': 250, 'carbs': 35, 'protein': 8, 'fat': 10},
-    'daal': {'name': 'Daal (Lentils)', 'calories': 120, 'carbs': 20, 'protein': 9, 'fat': 2},
-    'rice': {'name': 'Rice', 'calories': 200, 'carbs': 45, 'protein': 4, 'fat': 0.5},
-    'chicken': {'name': 'Chicken', 'calories': 165, 'carbs': 0, 'protein': 31, 'fat': 3.6},
-    'kheer': {'name': 'Kheer', 'calories': 150, 'carbs': 28, 'protein': 4, 'fat': 2},
-    'egg': {'name': 'Egg', 'calories': 70, 'carbs': 0.6, 'protein': 6, 'fat': 5},
-    'aloo': {'name': 'Aloo (Potato)', 'calories': 77, 'carbs': 17, 'protein': 2, 'fat': 0.1},
-    'gobi': {'name': 'Gobi (Cauliflower)', 'calories': 25, 'carbs': 5, 'protein': 2, 'fat': 0.3},
-    'mix_vegetable': {'name': 'Mixed Vegetables', 'calories': 45, 'carbs': 8, 'protein': 2, 'fat': 0.4},
-    'paratha': {'name': 'Paratha', 'calories': 150, 'carbs': 20, 'protein': 4, 'fat': 6}
+    'roti': {'name': 'Roti', 'calories': 70, 'carbs': 15, 'protein': 3, 'fat': 0.5, 'serving_g': 40},
+    'biryani': {'name': 'Biryani', 'calories': 250, 'carbs': 35, 'protein': 8, 'fat': 10, 'serving_g': 150},
+    'daal': {'name': 'Daal (Lentils)', 'calories': 120, 'carbs': 20, 'protein': 9, 'fat': 2, 'serving_g': 150},
+    'rice': {'name': 'Rice', 'calories': 200, 'carbs': 45, 'protein': 4, 'fat': 0.5, 'serving_g': 155},
+    'chicken': {'name': 'Chicken', 'calories': 165, 'carbs': 0, 'protein': 31, 'fat': 3.6, 'serving_g': 100},
+    'kheer': {'name': 'Kheer', 'calories': 150, 'carbs': 28, 'protein': 4, 'fat': 2, 'serving_g': 100},
+    'egg': {'name': 'Egg', 'calories': 70, 'carbs': 0.6, 'protein': 6, 'fat': 5, 'serving_g': 50},
+    'aloo': {'name': 'Aloo (Potato)', 'calories': 77, 'carbs': 17, 'protein': 2, 'fat': 0.1, 'serving_g': 100},
+    'gobi': {'name': 'Gobi (Cauliflower)', 'calories': 25, 'carbs': 5, 'protein': 2, 'fat': 0.3, 'serving_g': 100},
+    'mix_vegetable': {'name': 'Mixed Vegetables', 'calories': 45, 'carbs': 8, 'protein': 2, 'fat': 0.4, 'serving_g': 100},
+    'paratha': {'name': 'Paratha', 'calories': 150, 'carbs': 20, 'protein': 4, 'fat': 6, 'serving_g': 50}
 }
 
+# The composition table lives in a memory-mapped NumPy store built from
+# data/foods.csv (see food_store.py), shared by every worker process. Without
+# NumPy or the CSV the app keeps using LOCAL_FOOD_DATABASE.
+FOOD_CSV_PATH = os.environ.get('FOOD_CSV_PATH', os.path.join(os.path.dirname(__file__), 'data', 'foods.csv'))
+FOOD_STORE_PATH = os.environ.get('FOOD_STORE_PATH', os.path.join(app.instance_path, 'foods'))
+food_database = open_food_store(FOOD_CSV_PATH, FOOD_STORE_PATH) or LOCAL_FOOD_DATABASE
+
+# Built once at import; food_search ranks exact > prefix > substring > fuzzy matches
+food_index = FoodIndex(food_database)
+
+# Server-side macros for entries that name a food_id: per-serving data plus
+# serving_g, and the per-food portion weights in data/portions.csv
+FOOD_PORTIONS_PATH = os.environ.get('FOOD_PORTIONS_PATH', os.path.join(os.path.dirname(__file__), 'data', 'portions.csv'))
+macro_calculator = create_calculator(food_database, FOOD_PORTIONS_PATH)
+FOOD_SEARCH_DEFAULT_LIMIT = 20
+FOOD_SEARCH_MAX_LIMIT = 100
+
 # No need for hardcoded recipe database - will use Gemini API to generate Pakistani recipes
 
 LIMITED_FOOD_RECOMMENDATIONS = {
@@ -411,31 +604,80 @@ def food_search():
         food_name = request.args.get('food_name', '').lower().strip()
         if not food_name:
             return jsonify({'error': 'Food name parameter is required'}), 400
-        result = []
-        for key, value in LOCAL_FOOD_DATABASE.items():
-            if food_name in key or food_name in value['name'].lower():
-                result.append(value)
+        try:
+            limit = min(max(int(request.args.get('limit', FOOD_SEARCH_DEFAULT_LIMIT)), 1), FOOD_SEARCH_MAX_LIMIT)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        matches = food_index.search(food_name, limit=limit)
+        result = [food for _, food, _ in matches]
         if not result:
             return jsonify({'message': f'No food items found matching "{food_name}"'}), 404
         return jsonify({'results': result, 'count': len(result)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+# Suggestions only change when the food data does, which is fixed for the
+# life of the process, so browsers may reuse them for a while
+AUTOCOMPLETE_CACHE_CONTROL = 'public, max-age=300, stale-while-revalidate=3600'
+AUTOCOMPLETE_MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+
+@lru_cache(maxsize=4096)
+def autocomplete_payload(query, limit):
+    """Serialized suggestions and their ETag for a normalized query, memoized per process."""
+    suggestions = []
+    for key, food, match in food_index.search(query, limit=limit):
+        # Macros are for one serving of serving_g grams, the unit clients should preselect
+        suggestion = {'key': key, 'name': food.get('name', key), 'match': match,
+                      'unit': 'serving', 'serving_g': food.get('serving_g')}
+        for macro in AUTOCOMPLETE_MACROS:
+            suggestion[macro] = food.get(macro)
+        suggestions.append(suggestion)
+    body = json.dumps({'query': query, 'suggestions': suggestions, 'count': len(suggestions)}, separators=(',', ':'))
+    return body, hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+@app.route('/api/foods/autocomplete', methods=['GET'])
+def food_autocomplete():
+    """Ranked per-serving suggestions for keystroke-by-keystroke food entry."""
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        body, etag = autocomplete_payload(normalize_food_query(request.args.get('q', '')), limit)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = AUTOCOMPLETE_CACHE_CONTROL
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+CHATBOT_SYSTEM_INSTRUCTION = "Aap Pakistani diet aur health matters par baat karne wale nutritionist hain. Jawab Roman Urdu mein dena. Sirf Pakistani diet, traditional foods, aur health concerns par bat karna. Koi bhi non-Pakistani diet ya western foods ke baare mein bat karne se mana karna. jawab chota hoga, seedha aur asan alfaaz mein jawab dein."
+CHATBOT_EXPERT_TRIGGER = 'Mujhe expert se baat karni hai'
+CHATBOT_EXPERT_RESPONSE = 'Aap ke sawal ka jawab dena zaroori hai. Kripya apna contact number ya email provide karein taake hum aap se expert ke through rabta kar sakein.'
+CHATBOT_MODEL_UNAVAILABLE = 'Sorry, the AI model is not available. Please contact the administrator.'
+CHATBOT_NOT_UNDERSTOOD = "Maaf kijiye, aapka sawal samajh nahi aaya. Kripya din mein Pakistani khana ya sehat ke bare mein pochhein."
+
 @app.route('/api/chatbot', methods=['POST'])
+@allow_async
 def chatbot():
     try:
         data = request.get_json()
         user_message = data.get('user_message', '').strip()
         if not user_message:
             return jsonify({'error': 'User message is required'}), 400
-        if 'Mujhe expert se baat karni hai' in user_message:
-            return jsonify({'response': 'Aap ke sawal ka jawab dena zaroori hai. Kripya apna contact number ya email provide karein taake hum aap se expert ke through rabta kar sakein.', 'needs_expert': True}), 200
+        if CHATBOT_EXPERT_TRIGGER in user_message:
+            return jsonify({'response': CHATBOT_EXPERT_RESPONSE, 'needs_expert': True}), 200
+        model = gemini.get_model()
         if model is None:
-            return jsonify({'response': 'Sorry, the AI model is not available. Please contact the administrator.', 'needs_expert': False}), 500
-        system_instruction = "Aap Pakistani diet aur health matters par baat karne wale nutritionist hain. Jawab Roman Urdu mein dena. Sirf Pakistani diet, traditional foods, aur health concerns par bat karna. Koi bhi non-Pakistani diet ya western foods ke baare mein bat karne se mana karna. jawab chota hoga, seedha aur asan alfaaz mein jawab dein."
+            return jsonify({'response': CHATBOT_MODEL_UNAVAILABLE, 'needs_expert': False}), 500
         try:
-            response = model.generate_content(f"{system_instruction} User ka sawal: {user_message}")
-            bot_response = response.text if response and hasattr(response, 'text') else "Maaf kijiye, aapka sawal samajh nahi aaya. Kripya din mein Pakistani khana ya sehat ke bare mein pochhein."
+            response = ai_executor.generate(model, f"{CHATBOT_SYSTEM_INSTRUCTION} User ka sawal: {user_message}")
+            bot_response = response.text if response and hasattr(response, 'text') else CHATBOT_NOT_UNDERSTOOD
         except Exception as gen_error:
             print(f"Error generating content: {gen_error}")
             bot_response = f"Sorry, I'm having trouble generating a response. Error: {str(gen_error)}"
@@ -444,96 +686,237 @@ def chatbot():
         print(f"Error in chatbot endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
-# Static HTML Routes
-@app.route('/')
-def landing_page():
-    user_id = session.get('user_id')
-    if user_id:
-        return redirect(url_for('dashboard'))
-    else:
-        html_path = os.path.join(os.path.dirname(__file__), 'landing.html')
-        return send_file(html_path)
+def sse_event(event, payload):
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    html_path = os.path.join(os.path.dirname(__file__), 'dashboard.html')
-    return send_file(html_path)
+@app.route('/api/chatbot/stream', methods=['GET', 'POST'])
+def chatbot_stream():
+    """
+    Streaming variant of /api/chatbot.
 
-@app.route('/chatbot')
-@login_required
-def chatbot_ui():
-    html_path = os.path.join(os.path.dirname(__file__), 'chatbot.html')
-    return send_file(html_path)
+    Tokens are pushed as `token` events while Gemini generates them, followed
+    by a single `done` event. Accepts the same JSON body as /api/chatbot, or
+    `?user_message=` for EventSource clients. The stream holds an AI executor
+    slot until it ends, so it counts against the same limit as other AI calls.
+    """
+    data = request.get_json(silent=True) or request.args
+    user_message = (data.get('user_message') or '').strip()
+    if not user_message:
+        return jsonify({'error': 'User message is required'}), 400
+    try:
+        release_slot = ai_executor.reserve()
+    except AIExecutorBusy as e:
+        return jsonify({'error': str(e)}), 503
 
-@app.route('/register')
-def register_page():
-    html_path = os.path.join(os.path.dirname(__file__), 'register.html')
-    return send_file(html_path)
+    def generate():
+        try:
+            yield from stream_reply()
+        finally:
+            release_slot()
+
+    def stream_reply():
+        if CHATBOT_EXPERT_TRIGGER in user_message:
+            yield sse_event('token', {'text': CHATBOT_EXPERT_RESPONSE})
+            yield sse_event('done', {'needs_expert': True})
+            return
+        model = gemini.get_model()
+        if model is None:
+            yield sse_event('token', {'text': CHATBOT_MODEL_UNAVAILABLE})
+            yield sse_event('done', {'needs_expert': False, 'error': 'model_unavailable'})
+            return
+        try:
+            sent_any = False
+            response = model.generate_content(
+                f"{CHATBOT_SYSTEM_INSTRUCTION} User ka sawal: {user_message}",
+                stream=True,
+                request_options={'timeout': ai_executor.default_timeout}
+            )
+            for chunk in response:
+                text = getattr(chunk, 'text', '')
+                if text:
+                    sent_any = True
+                    yield sse_event('token', {'text': text})
+            if not sent_any:
+                yield sse_event('token', {'text': CHATBOT_NOT_UNDERSTOOD})
+            yield sse_event('done', {'needs_expert': False})
+        except Exception as gen_error:
+            print(f"Error streaming content: {gen_error}")
+            yield sse_event('error', {'error': f"Sorry, I'm having trouble generating a response. Error: {str(gen_error)}"})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also covers a client that goes away before the stream is first read
+    response.call_on_close(release_slot)
+    return response
+
+def job_to_dict(job):
+    def timestamp(value):
+        return datetime.fromtimestamp(value, timezone.utc).isoformat() if value else None
+
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'created_at': timestamp(job['created_at']),
+        'started_at': timestamp(job['started_at']),
+        'finished_at': timestamp(job['finished_at'])
+    }
+    if job['status'] in FINISHED:
+        data.update({'result': job['result'], 'status_code': job['status_code'], 'error': job['error']})
+    return data
+
+
+def get_visible_job(job_id):
+    """The job, or None if it does not exist or belongs to another user."""
+    job = job_queue.get(job_id)
+    if job is None or (job['user_id'] and job['user_id'] != session.get('user_id')):
+        return None
+    return job
 
-@app.route('/login')
-def login_page():
-    html_path = os.path.join(os.path.dirname(__file__), 'login.html')
-    return send_file(html_path)
 
-@app.route('/diet-plan')
-@login_required
-def diet_plan():
-    html_path = os.path.join(os.path.dirname(__file__), 'diet_plan.html')
-    return send_file(html_path)
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a background job. ``result``/``status_code`` are the response the
+    endpoint would have returned; ``?wait=<seconds>`` (at most
+    JOB_HOLD_SECONDS) holds the request until the job changes state.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_HOLD_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if wait > 0 and job['status'] not in FINISHED:
+        job = job_queue.wait(job_id, wait)
+    headers = {} if job['status'] in FINISHED else {'Retry-After': '1'}
+    return jsonify(job_to_dict(job)), 200, headers
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events for a job: a `status` event on every state change and
+    a final `done` event carrying the result. The stream gives up with a
+    `timeout` event after JOB_HOLD_SECONDS; EventSource clients reconnect
+    on their own and pick the stream up again.
+    """
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    timeout = JOB_HOLD_SECONDS
+
+    def generate():
+        current = job
+        deadline = time.monotonic() + timeout
+        while current['status'] not in FINISHED:
+            yield sse_event('status', job_to_dict(current))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield sse_event('timeout', {'job_id': job_id})
+                return
+            previous = current
+            while current == previous and time.monotonic() < deadline:
+                # Short waits keep a comment flowing so proxies do not drop the stream
+                current = job_queue.wait(job_id, min(10, deadline - time.monotonic()))
+                if current == previous:
+                    yield ': keep-alive\n\n'
+        yield sse_event('done', job_to_dict(current))
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
-@app.route('/recipes')
-@login_required
-def recipes():
-    html_path = os.path.join(os.path.dirname(__file__), 'recipes.html')
-    return send_file(html_path)
+# Static HTML Routes
+# Every servable page is listed here once. Its route (and a /<file>.html alias
+# with the same login rule) is registered from this list at startup; any other
+# path is a 404 straight from the manifest without touching the filesystem.
+PAGES = (
+    Page('/', 'landing_page', 'landing.html', logged_in_redirect='dashboard'),
+    Page('/dashboard', 'dashboard', 'dashboard.html', login_required=True),
+    Page('/chatbot', 'chatbot_ui', 'chatbot.html', login_required=True),
+    Page('/register', 'register_page', 'register.html'),
+    Page('/login', 'login_page', 'login.html'),
+    Page('/diet-plan', 'diet_plan', 'diet_plan.html', login_required=True),
+    Page('/recipes', 'recipes', 'recipes.html', login_required=True),
+    Page('/shopping-list', 'shopping_list', 'shopping_list.html', login_required=True),
+    Page('/exercise-planner', 'exercise_planner', 'exercise_planner.html', login_required=True),
+    Page('/profile', 'profile', 'profile.html', login_required=True),
+    Page('/settings', 'settings', 'settings.html', login_required=True),
+    Page('/history', 'history', 'history.html', login_required=True),
+    Page('/nutrition_tracking', 'nutrition_tracking', 'nutrition_tracking.html', login_required=True),
+    # Only reachable by file name
+    Page(None, None, 'profile-completion.html'),
+)
+page_routes = page_manifest(PAGES)
+
+# Pages are read once and kept in memory gzip/brotli-compressed with a strong
+# ETag (see page_cache.py). PAGE_CACHE_RELOAD=1, or running with debug, re-reads
+# pages that change on disk. Their inline CSS/JS is served as hashed, immutable
+# /assets/ files unless EXTRACT_PAGE_ASSETS=0. Code every page needs (header
+# buttons, logout, the current user) lives in static/js/common.js, linked by
+# each page as /assets/common.js and cached once by the browser for all of them.
+pages = PageCache(
+    os.path.dirname(__file__),
+    names=[page.filename for page in PAGES],
+    reload=app.debug or os.environ.get('PAGE_CACHE_RELOAD', '0') == '1',
+    extract=os.environ.get('EXTRACT_PAGE_ASSETS', '1') == '1',
+    bundles=[os.path.join(app.root_path, 'static', 'js', 'common.js')]
+)
 
-@app.route('/shopping-list')
-@login_required
-def shopping_list():
-    html_path = os.path.join(os.path.dirname(__file__), 'shopping_list.html')
-    return send_file(html_path)
+# /images/<file>?w=&format= serves resized WebP/AVIF variants, encoded once
+# into IMAGE_CACHE_DIR (see image_variants.py)
+images = ImageVariants(
+    os.path.join(app.root_path, 'static', 'images'),
+    os.environ.get('IMAGE_CACHE_DIR', os.path.join(app.instance_path, 'image_cache')),
+    max_age=int(os.environ.get('IMAGE_CACHE_MAX_AGE', 7 * 24 * 3600))
+)
 
-@app.route('/exercise-planner')
-@login_required
-def exercise_planner():
-    html_path = os.path.join(os.path.dirname(__file__), 'exercise_planner.html')
-    return send_file(html_path)
 
-@app.route('/profile')
-@login_required
-def profile():
-    html_path = os.path.join(os.path.dirname(__file__), 'profile.html')
-    return send_file(html_path)
+def page_view(page):
+    def view():
+        if page.logged_in_redirect and session.get('user_id'):
+            return redirect(url_for(page.logged_in_redirect))
+        return pages.response(page.filename, request)
+    return login_required(view) if page.login_required else view
 
-@app.route('/settings')
-@login_required
-def settings():
-    html_path = os.path.join(os.path.dirname(__file__), 'settings.html')
-    return send_file(html_path)
 
-@app.route('/history')
-@login_required
-def history():
-    html_path = os.path.join(os.path.dirname(__file__), 'history.html')
-    return send_file(html_path)
+page_views = {page.filename: page_view(page) for page in PAGES}
+for _page in PAGES:
+    if _page.route:
+        app.add_url_rule(_page.route, _page.endpoint, page_views[_page.filename])
+
+
+@app.route('/assets/<filename>')
+def serve_asset(filename):
+    response = pages.asset_response(filename, request)
+    if response is None:
+        return jsonify({'error': 'File not found'}), 404
+    return response
 
 # This is the original static recipe function that has been replaced by AI-powered version
 
 @app.route('/<path:filename>')
 def serve_static_html(filename):
-    if filename.endswith('.html'):
-        file_path = os.path.join(os.path.dirname(__file__), filename)
-        if os.path.exists(file_path):
-            return send_file(file_path)
-        else:
-            return jsonify({'error': 'File not found'}), 404
-    else:
+    page = page_routes.get('/' + filename)
+    if page is None:
         return jsonify({'error': 'File not found'}), 404
+    return page_views[page.filename]()
 
 @app.route('/images/<path:filename>')
 def serve_image(filename):
-    return send_from_directory(os.path.join(app.root_path, '..', 'static', 'images'), filename)
+    try:
+        response = images.response(filename, request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if response is None:
+        return jsonify({'error': 'File not found'}), 404
+    return response
 
 # Auth Routes
 @app.route('/api/login', methods=['POST'])
@@ -573,14 +956,17 @@ def current_user():
         if not user_id:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        user = User.query.get(user_id)
+        if request.method == 'GET':
+            profile = get_user_profile(user_id)
+            if not profile:
+                return jsonify({'error': 'User not found'}), 404
+            return jsonify({'message': 'User info retrieved successfully', 'user': profile}), 200
+
+        user = get_session_user(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        if request.method == 'GET':
-            return jsonify({'message': 'User info retrieved successfully', 'user': user.to_dict()}), 200
-
-        elif request.method == 'PUT':
+        if request.method == 'PUT':
             data = request.get_json()
 
             # Update user fields if provided in the request
@@ -621,13 +1007,19 @@ def current_user():
                 user.weight_goal = data['weight_goal']
 
             db.session.commit()
+            invalidate_user_profile(user.id)
             return jsonify({'message': 'User profile updated successfully', 'user': user.to_dict()}), 200
 
     except Exception as e:
         db.session.rollback()
 # Recipe generation using AI
 def generate_recipe_with_ai(query='', meal_type='', diet_type=''):
-    global model
+    cache_key = {'query': query, 'meal_type': meal_type, 'diet_type': diet_type}
+    cached_recipes = response_cache.get('recipes', cache_key)
+    if cached_recipes is not None:
+        return cached_recipes
+
+    model = gemini.get_model()
     if model is None:
         # Return mock data if model is not available
         return [
@@ -661,7 +1053,7 @@ def generate_recipe_with_ai(query='', meal_type='', diet_type=''):
     prompt += ". Provide the response in JSON format with these fields: name, description, prepTime (in minutes), calories, protein (in grams), carbs (in grams), fat (in grams), mealType (breakfast, lunch, dinner, snack), dietType (vegetarian, non-vegetarian, vegan, etc.), cuisine, ingredients (array), instructions (string with steps)."
 
     try:
-        response = model.generate_content(prompt)
+        response = ai_executor.generate(model, prompt)
         # Try to parse the response as JSON
         import re
         json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
@@ -675,6 +1067,7 @@ def generate_recipe_with_ai(query='', meal_type='', diet_type=''):
                 for i, recipe in enumerate(recipe_data):
                     recipe['id'] = i + 1
                     recipe['image'] = recipe.get('image', 'utensils')
+                response_cache.set('recipes', cache_key, recipe_data)
                 return recipe_data
             except:
                 # If JSON parsing fails, return mock data
@@ -704,6 +1097,7 @@ def generate_recipe_with_ai(query='', meal_type='', diet_type=''):
 
 @app.route('/api/recipes', methods=['GET'])
 @login_required
+@allow_async
 def get_recipes():
     try:
         # Get query parameters
@@ -718,6 +1112,7 @@ def get_recipes():
 
 @app.route('/api/recipes/search', methods=['POST'])
 @login_required
+@allow_async
 def search_recipes():
     try:
         data = request.get_json()
@@ -739,7 +1134,7 @@ def change_password():
         if not user_id:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        user = User.query.get(user_id)
+        user = get_session_user(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
@@ -755,6 +1150,7 @@ def change_password():
         # Set new password
         user.set_password(data['new_password'])
         db.session.commit()
+        invalidate_user_profile(user.id)
 
         return jsonify({'message': 'Password changed successfully'}), 200
 
@@ -777,7 +1173,7 @@ def create_subscription():
     try:
         user_id = session.get('user_id')
         if not user_id: return jsonify({'error': 'User not authenticated'}), 401
-        user = User.query.get(user_id)
+        user = get_session_user(user_id)
         if not user: return jsonify({'error': 'User not found'}), 404
         # All users now get access to all features automatically
         # This endpoint is kept for compatibility but grants free access to all features
@@ -789,6 +1185,7 @@ def create_subscription():
         user.subscription_end_date = end_date
         user.subscription_status = 'active'
         db.session.commit()
+        invalidate_user_profile(user.id)
         return jsonify({'message': 'All features unlocked successfully - you now have access to all premium features for free!', 'plan': plan, 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}), 200
     except Exception as e:
         db.session.rollback()
@@ -799,16 +1196,18 @@ def get_subscription_status():
     try:
         user_id = session.get('user_id')
         if not user_id: return jsonify({'error': 'User not authenticated'}), 401
-        user = User.query.get(user_id)
-        if not user: return jsonify({'error': 'User not found'}), 404
+        # A cached profile means the user exists and already has active status
+        if not get_user_profile(user_id): return jsonify({'error': 'User not found'}), 404
+        user = g.get('users', {}).get(user_id)
 
         # All users now have access to all features, so ensure status is always active
-        if user.subscription_status != 'active':
+        if user and user.subscription_status != 'active':
             user.subscription_status = 'active'
             user.subscription_tier = 'free'
             user.subscription_start_date = datetime.utcnow()
             user.subscription_end_date = datetime.utcnow() + timedelta(days=36500)  # Long duration
             db.session.commit()
+            invalidate_user_profile(user.id)
 
         return jsonify({
             'subscription_tier': 'free',
@@ -824,12 +1223,13 @@ def cancel_subscription():
     try:
         user_id = session.get('user_id')
         if not user_id: return jsonify({'error': 'User not authenticated'}), 401
-        user = User.query.get(user_id)
+        user = get_session_user(user_id)
         if not user: return jsonify({'error': 'User not found'}), 404
         # Even if a user cancels, they still keep access to all features since everything is free
         # We'll keep them as active to maintain access
         user.subscription_status = 'active'
         db.session.commit()
+        invalidate_user_profile(user.id)
         return jsonify({'message': 'Your account is active with full access to all features!'}), 200
     except Exception as e:
         db.session.rollback()
@@ -838,13 +1238,24 @@ def cancel_subscription():
 
 # FIXED: AI-Powered Recipe Generator
 @app.route('/api/pakistani-recipes', methods=['GET'])
+@allow_async
 def get_pakistani_recipes():
     try:
         search_query = request.args.get('search', '').lower()
         meal_type = request.args.get('mealType', '').lower()
         diet_type = request.args.get('dietType', '').lower()
 
+        cache_key = {'search': search_query, 'meal_type': meal_type, 'diet_type': diet_type}
+        cached_recipes = response_cache.get('pakistani_recipes', cache_key)
+        if cached_recipes is not None:
+            return jsonify({
+                'recipes': cached_recipes,
+                'count': len(cached_recipes),
+                'generated_by': 'ai'
+            }), 200
+
         # If AI model is available, try to generate recipes
+        model = gemini.get_model()
         if model is not None:
             try:
                 # Build prompt based on search criteria
@@ -866,7 +1277,7 @@ def get_pakistani_recipes():
 
                 prompt = " ".join(prompt_parts)
 
-                response = model.generate_content(prompt)
+                response = ai_executor.generate(model, prompt)
 
                 # Try to extract JSON from response
                 response_text = response.text.strip()
@@ -907,6 +1318,7 @@ def get_pakistani_recipes():
                     recipe.setdefault('ingredients', ['Ingredients not specified'])
                     recipe.setdefault('instructions', 'Instructions not specified')
 
+                response_cache.set('pakistani_recipes', cache_key, recipes)
                 return jsonify({
                     'recipes': recipes,
                     'count': len(recipes),
@@ -1136,6 +1548,12 @@ class NutritionEntry(db.Model):
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Every nutrition endpoint filters on user_id + date. Existing databases get
+    # this (and the covering variant) from migrations.py.
+    __table_args__ = (
+        db.Index('ix_nutrition_entry_user_date', 'user_id', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -1152,6 +1570,65 @@ class NutritionEntry(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+# Per user/day/meal totals, kept in step with NutritionEntry inside the same
+# transaction so summary and history reads never aggregate raw entries
+class DailyNutritionSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    meal_type = db.Column(db.String(20), primary_key=True)
+    calories = db.Column(db.Integer, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+def apply_nutrition_rollup(user_id, date, meal_type, calories, protein, carbs, fat, sign=1, count=1):
+    """
+    Add (sign=1) or remove (sign=-1) macros from the rollup; ``count`` is the
+    number of entries they cover (bulk inserts pass pre-summed totals).
+
+    Runs as an atomic upsert in the caller's transaction, so concurrent
+    writers for the same day cannot lose updates. The caller commits.
+    """
+    values = {
+        'user_id': user_id,
+        'date': date,
+        'meal_type': meal_type,
+        'calories': sign * int(round(float(calories or 0))),
+        'protein': sign * float(protein or 0),
+        'carbs': sign * float(carbs or 0),
+        'fat': sign * float(fat or 0),
+        'entry_count': sign * count
+    }
+    table = DailyNutritionSummary.__table__
+    dialect_name = db.session.get_bind().dialect.name
+    dialect = postgresql_dialect if dialect_name == 'postgresql' else sqlite_dialect
+    stmt = dialect.insert(table).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'date', 'meal_type'],
+        set_={column: table.c[column] + stmt.excluded[column]
+              for column in ('calories', 'protein', 'carbs', 'fat', 'entry_count')}
+    )
+    db.session.execute(stmt)
+    if sign < 0:
+        db.session.execute(table.delete().where(
+            table.c.user_id == user_id, table.c.date == date,
+            table.c.meal_type == meal_type, table.c.entry_count <= 0
+        ))
+
+def rollup_entry(entry, sign=1):
+    apply_nutrition_rollup(entry.user_id, entry.date, entry.meal_type,
+                           entry.calories, entry.protein, entry.carbs, entry.fat, sign=sign)
+
+@app.cli.command('rebuild-nutrition-rollup')
+def rebuild_nutrition_rollup_command():
+    """Recompute daily_nutrition_summary from nutrition_entry (backfill/repair)."""
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            rows = rebuild_daily_nutrition_summary(conn)
+    print(f"Rebuilt nutrition rollup: {rows} rows")
+
 # Nutrition Tracking Endpoints
 @app.route('/api/nutrition/entries', methods=['GET'])
 @login_required
@@ -1185,6 +1662,147 @@ def get_nutrition_entries():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+NUTRITION_ENTRY_REQUIRED_FIELDS = ['food_name', 'quantity', 'unit', 'meal_type', 'calories', 'protein', 'carbs', 'fat']
+
+# Upper bound for one bulk request (imports, "log this planned day")
+NUTRITION_BULK_LIMIT = 500
+
+def nutrition_entry_values(data, user_id, partial=False):
+    """
+    Validate one entry payload. Returns (column values, None) or (None, error message).
+
+    With ``partial`` (updates), fields are optional and only the ones given are
+    returned; ``user_id`` and a default date are only set for creates.
+    """
+    if not isinstance(data, dict):
+        return None, 'entry must be an object'
+    if not partial:
+        for field in NUTRITION_ENTRY_REQUIRED_FIELDS:
+            if field not in data:
+                return None, f'{field} is required'
+
+    values = {field: data[field] for field in NUTRITION_ENTRY_REQUIRED_FIELDS if field in data}
+    date_str = data.get('date')  # Format: YYYY-MM-DD
+    if date_str:
+        try:
+            values['date'] = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None, 'date must be in YYYY-MM-DD format'
+    elif not partial:
+        values['date'] = datetime.utcnow().date()
+
+    # Convert to what the columns store (calories is INTEGER), so rollups and
+    # responses built from these values match the saved rows exactly
+    try:
+        if 'calories' in values:
+            values['calories'] = int(round(float(values['calories'] or 0)))
+        for field in ('quantity', 'protein', 'carbs', 'fat'):
+            if field in values:
+                values[field] = float(values[field] or 0)
+    except (TypeError, ValueError, OverflowError):
+        return None, 'quantity, calories, protein, carbs and fat must be numbers'
+    if not partial:
+        values['user_id'] = user_id
+    return values, None
+
+def with_calculated_macros(items):
+    """
+    Fill in server-calculated macros for entry payloads that give a food_id.
+
+    Those items get food_name (unless given), normalized unit, calories,
+    protein, carbs and fat from macro_calculator in one batch; client-sent
+    macros are ignored for them. Other items pass through unchanged.
+    Returns (items, {index: error message}).
+    """
+    indexes = [i for i, item in enumerate(items) if isinstance(item, dict) and item.get('food_id') is not None]
+    if not indexes:
+        return items, {}
+    if macro_calculator is None:
+        return items, {i: 'Macro calculation is not available on this server' for i in indexes}
+    items = list(items)
+    errors = {}
+    calculated = macro_calculator.calculate_items([items[i] for i in indexes])
+    for index, result in zip(indexes, calculated):
+        if 'error' in result:
+            errors[index] = result['error']
+            continue
+        item = dict(items[index])
+        item.setdefault('food_name', result['food_name'])
+        item.update({field: result[field] for field in ('quantity', 'unit', 'calories', 'protein', 'carbs', 'fat')})
+        items[index] = item
+    return items, errors
+
+# Largest page the range endpoint will stream in one response
+NUTRITION_RANGE_MAX_LIMIT = 5000
+
+@app.route('/api/nutrition/entries/range', methods=['GET'])
+@login_required
+def get_nutrition_entries_range():
+    """
+    Entries between `start` and `end` (inclusive, YYYY-MM-DD), oldest first.
+
+    Pages are keyset-paginated on (date, id): pass the returned `next_cursor`
+    as `cursor` to continue. Rows are read from a server-side cursor and
+    serialized as they arrive, so memory stays flat for long ranges.
+    """
+    user_id = session.get('user_id')
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except KeyError:
+        return jsonify({'error': 'start and end parameters are required'}), 400
+    except ValueError:
+        return jsonify({'error': 'start and end must be in YYYY-MM-DD format'}), 400
+    if end < start:
+        return jsonify({'error': 'end must not be before start'}), 400
+
+    try:
+        limit = min(int(request.args.get('limit', 500)), NUTRITION_RANGE_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    query = db.select(*NUTRITION_ENTRY_COLUMNS).where(
+        NutritionEntry.user_id == user_id,
+        NutritionEntry.date >= start,
+        NutritionEntry.date <= end
+    )
+    meal_type = request.args.get('meal_type')
+    if meal_type:
+        query = query.where(NutritionEntry.meal_type == meal_type)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.split(':')
+            query = query.where(db.tuple_(NutritionEntry.date, NutritionEntry.id) >
+                                (datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id)))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # One extra row tells us whether another page exists
+    query = query.order_by(NutritionEntry.date, NutritionEntry.id).limit(limit + 1)
+
+    def generate():
+        yield '{"entries": ['
+        last = None
+        count = 0
+        rows = db.session.execute(query.execution_options(stream_results=True, yield_per=200))
+        for row in rows:
+            if count == limit:
+                rows.close()
+                break
+            yield (',' if count else '') + json.dumps(nutrition_row_to_dict(row))
+            last = row
+            count += 1
+        else:
+            last = None
+        next_cursor = f"{last.date.isoformat()}:{last.id}" if last is not None else None
+        yield '], "count": %d, "next_cursor": %s}' % (count, json.dumps(next_cursor))
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @app.route('/api/nutrition/entries', methods=['POST'])
 @login_required
 def add_nutrition_entry():
@@ -1192,31 +1810,17 @@ def add_nutrition_entry():
         user_id = session.get('user_id')
         data = request.get_json()
 
-        required_fields = ['food_name', 'quantity', 'unit', 'meal_type', 'calories', 'protein', 'carbs', 'fat']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
+        (data,), errors = with_calculated_macros([data])
+        if errors:
+            return jsonify({'error': errors[0]}), 400
+        values, error = nutrition_entry_values(data, user_id)
+        if error:
+            return jsonify({'error': error}), 400
 
-        date_str = data.get('date')  # Format: YYYY-MM-DD
-        if date_str:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        else:
-            date = datetime.utcnow().date()
-
-        entry = NutritionEntry(
-            user_id=user_id,
-            food_name=data['food_name'],
-            quantity=data['quantity'],
-            unit=data['unit'],
-            meal_type=data['meal_type'],
-            calories=data['calories'],
-            protein=data['protein'],
-            carbs=data['carbs'],
-            fat=data['fat'],
-            date=date
-        )
+        entry = NutritionEntry(**values)
 
         db.session.add(entry)
+        rollup_entry(entry)
         db.session.commit()
 
         return jsonify({
@@ -1227,6 +1831,115 @@ def add_nutrition_entry():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/nutrition/entries/bulk', methods=['POST'])
+@login_required
+def add_nutrition_entries_bulk():
+    """
+    Log many food items in one request.
+
+    Accepts {"entries": [...]} (or a bare list) using the same fields as
+    POST /api/nutrition/entries. Valid items are inserted with a single
+    executemany INSERT ... RETURNING in one transaction; invalid items are
+    reported in `results` and skipped.
+    """
+    try:
+        user_id = session.get('user_id')
+        data = request.get_json()
+        items = data.get('entries') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'entries must be a non-empty list'}), 400
+        if len(items) > NUTRITION_BULK_LIMIT:
+            return jsonify({'error': f'At most {NUTRITION_BULK_LIMIT} entries can be added per request'}), 400
+
+        # Items with a food_id get their macros calculated in one vectorized batch
+        items, calc_errors = with_calculated_macros(items)
+        results = []
+        rows = []
+        for index, item in enumerate(items):
+            values, error = (None, calc_errors[index]) if index in calc_errors else nutrition_entry_values(item, user_id)
+            if error:
+                results.append({'index': index, 'status': 'error', 'error': error})
+            else:
+                results.append({'index': index, 'status': 'created'})
+                rows.append(values)
+
+        if not rows:
+            return jsonify({'error': 'No valid entries', 'results': results}), 400
+
+        # Rows are stamped here so the response can be built without reloading them
+        created_at = datetime.utcnow()
+        for values in rows:
+            values['created_at'] = created_at
+        inserted = db.session.execute(
+            db.insert(NutritionEntry).returning(NutritionEntry.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+
+        # One rollup upsert per (date, meal_type) instead of one per item
+        deltas = {}
+        for values in rows:
+            key = (values['date'], values['meal_type'])
+            delta = deltas.setdefault(key, {'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0, 'count': 0})
+            for field in ('calories', 'protein', 'carbs', 'fat'):
+                delta[field] += values[field]
+            delta['count'] += 1
+        for (date, meal_type), delta in deltas.items():
+            apply_nutrition_rollup(user_id, date, meal_type, delta['calories'], delta['protein'],
+                                   delta['carbs'], delta['fat'], count=delta['count'])
+
+        db.session.commit()
+
+        created = iter(zip(inserted, rows))
+        for result in results:
+            if result['status'] == 'created':
+                row, values = next(created)
+                result['entry'] = {
+                    'id': row.id,
+                    **{field: values[field] for field in NUTRITION_ENTRY_REQUIRED_FIELDS},
+                    'user_id': user_id,
+                    'date': values['date'].isoformat(),
+                    'created_at': created_at.isoformat()
+                }
+
+        return jsonify({
+            'message': f'{len(rows)} nutrition entries added',
+            'created': len(rows),
+            'failed': len(items) - len(rows),
+            'results': results
+        }), 201 if len(rows) == len(items) else 207
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/nutrition/calculate', methods=['POST'])
+def calculate_nutrition():
+    """
+    Macros for {"items": [{"food_id", "quantity", "unit"}, ...]} (or one item),
+    computed the same way entries with a food_id are stored. Supported units
+    include g, kg, piece, serving, cup, plate and roti.
+    """
+    try:
+        if macro_calculator is None:
+            return jsonify({'error': 'Macro calculation is not available on this server'}), 503
+        data = request.get_json(silent=True)
+        items = data.get('items', [data]) if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        if len(items) > NUTRITION_BULK_LIMIT:
+            return jsonify({'error': f'At most {NUTRITION_BULK_LIMIT} items can be calculated per request'}), 400
+
+        results = macro_calculator.calculate_items(items)
+        totals = {'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0}
+        for result in results:
+            if 'error' not in result:
+                for field in totals:
+                    totals[field] += result[field]
+        totals = {field: round(value, 1) for field, value in totals.items()}
+        failed = sum(1 for result in results if 'error' in result)
+        return jsonify({'results': results, 'totals': totals, 'failed': failed}), 200 if not failed else 207
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/nutrition/entries/<int:entry_id>', methods=['PUT'])
 @login_required
 def update_nutrition_entry(entry_id):
@@ -1237,28 +1950,18 @@ def update_nutrition_entry(entry_id):
         if not entry:
             return jsonify({'error': 'Nutrition entry not found'}), 404
 
-        data = request.get_json()
+        values, error = nutrition_entry_values(request.get_json(silent=True), user_id, partial=True)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Take the old values out of the rollup; the new ones are added below
+        rollup_entry(entry, sign=-1)
 
         # Update fields if provided
-        if 'food_name' in data:
-            entry.food_name = data['food_name']
-        if 'quantity' in data:
-            entry.quantity = data['quantity']
-        if 'unit' in data:
-            entry.unit = data['unit']
-        if 'meal_type' in data:
-            entry.meal_type = data['meal_type']
-        if 'calories' in data:
-            entry.calories = data['calories']
-        if 'protein' in data:
-            entry.protein = data['protein']
-        if 'carbs' in data:
-            entry.carbs = data['carbs']
-        if 'fat' in data:
-            entry.fat = data['fat']
-        if 'date' in data:
-            entry.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        for field, value in values.items():
+            setattr(entry, field, value)
 
+        rollup_entry(entry)
         db.session.commit()
 
         return jsonify({
@@ -1280,6 +1983,7 @@ def delete_nutrition_entry(entry_id):
             return jsonify({'error': 'Nutrition entry not found'}), 404
 
         db.session.delete(entry)
+        rollup_entry(entry, sign=-1)
         db.session.commit()
 
         return jsonify({'message': 'Nutrition entry deleted successfully'}), 200
@@ -1287,6 +1991,86 @@ def delete_nutrition_entry(entry_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+# Columns needed to serialize an entry; selecting them directly skips ORM hydration
+NUTRITION_ENTRY_COLUMNS = (
+    NutritionEntry.id, NutritionEntry.user_id, NutritionEntry.food_name, NutritionEntry.quantity,
+    NutritionEntry.unit, NutritionEntry.meal_type, NutritionEntry.calories, NutritionEntry.protein,
+    NutritionEntry.carbs, NutritionEntry.fat, NutritionEntry.date, NutritionEntry.created_at
+)
+
+def nutrition_row_to_dict(row):
+    """Same shape as NutritionEntry.to_dict() for a row of NUTRITION_ENTRY_COLUMNS."""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'food_name': row.food_name,
+        'quantity': row.quantity,
+        'unit': row.unit,
+        'meal_type': row.meal_type,
+        'calories': row.calories,
+        'protein': row.protein,
+        'carbs': row.carbs,
+        'fat': row.fat,
+        'date': row.date.isoformat(),
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+# Built once with bind parameters; per request only the values change, so
+# SQLAlchemy skips statement construction and reuses the compiled SQL
+DAILY_TOTALS_QUERY = db.select(
+    DailyNutritionSummary.meal_type,
+    db.func.sum(DailyNutritionSummary.calories).label('calories'),
+    db.func.sum(DailyNutritionSummary.protein).label('protein'),
+    db.func.sum(DailyNutritionSummary.carbs).label('carbs'),
+    db.func.sum(DailyNutritionSummary.fat).label('fat')
+).where(
+    DailyNutritionSummary.user_id == db.bindparam('user_id'),
+    DailyNutritionSummary.date == db.bindparam('date')
+).group_by(DailyNutritionSummary.meal_type)
+
+DAILY_ENTRIES_QUERY = db.select(*NUTRITION_ENTRY_COLUMNS).where(
+    NutritionEntry.user_id == db.bindparam('user_id'),
+    NutritionEntry.date == db.bindparam('date')
+).order_by(NutritionEntry.id)
+
+def build_daily_summary(user_id, date):
+    """
+    Daily totals per meal type plus the day's entries.
+
+    Meal totals are one GROUP BY meal_type query over the rollup and the grand
+    total is summed from those (at most four) rows. Entries are read once as
+    plain column tuples and bucketed in a single pass.
+    """
+    params = {'user_id': user_id, 'date': date}
+    meals = {meal_type: {
+        'entries': [],
+        'total_calories': 0,
+        'total_protein': 0,
+        'total_carbs': 0,
+        'total_fat': 0
+    } for meal_type in MEAL_TYPES}
+    summary = {'total_calories': 0, 'total_protein': 0, 'total_carbs': 0, 'total_fat': 0}
+    for row in db.session.execute(DAILY_TOTALS_QUERY, params):
+        if row.meal_type in meals:
+            meals[row.meal_type].update({
+                'total_calories': row.calories,
+                'total_protein': row.protein,
+                'total_carbs': row.carbs,
+                'total_fat': row.fat
+            })
+        summary['total_calories'] += row.calories
+        summary['total_protein'] += row.protein
+        summary['total_carbs'] += row.carbs
+        summary['total_fat'] += row.fat
+
+    for row in db.session.execute(DAILY_ENTRIES_QUERY, params):
+        if row.meal_type in meals:
+            meals[row.meal_type]['entries'].append(nutrition_row_to_dict(row))
+
+    return {'date': date.isoformat(), 'summary': summary, 'meals': meals}
+
 @app.route('/api/nutrition/daily-summary', methods=['GET'])
 @login_required
 def get_daily_nutrition_summary():
@@ -1299,35 +2083,7 @@ def get_daily_nutrition_summary():
         else:
             date = datetime.utcnow().date()
 
-        entries = NutritionEntry.query.filter_by(user_id=user_id, date=date).all()
-
-        total_calories = sum(entry.calories for entry in entries)
-        total_protein = sum(entry.protein for entry in entries)
-        total_carbs = sum(entry.carbs for entry in entries)
-        total_fat = sum(entry.fat for entry in entries)
-
-        # Group by meal type
-        meals = {}
-        for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-            meal_entries = [entry.to_dict() for entry in entries if entry.meal_type == meal_type]
-            meals[meal_type] = {
-                'entries': meal_entries,
-                'total_calories': sum(entry.calories for entry in meal_entries),
-                'total_protein': sum(entry.protein for entry in meal_entries),
-                'total_carbs': sum(entry.carbs for entry in meal_entries),
-                'total_fat': sum(entry.fat for entry in meal_entries)
-            }
-
-        return jsonify({
-            'date': date.isoformat(),
-            'summary': {
-                'total_calories': total_calories,
-                'total_protein': total_protein,
-                'total_carbs': total_carbs,
-                'total_fat': total_fat
-            },
-            'meals': meals
-        }), 200
+        return jsonify(build_daily_summary(user_id, date)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1338,17 +2094,17 @@ def get_nutrition_history():
         user_id = session.get('user_id')
         limit = int(request.args.get('limit', 7))  # Default to 7 days
 
-        # Get the last N days of nutrition data
+        # Get the last N days of nutrition data from the rollup (<= 4 rows per day)
         entries = db.session.query(
-            NutritionEntry.date,
-            db.func.sum(NutritionEntry.calories).label('total_calories'),
-            db.func.count(NutritionEntry.id).label('food_count')
+            DailyNutritionSummary.date,
+            db.func.sum(DailyNutritionSummary.calories).label('total_calories'),
+            db.func.sum(DailyNutritionSummary.entry_count).label('food_count')
         ).filter(
-            NutritionEntry.user_id == user_id
+            DailyNutritionSummary.user_id == user_id
         ).group_by(
-            NutritionEntry.date
+            DailyNutritionSummary.date
         ).order_by(
-            NutritionEntry.date.desc()
+            DailyNutritionSummary.date.desc()
         ).limit(limit).all()
 
         history = []
@@ -1363,19 +2119,55 @@ def get_nutrition_history():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Route for nutrition tracking page
-@app.route('/nutrition_tracking')
+@app.route('/api/nutrition/trends', methods=['GET'])
 @login_required
-def nutrition_tracking():
-    html_path = os.path.join(os.path.dirname(__file__), 'nutrition_tracking.html')
-    return send_file(html_path)
+def get_nutrition_trends():
+    """
+    Day/week/month nutrition trends computed in SQL.
+
+    Query params: `bucket` (day, week or month; default day), and either
+    `start`/`end` (YYYY-MM-DD) or `days` (default 30, ending today).
+    Adherence is measured against the user's daily_calories.
+    """
+    try:
+        user_id = session.get('user_id')
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in TREND_BUCKETS:
+            return jsonify({'error': f"bucket must be one of: {', '.join(TREND_BUCKETS)}"}), 400
+
+        end_str = request.args.get('end')
+        end = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else datetime.utcnow().date()
+        start_str = request.args.get('start')
+        if start_str:
+            start = datetime.strptime(start_str, '%Y-%m-%d').date()
+        else:
+            start = end - timedelta(days=min(int(request.args.get('days', 30)), 366 * 5) - 1)
+        if end < start:
+            return jsonify({'error': 'end must not be before start'}), 400
+
+        profile = get_user_profile(user_id)
+        target = profile['daily_calories'] if profile else None
+
+        trends = nutrition_trends(db.session.connection(), user_id, bucket, start, end, target=target)
+        return jsonify({
+            'bucket': bucket,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'daily_calorie_target': target,
+            'trends': trends
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 # FIXED: Weekly Meal Plan Generator (No Repeated Days!) - Now Available to All Users
 @app.route('/api/diet-plan', methods=['POST'])
+@allow_async
 def generate_weekly_meal_plan():
     try:
         user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_session_user(user_id)
         data = request.get_json()
         goal = data.get('goal', user.goal_type) or 'maintain'
         calorie_target = data.get('calorie_target', user.daily_calories) or 2000
@@ -1384,10 +2176,34 @@ def generate_weekly_meal_plan():
         allergies = data.get('allergies', [])
         medical_conditions = data.get('medical_conditions', [])
 
+        # Plans are generated per bucket (calories rounded to 100 kcal, sorted lists)
+        # and scaled locally to the exact target
+        bucket = plan_bucket(goal, calorie_target, diet_preference, non_veg_preference, allergies, medical_conditions)
+        try:
+            scale_factor = float(calorie_target) / bucket['calories']
+        except (TypeError, ValueError):
+            scale_factor = 1
+        cached_plan = response_cache.get('diet_plans', bucket)
+        if cached_plan is not None:
+            meal_plan = scale_plan(cached_plan, scale_factor)
+            return jsonify({
+                "diet_plan": meal_plan,
+                "original_response": json.dumps(meal_plan),
+                "goal": goal,
+                "calorie_target": calorie_target,
+                "diet_preference": diet_preference,
+                "non_veg_preference": non_veg_preference,
+                "allergies": allergies,
+                "medical_conditions": medical_conditions,
+                "plan_type": "ai_generated",
+                "generated_by": "gemini_cache"
+            }), 200
+
+        model = gemini.get_model()
         if model is None:
             import random
             # Return 7-day plan structure in correct sequence that matches frontend expectations
-            days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+            days = DAYS
             plan = {}
             for day in days:
                 plan[day] = {
@@ -1408,14 +2224,34 @@ def generate_weekly_meal_plan():
                 "generated_by": "fallback"
             }), 200
 
-        # Enhanced prompt that ensures correct day sequence
-        food_type = "non-vegetarian" if non_veg_preference else "vegetarian"
-        allergen_info = f" avoiding: {', '.join(allergies)}" if allergies else ""
-        medical_info = f" with considerations for: {', '.join(medical_conditions)}" if medical_conditions else ""
+        # Default mode: seven smaller per-day requests run side by side, so a bad
+        # day only falls back on its own
+        generation_mode = data.get('generation_mode') or os.environ.get('DIET_PLAN_GENERATION', 'per_day')
+        if generation_mode == 'per_day':
+            meal_plan, fallback_days = generate_plan_by_day(model, ai_executor, bucket, LIMITED_FOOD_RECOMMENDATIONS,
+                                                            timeout=30, max_concurrent=DIET_PLAN_DAY_CONCURRENCY)
+            if not fallback_days:
+                response_cache.set('diet_plans', bucket, meal_plan, ttl=int(os.environ.get('DIET_PLAN_CACHE_TTL', 7 * 86400)))
+            meal_plan = scale_plan(meal_plan, scale_factor)
+            all_failed = len(fallback_days) == len(DAYS)
+            return jsonify({
+                "diet_plan": meal_plan,
+                "original_response": None if all_failed else json.dumps(meal_plan),
+                "goal": goal,
+                "calorie_target": calorie_target,
+                "diet_preference": diet_preference,
+                "non_veg_preference": non_veg_preference,
+                "allergies": allergies,
+                "medical_conditions": medical_conditions,
+                "fallback_days": fallback_days,
+                "plan_type": "structured_timeout" if all_failed else "ai_generated",
+                "generated_by": "timeout" if all_failed else "gemini_per_day"
+            }), 200
 
+        # Enhanced prompt that ensures correct day sequence
         prompt = f"""
         Generate a comprehensive 7-day Pakistani meal plan with breakfast, lunch, dinner, and snacks for each day in SEQUENTIAL order (Monday through Sunday).
-        Goal: {goal}, Target calories: ~{calorie_target} kcal per day, Diet type: {food_type}, Preference: {diet_preference}{allergen_info}{medical_info}.
+        {describe_preferences(bucket)}
         Structure the response as a JSON object with days of the week in lowercase as keys in sequential order: monday, tuesday, wednesday, thursday, friday, saturday, sunday.
         Each day should contain breakfast, lunch, dinner, and snack keys with arrays of meal objects.
         Each meal object should include: name, calories (integer), protein (in grams), carbs (in grams), fat (in grams), description.
@@ -1439,23 +2275,16 @@ def generate_weekly_meal_plan():
         Return ONLY the JSON object with no additional text. Ensure days are in correct sequential order.
         """
 
-        # Add timeout handling for the AI call
+        # Run the AI call on the shared pool; on timeout the request returns
+        # immediately instead of waiting for the stuck call to finish
         import concurrent.futures
-        import time
-
-        # Use a timeout for the AI generation
-        def generate_ai_content():
-            return model.generate_content(prompt)
 
         try:
-            # Run AI call with timeout of 30 seconds
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(generate_ai_content)
-                response = future.result(timeout=30)  # 30 second timeout
-        except concurrent.futures.TimeoutError:
+            response = ai_executor.generate(model, prompt, timeout=30)
+        except (concurrent.futures.TimeoutError, AIExecutorBusy):
             # Return 7-day plan structure in correct sequence
             import random
-            days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+            days = DAYS
             fallback_plan = {}
             for day in days:
                 fallback_plan[day] = {
@@ -1487,6 +2316,10 @@ def generate_weekly_meal_plan():
 
         meal_plan = json.loads(raw)
 
+        if isinstance(meal_plan, dict) and all(day in meal_plan for day in DAYS):
+            response_cache.set('diet_plans', bucket, meal_plan, ttl=int(os.environ.get('DIET_PLAN_CACHE_TTL', 7 * 86400)))
+        meal_plan = scale_plan(meal_plan, scale_factor)
+
         return jsonify({
             "diet_plan": meal_plan,
             "original_response": response.text.strip() if response and hasattr(response, 'text') else raw,
@@ -1628,6 +2461,23 @@ def generate_shopping_list():
         return jsonify({'error': str(e)}), 500
 
 
+# Food plate analysis API. Requests share a pool of keep-alive connections with
+# connect/read timeouts, one overall deadline and retries that never resend a
+# lookup the API may already have billed (see http_pool.py), and successful
+# results are cached in the response cache by image URL.
+FOOD_PLATE_API_URL = os.environ.get('FOOD_PLATE_API_URL', 'https://ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com')
+FOOD_PLATE_API_HOST = os.environ.get('RAPIDAPI_HOST', urllib.parse.urlsplit(FOOD_PLATE_API_URL).hostname)
+FOOD_PLATE_CACHE_TTL = int(os.environ.get('FOOD_PLATE_CACHE_TTL', 30 * 86400))
+food_plate_api = HTTPPool(
+    FOOD_PLATE_API_URL,
+    max_connections=int(os.environ.get('FOOD_PLATE_API_CONNECTIONS', 10)),
+    connect_timeout=float(os.environ.get('FOOD_PLATE_API_CONNECT_TIMEOUT', 5)),
+    read_timeout=float(os.environ.get('FOOD_PLATE_API_READ_TIMEOUT', 30)),
+    retries=int(os.environ.get('FOOD_PLATE_API_RETRIES', 2)),
+    total_timeout=float(os.environ.get('FOOD_PLATE_API_TOTAL_TIMEOUT', 40))
+)
+
+
 @app.route('/api/analyze-food-plate', methods=['POST'])
 @login_required
 def analyze_food_plate():
@@ -1641,36 +2491,33 @@ def analyze_food_plate():
         if not rapidapi_key:
             return jsonify({'error': 'RapidAPI key not configured. Please add RAPIDAPI_KEY to your environment variables.'}), 500
 
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         # Default to a sample image if no image URL is provided
         image_url = data.get('image_url', 'https://upload.wikimedia.org/wikipedia/commons/b/bd/Breakfast_foods.jpg')
+        # Hashed so the key stays case-sensitive (cache keys are lower-cased)
+        cache_parts = {'image_url_sha256': hashlib.sha256(image_url.encode('utf-8')).hexdigest()}
+        encoded_image_url = urllib.parse.quote(image_url, safe='')
+        request_path = f"/analyzeFoodPlate?imageUrl={encoded_image_url}&lang=en&noqueue=1"
 
-        # Call the external API
-        conn = http.client.HTTPSConnection("ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com")
-
-        payload = ""
+        cached_analysis = response_cache.get('food_plate_analysis', cache_parts)
+        if cached_analysis is not None:
+            return jsonify({
+                'analysis': cached_analysis,
+                'message': 'Food plate analyzed successfully',
+                'cached': True
+            }), 200
 
         headers = {
-            'x-rapidapi-host': "ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com",
+            'x-rapidapi-host': FOOD_PLATE_API_HOST,
             'x-rapidapi-key': rapidapi_key,
             'Content-Type': "application/x-www-form-urlencoded"
         }
-
-        # Create the request URL with the image URL parameter
-        import urllib.parse
-        encoded_image_url = urllib.parse.quote(image_url, safe='')
-        request_path = f"/analyzeFoodPlate?imageUrl={encoded_image_url}&lang=en&noqueue=1"
-
-        conn.request("POST", request_path, payload, headers)
-
-        res = conn.getresponse()
-        api_data = res.read()
-        conn.close()
+        res = food_plate_api.request("POST", request_path, "", headers)
 
         # Parse the API response
         try:
-            api_response = json.loads(api_data.decode("utf-8"))
-        except json.JSONDecodeError:
+            api_response = json.loads(res.body.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
             # Return a mock response for testing if the API is not working or key is invalid
             mock_response = {
                 'nutrition': {
@@ -1698,6 +2545,15 @@ def analyze_food_plate():
                 'message': 'Using mock data because real API response could not be parsed. Please check your RAPIDAPI_KEY.'
             }), 200
 
+        if not 200 <= res.status < 300:
+            # Quota, auth and upstream errors also come back as JSON; they are not an analysis
+            print(f"Food plate API returned {res.status}: {api_response}")
+            return jsonify({
+                'error': f'Food plate analysis failed (API returned {res.status})',
+                'details': api_response
+            }), 502
+        response_cache.set('food_plate_analysis', cache_parts, api_response, ttl=FOOD_PLATE_CACHE_TTL)
+
         # Return the API response
         return jsonify({
             'analysis': api_response,
@@ -1734,6 +2590,18 @@ def analyze_food_plate():
         }), 200
 
 
+# Initialize the database after the app and all models are fully set up
+init_db()
+
+# Start the job workers once every @allow_async handler is registered, so jobs
+# left queued or interrupted by a restart run without waiting for a new request.
+# Not in `flask` commands (Flask sets FLASK_RUN_FROM_CLI for all of them): a
+# short-lived `flask db-upgrade` must not claim a job and exit, and `flask
+# run-jobs` starts its own pool. `flask run` starts them on the first enqueue.
+if ASYNC_JOBS and os.environ.get('FLASK_RUN_FROM_CLI') != 'true':
+    job_workers.start()
+
+
 # Run the app
 if __name__ == "__main__":
     with app.app_context():
@@ -1743,6 +2611,8 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"Error during table creation: {e}")
             db.session.rollback()  # Rollback any failed transactions
+    # Pick up HTML edits without restarting the dev server
+    pages.reload = True
     app.run(debug=True, host='127.0.0.1', port=5000)
 
 
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+
+
+# Only plain inline blocks are extracted; <script src=...>, JSON/module scripts
+# and styles with media attributes are left where they are
+INLINE_BLOCK = re.compile(r'<(style|script)>(.*?)</\1>', re.DOTALL | re.IGNORECASE)
+ASSET_URL_PREFIX = '/assets/'
+# src/href attributes pointing at an unhashed /assets/ name, e.g. /assets/common.js
+ASSET_LINK = re.compile(r'(\s(?:src|href)=")' + re.escape(ASSET_URL_PREFIX) + r'([\w.-]+)"')
+CONTENT_TYPES = {'.css': 'text/css', '.js': 'application/javascript'}
+
+
+def minify_css(css):
+    """Drop comments and collapse whitespace, leaving quoted strings untouched."""
+    out = []
+    code = []
+    i = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            end = i + 1
+            while end < len(css) and css[end] != char:
+                end += 2 if css[end] == '\\' else 1
+            out.append(_collapse_css(''.join(code)))
+            code = []
+            out.append(css[i:end + 1])
+            i = end + 1
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end < 0 else end + 2
+            code.append(' ')
+        else:
+            code.append(char)
+            i += 1
+    out.append(_collapse_css(''.join(code)))
+    return ''.join(out).strip()
+
+
+def _collapse_css(code):
+    code = re.sub(r'\s+', ' ', code)
+    # Spaces around these never matter; ':' is kept because of selectors like 'a :hover'
+    return re.sub(r'\s*([{};,>])\s*', r'\1', code).replace(';}', '}')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def extract_assets(html):
+    """
+    Move inline ``<style>`` and ``<script>`` blocks out of ``html``.
+
+    Each block is named by its content hash, so identical blocks on different
+    pages become one asset. CSS is minified; JavaScript is kept verbatim, since
+    code shared between pages belongs in a bundle (see link_bundles). Returns the rewritten HTML and a
+    ``{filename: (content type, bytes)}`` dict of the extracted assets.
+    """
+    assets = {}
+
+    def replace(match):
+        tag, body = match.group(1).lower(), match.group(2)
+        if not body.strip():
+            return match.group(0)
+        if tag == 'style':
+            data, extension, content_type = minify_css(body).encode('utf-8'), 'css', 'text/css'
+        else:
+            data, extension, content_type = body.strip().encode('utf-8'), 'js', 'application/javascript'
+        filename = f'{content_hash(data)}.{extension}'
+        assets[filename] = (content_type, data)
+        if tag == 'style':
+            return f'<link rel="stylesheet" href="{ASSET_URL_PREFIX}{filename}">'
+        return f'<script src="{ASSET_URL_PREFIX}{filename}"></script>'
+
+    return INLINE_BLOCK.sub(replace, html), assets
+
+
+def load_bundle(path):
+    """
+    Read a shared CSS/JS file. Returns its content-hashed filename (e.g.
+    ``common.3f2a9c0d1e4b5a6f.js``), content type and bytes.
+    """
+    stem, extension = os.path.splitext(os.path.basename(path))
+    if extension not in CONTENT_TYPES:
+        raise ValueError(f'{path}: bundles must be .css or .js files')
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    data = (minify_css(text) if extension == '.css' else text).encode('utf-8')
+    return f'{stem}.{content_hash(data)}{extension}', CONTENT_TYPES[extension], data
+
+
+def link_bundles(html, bundles):
+    """Point ``/assets/<name>`` links in ``html`` at the hashed filenames in ``bundles`` ({name: filename})."""
+    def replace(match):
+        filename = bundles.get(match.group(2))
+        if filename is None:
+            return match.group(0)
+        return f'{match.group(1)}{ASSET_URL_PREFIX}{filename}"'
+
+    return ASSET_LINK.sub(replace, html)
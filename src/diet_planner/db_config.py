@@ -0,0 +1,102 @@
+import os
+
+from sqlalchemy.pool import NullPool
+
+
+# Connection settings per deployment model, selected with DB_RUNTIME_PROFILE.
+#
+# serverless: every Vercel/Lambda invocation may land on a fresh or frozen
+#   process, so idle pooled connections are never reused and just pile up on
+#   the database. Connections are opened per request (NullPool) with short
+#   connect and statement timeouts.
+# server: long-running gunicorn workers keep a warm QueuePool, recycle it
+#   before the remote proxy drops idle connections and use TCP keepalives.
+RUNTIME_PROFILES = {
+    'serverless': {
+        'pooled': False,
+        'connect_timeout': 5,
+        'statement_timeout_ms': 10000,
+    },
+    'server': {
+        'pooled': True,
+        'connect_timeout': 10,
+        'statement_timeout_ms': 30000,
+    },
+}
+
+# Set by the platforms that run api.py as a function
+SERVERLESS_ENV_MARKERS = ('VERCEL', 'AWS_LAMBDA_FUNCTION_NAME')
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def runtime_profile():
+    """
+    Resolve DB_RUNTIME_PROFILE: 'serverless', 'server' or 'auto' (the default),
+    which picks serverless when running on Vercel or Lambda.
+    """
+    profile = os.environ.get('DB_RUNTIME_PROFILE', 'auto').strip().lower()
+    if profile == 'auto':
+        return 'serverless' if any(os.environ.get(name) for name in SERVERLESS_ENV_MARKERS) else 'server'
+    if profile not in RUNTIME_PROFILES:
+        raise ValueError(f"Unknown DB_RUNTIME_PROFILE '{profile}', expected one of: auto, {', '.join(RUNTIME_PROFILES)}")
+    return profile
+
+
+def _connect_args(profile):
+    settings = RUNTIME_PROFILES[profile]
+    connect_args = {
+        'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', settings['connect_timeout'])),
+        'application_name': os.environ.get('DB_APPLICATION_NAME', f'diet-planner-{profile}'),
+    }
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', settings['statement_timeout_ms']))
+    if statement_timeout > 0:
+        connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+    if settings['pooled']:
+        # Keep warm connections alive through NATs and the Nile proxy
+        connect_args.update({'keepalives': 1, 'keepalives_idle': 30, 'keepalives_interval': 10, 'keepalives_count': 3})
+    return connect_args
+
+
+def engine_options(database_url, profile=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for ``database_url`` under a runtime profile.
+
+    The server profile sizes its pool from DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING; the
+    serverless profile uses NullPool. Both pass DB_CONNECT_TIMEOUT and
+    DB_STATEMENT_TIMEOUT_MS (0 disables it) to the driver. SQLite gets no
+    options because Flask-SQLAlchemy picks its own pool for it.
+    """
+    if database_url.startswith('sqlite'):
+        return {}
+    profile = profile or runtime_profile()
+    options = {'connect_args': _connect_args(profile)}
+    if not RUNTIME_PROFILES[profile]['pooled']:
+        options['poolclass'] = NullPool
+        return options
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Remote Postgres/proxies drop idle connections; recycle before they do
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    })
+    return options
+
+
+def tenant_scoping_enabled(setting, dialect_name):
+    """
+    Resolve the TENANT_SCOPING setting: 'auto' (the default) scopes only
+    Postgres connections, '1'/'0' force it on or off.
+    """
+    setting = str(setting or 'auto').strip().lower()
+    if setting == 'auto':
+        return dialect_name == 'postgresql'
+    return setting in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,166 @@
+import heapq
+import re
+from collections import Counter
+
+
+# Match types, best first
+EXACT, PREFIX, SUBSTRING, FUZZY = 'exact', 'prefix', 'substring', 'fuzzy'
+
+NGRAM_SIZES = (2, 3)
+# Longer prefixes are answered from this depth and filtered with startswith
+MAX_PREFIX_LENGTH = 10
+# Fuzzy matching only edit-checks the candidates sharing the most trigrams
+FUZZY_CANDIDATES = 200
+
+
+def normalize(text):
+    """Lowercase, turn punctuation/underscores into spaces and collapse runs of spaces."""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).split())
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 once it is known to be larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FoodIndex:
+    """
+    In-memory search index over a ``{key: food}`` mapping, built once.
+
+    Every food is indexed under its key and display name. Lookups go through
+    an exact-term table, a prefix trie over whole terms and their words (kept
+    flat, as a dict from each prefix to its foods, which builds much faster
+    than linked nodes), and a
+    2/3-character n-gram inverted index for substrings; when those return
+    fewer than ``limit`` foods, the trigram index also proposes candidates for
+    an edit-distance check. Results rank exact > prefix > substring > fuzzy.
+
+    Foods get ids in (name length, name) order, so posting lists are already
+    sorted by the tie-break and a query only touches the first ``limit`` ids
+    of each list it needs.
+    """
+
+    def __init__(self, foods):
+        # Only keys and names are kept; foods are looked up in ``foods`` per result,
+        # so a memory-mapped FoodStore is never copied into the index
+        ordered = sorted(((key, food.get('name', key)) for key, food in foods.items()),
+                         key=lambda kv: (len(kv[1]), kv[1].lower()))
+        self.source = foods
+        self.keys = [key for key, _ in ordered]
+        self.terms = []
+        self._exact = {}
+        self._prefixes = {}
+        self._grams = {}
+        for food_id, (key, name) in enumerate(ordered):
+            terms = {normalize(key), normalize(name)} - {''}
+            self.terms.append(sorted(terms))
+            words = set()
+            grams = set()
+            for term in terms:
+                self._exact.setdefault(term, []).append(food_id)
+                words.add(term)
+                words.update(term.split())
+                for n in NGRAM_SIZES:
+                    grams.update(ngrams(term, n))
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(food_id)
+            for word in words:
+                self._insert(word, food_id)
+        # Built on first use, for membership checks while intersecting postings
+        self._gram_sets = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _insert(self, word, food_id):
+        prefixes = self._prefixes
+        for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+            ids = prefixes.get(word[:length])
+            if ids is None:
+                prefixes[word[:length]] = [food_id]
+            elif ids[-1] != food_id:
+                ids.append(food_id)
+
+    def _prefix_ids(self, query):
+        ids = self._prefixes.get(query[:MAX_PREFIX_LENGTH], ())
+        if len(query) <= MAX_PREFIX_LENGTH:
+            return ids
+        return (food_id for food_id in ids
+                if any(word.startswith(query) for term in self.terms[food_id] for word in [term, *term.split()]))
+
+    def _gram_set(self, gram):
+        ids = self._gram_sets.get(gram)
+        if ids is None:
+            ids = self._gram_sets[gram] = frozenset(self._grams[gram])
+        return ids
+
+    def _substring_ids(self, query, seen, limit):
+        n = 3 if len(query) >= 3 else 2
+        grams = sorted(ngrams(query, n), key=lambda gram: len(self._grams.get(gram, ())))
+        if not grams or any(gram not in self._grams for gram in grams):
+            return []
+        rest = [self._gram_set(gram) for gram in grams[1:]]
+        found = []
+        for food_id in self._grams[grams[0]]:
+            if food_id in seen or not all(food_id in ids for ids in rest):
+                continue
+            if any(query in term for term in self.terms[food_id]):
+                found.append(food_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _fuzzy_ids(self, query, seen, limit):
+        max_distance = 1 if len(query) <= 4 else 2
+        overlap = Counter()
+        for gram in ngrams(query, 3 if len(query) >= 3 else 2):
+            overlap.update(self._grams.get(gram, ()))
+        candidates = heapq.nsmallest(FUZZY_CANDIDATES, (food_id for food_id in overlap if food_id not in seen),
+                                     key=lambda food_id: (-overlap[food_id], food_id))
+        scored = []
+        for food_id in candidates:
+            words = set(self.terms[food_id])
+            for term in self.terms[food_id]:
+                words.update(term.split())
+            distance = min(edit_distance(query, word, max_distance) for word in words)
+            if distance <= max_distance:
+                scored.append((distance, food_id))
+        return [food_id for _, food_id in heapq.nsmallest(limit, scored)]
+
+    def search(self, query, limit=20):
+        """Return up to ``limit`` ``(key, food, match)`` tuples for ``query``, best first."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        results = []
+        seen = set()
+
+        def take(ids, match):
+            for food_id in ids:
+                if len(results) >= limit:
+                    return
+                if food_id not in seen:
+                    seen.add(food_id)
+                    results.append((self.keys[food_id], self.source[self.keys[food_id]], match))
+
+        take(self._exact.get(query, ()), EXACT)
+        take(self._prefix_ids(query), PREFIX)
+        if len(results) < limit and len(query) >= 2:
+            take(self._substring_ids(query, seen, limit - len(results)), SUBSTRING)
+        if len(results) < limit and len(query) >= 3:
+            take(self._fuzzy_ids(query, seen, limit - len(results)), FUZZY)
+        return results
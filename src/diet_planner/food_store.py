@@ -0,0 +1,158 @@
+import csv
+import os
+import sys
+import tempfile
+from collections.abc import Mapping
+
+try:
+    import numpy as np
+except ImportError:  # The app falls back to LOCAL_FOOD_DATABASE without NumPy
+    np = None
+
+
+# On-disk layout, written by build_food_store() and memory-mapped read-only:
+#
+#   <path>.npy          structured array, one row per food: byte offsets of the
+#                       key and name in the string table, then one float32
+#                       column per nutrient (NaN where the CSV cell was empty)
+#   <path>.strings.npy  uint8 array holding every key and name as UTF-8
+#
+# Both are plain .npy files, so np.load(mmap_mode='r') maps them without
+# reading them and every gunicorn worker shares the same page-cache pages.
+STRING_FIELDS = [('key_start', '<u4'), ('key_end', '<u4'), ('name_start', '<u4'), ('name_end', '<u4')]
+TEXT_COLUMNS = ('key', 'name')
+
+
+def _parse_number(value):
+    value = (value or '').strip()
+    return float(value) if value else float('nan')
+
+
+def build_food_store(csv_path, store_path):
+    """
+    Convert a CSV with ``key``, ``name`` and numeric nutrient columns into the
+    memory-mapped store at ``store_path``. Returns the number of foods.
+
+    Files are written next to the target and renamed into place, so workers
+    that already mapped the old store keep reading a consistent copy.
+    """
+    if np is None:
+        raise RuntimeError('NumPy is required to build the food store')
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in TEXT_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+        nutrients = [column for column in reader.fieldnames if column not in TEXT_COLUMNS]
+        rows = [row for row in reader if (row.get('key') or '').strip()]
+
+    dtype = np.dtype(STRING_FIELDS + [(column, '<f4') for column in nutrients])
+    table = np.zeros(len(rows), dtype=dtype)
+    strings = bytearray()
+    seen = set()
+    for i, row in enumerate(rows):
+        key = row['key'].strip()
+        if key in seen:
+            raise ValueError(f"Duplicate food key '{key}' in {csv_path}")
+        seen.add(key)
+        for field, text in (('key', key), ('name', (row.get('name') or key).strip())):
+            encoded = text.encode('utf-8')
+            table[i][f'{field}_start'] = len(strings)
+            strings.extend(encoded)
+            table[i][f'{field}_end'] = len(strings)
+        for column in nutrients:
+            try:
+                table[i][column] = _parse_number(row.get(column))
+            except ValueError:
+                raise ValueError(f"Invalid {column} '{row.get(column)}' for food '{key}' in {csv_path}")
+
+    directory = os.path.dirname(os.path.abspath(store_path))
+    os.makedirs(directory, exist_ok=True)
+    for suffix, array in (('.strings.npy', np.frombuffer(bytes(strings), dtype=np.uint8)), ('.npy', table)):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, store_path + suffix)
+    return len(rows)
+
+
+def _plain(value):
+    value = float(value)
+    if value != value:
+        return None
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+class FoodStore(Mapping):
+    """
+    Read-only ``{key: food}`` view over a memory-mapped store.
+
+    Foods are decoded into small dicts shaped like LOCAL_FOOD_DATABASE entries
+    only when looked up; ``column()`` exposes a nutrient as a NumPy array
+    backed by the mapped file.
+    """
+
+    def __init__(self, store_path):
+        self.path = store_path
+        self.table = np.load(store_path + '.npy', mmap_mode='r')
+        self._strings = np.load(store_path + '.strings.npy', mmap_mode='r')
+        self.nutrients = [name for name in self.table.dtype.names if name not in dict(STRING_FIELDS)]
+        self._positions = {self._text(i, 'key'): i for i in range(len(self.table))}
+
+    def _text(self, i, field):
+        row = self.table[i]
+        return bytes(self._strings[row[f'{field}_start']:row[f'{field}_end']]).decode('utf-8')
+
+    def record(self, i):
+        row = self.table[i]
+        food = {'name': self._text(i, 'name')}
+        for column in self.nutrients:
+            food[column] = _plain(row[column])
+        return food
+
+    def column(self, name):
+        return self.table[name]
+
+    def __getitem__(self, key):
+        return self.record(self._positions[key])
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+
+def open_food_store(csv_path, store_path):
+    """
+    Map the store at ``store_path``, rebuilding it first when ``csv_path`` is
+    newer. Returns None (and the caller keeps its built-in foods) when NumPy
+    is missing or neither file is usable.
+    """
+    if np is None:
+        print("NumPy is not installed; using the built-in food database")
+        return None
+    try:
+        store_file = store_path + '.npy'
+        if os.path.exists(csv_path) and (not os.path.exists(store_file)
+                                         or os.path.getmtime(csv_path) > os.path.getmtime(store_file)):
+            try:
+                count = build_food_store(csv_path, store_path)
+            except OSError:
+                # Read-only deploys (e.g. Vercel) build into the temp dir instead
+                store_path = os.path.join(tempfile.gettempdir(), os.path.basename(store_path))
+                count = build_food_store(csv_path, store_path)
+            print(f"Built food store with {count} foods at {store_path}")
+        if not os.path.exists(store_path + '.npy'):
+            return None
+        return FoodStore(store_path)
+    except (OSError, ValueError) as e:
+        print(f"Food store unavailable, using the built-in food database: {e}")
+        return None
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python food_store.py <foods.csv> <store path without extension>')
+    print(f"Wrote {build_food_store(sys.argv[1], sys.argv[2])} foods to {sys.argv[2]}.npy")
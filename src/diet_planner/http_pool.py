@@ -0,0 +1,152 @@
+import http.client
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Statuses worth another attempt; anything else is returned to the caller as-is
+RETRY_STATUSES = (429, 502, 503, 504)
+# Methods that may be sent again once the server could have acted on them.
+# Others (e.g. the paid POST lookups) are only retried when the request never
+# reached the server: it could not connect, or a stale keep-alive socket was
+# closed before any response.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class HTTPPoolError(Exception):
+    """Raised when a request still fails after every retry."""
+
+
+class PooledResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class HTTPPool:
+    """
+    Thread-safe pool of keep-alive connections to one HTTP(S) origin.
+
+    Connections are reused across requests (and gunicorn threads), so only
+    the first request per connection pays for the TCP and TLS handshakes.
+    ``connect_timeout`` bounds opening a connection, ``read_timeout`` every
+    wait for the server afterwards, and ``total_timeout`` the whole call,
+    retries and backoff included. Connection errors are retried up to
+    ``retries`` times with exponential backoff; timeouts and RETRY_STATUSES
+    only for IDEMPOTENT_METHODS. A pooled connection the server already
+    closed is replaced without using up a retry.
+    """
+
+    def __init__(self, base_url, max_connections=10, connect_timeout=5, read_timeout=30, retries=2, backoff=0.5,
+                 total_timeout=40):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'Unsupported base URL: {base_url}')
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.total_timeout = total_timeout
+        self._idle = queue.LifoQueue(maxsize=max_connections)
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'retries': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _open(self, remaining):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        conn = connection_class(self.host, self.port, timeout=min(self.connect_timeout, remaining))
+        conn.connect()
+        self._count('connections')
+        return conn
+
+    def _checkout(self, remaining):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._open(remaining), False
+
+    def _checkin(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _send(self, conn, method, path, body, headers, remaining):
+        conn.sock.settimeout(min(self.read_timeout, remaining))
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        if response.will_close:
+            conn.close()
+        else:
+            self._checkin(conn)
+        return PooledResponse(response.status, dict(response.getheaders()), data)
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request to ``path`` (relative to the base URL) and return its PooledResponse."""
+        path = self.base_path + path
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        deadline = time.monotonic() + self.total_timeout
+        last_error = None
+        attempts = 0
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                if time.monotonic() + delay >= deadline:
+                    break
+                self._count('retries')
+                time.sleep(delay)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            attempts += 1
+            try:
+                conn, reused = self._checkout(remaining)
+            except (OSError, http.client.HTTPException) as e:
+                # Nothing was sent, so any method may try again
+                last_error = e
+                continue
+            try:
+                self._count('requests')
+                try:
+                    response = self._send(conn, method, path, body, headers or {}, remaining)
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection before answering; that is not a failed attempt
+                    conn.close()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout()
+                    conn = self._open(remaining)
+                    response = self._send(conn, method, path, body, headers or {}, remaining)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                last_error = e if not isinstance(e, socket.timeout) else TimeoutError(f'No response within {self.read_timeout}s')
+                if not idempotent:
+                    # The server may have acted on it; sending it again could bill it twice
+                    break
+                continue
+            if response.status in RETRY_STATUSES and idempotent and attempt < self.retries:
+                last_error = HTTPPoolError(f'HTTP {response.status}')
+                continue
+            return response
+        raise HTTPPoolError(f'{method} {self.scheme}://{self.host}{path} failed after {attempts} attempts: {last_error}')
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from flask import send_file
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # Originals are still served, just never resized or converted
+    Image = None
+
+
+# Requested widths are rounded up to one of these, so arbitrary ?w= values
+# cannot fill the cache with a file per pixel count
+WIDTHS = (64, 128, 256, 384, 512, 768, 1024, 1280, 1600, 1920, 2560)
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+# Modern formats in order of preference for ?format=auto (the default)
+AUTO_FORMATS = ('avif', 'webp')
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+
+
+def snap_width(width):
+    """The smallest standard width that is at least ``width``."""
+    return next((standard for standard in WIDTHS if standard >= width), WIDTHS[-1])
+
+
+def sniff_mimetype(path):
+    """image/svg+xml for SVG files whatever their extension (logo.png is one), else None to guess."""
+    with open(path, 'rb') as f:
+        head = f.read(256).lstrip()
+    if head.startswith(b'<svg') or (head.startswith(b'<?xml') and b'<svg' in head):
+        return 'image/svg+xml'
+    return None
+
+
+def parse_width(value):
+    if value is None or value == '':
+        return None
+    try:
+        width = int(value)
+    except ValueError:
+        raise ValueError('w must be a whole number of pixels')
+    if width <= 0:
+        raise ValueError('w must be positive')
+    return snap_width(width)
+
+
+class ImageVariants:
+    """
+    Serves the images in ``source_dir`` as resized WebP/AVIF/JPEG/PNG variants.
+
+    ``?w=`` is rounded up to a standard width (never larger than the original)
+    and ``?format=`` picks the encoding; ``auto`` takes the best modern format
+    the browser lists in Accept. A variant is encoded on first request and
+    written to ``cache_dir`` under a hash of the file, its mtime/size, the
+    width and the format, so editing an image produces new variants and the
+    hash doubles as a strong ETag. Without either parameter, or when Pillow
+    is missing or cannot read the file (e.g. an SVG), the original is sent.
+    """
+
+    def __init__(self, source_dir, cache_dir, max_age=7 * 24 * 3600):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def formats(self):
+        if Image is None:
+            return []
+        return [name for name in MIMETYPES if name not in AUTO_FORMATS or features.check(name)]
+
+    def choose_format(self, requested, accept_mimetypes):
+        """The output format for ``?format=``, or None to keep the original encoding."""
+        requested = FORMAT_ALIASES.get((requested or 'auto').lower(), (requested or 'auto').lower())
+        available = self.formats()
+        if requested == 'auto':
+            # Wildcards do not count: image/* says nothing about AVIF support
+            accepted = {value for value, quality in accept_mimetypes if quality > 0}
+            return next((name for name in AUTO_FORMATS if name in available and MIMETYPES[name] in accepted), None)
+        if requested == 'original':
+            return None
+        if requested not in MIMETYPES:
+            raise ValueError(f"format must be one of: auto, original, {', '.join(MIMETYPES)}")
+        return requested if requested in available else None
+
+    def _lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _cache_directory(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            # Read-only deploys (e.g. Vercel) cache in the temp dir instead
+            self.cache_dir = os.path.join(tempfile.gettempdir(), os.path.basename(self.cache_dir))
+            os.makedirs(self.cache_dir, exist_ok=True)
+        return self.cache_dir
+
+    def _encode(self, source, target, width, format):
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            width = min(width or image.width, image.width)
+            if width < image.width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            if format == 'jpeg' and image.mode != 'RGB':
+                background = Image.new('RGB', image.size, 'white')
+                image = image.convert('RGBA')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                image = image.convert('RGBA')
+            directory = os.path.dirname(target)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, format=format.upper(), quality=QUALITY.get(format, 90), optimize=format != 'avif')
+                os.replace(tmp_path, target)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def variant(self, filename, source, width, format):
+        """Path and ETag of the cached variant, encoding it first if needed."""
+        stat = os.stat(source)
+        key = f'{filename}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{format}'
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]
+        target = os.path.join(self._cache_directory(), f'{digest}.{format}')
+        if not os.path.exists(target):
+            # One encode per variant even when a page load asks for it many times at once
+            with self._lock(digest):
+                if not os.path.exists(target):
+                    self._encode(source, target, width, format)
+        return target, digest
+
+    def response(self, filename, request):
+        """
+        The Flask response for ``filename``, or None if there is no such image.
+        Raises ValueError for an invalid ``w`` or ``format``.
+        """
+        source = safe_join(self.source_dir, filename)
+        if source is None or not os.path.isfile(source):
+            return None
+        width = parse_width(request.args.get('w'))
+        has_options = width is not None or 'format' in request.args
+        format = self.choose_format(request.args.get('format'), request.accept_mimetypes) if has_options else None
+        if has_options and Image is not None:
+            if format is None:
+                # Keep the source encoding, resized
+                try:
+                    with Image.open(source) as image:
+                        format = FORMAT_ALIASES.get((image.format or '').lower(), (image.format or '').lower())
+                except (UnidentifiedImageError, OSError):
+                    format = None
+                if format not in MIMETYPES:
+                    format = None
+            if format is not None:
+                try:
+                    path, etag = self.variant(filename, source, width, format)
+                except (UnidentifiedImageError, OSError) as e:
+                    print(f"Could not make a {format} variant of {filename}, sending the original: {e}")
+                else:
+                    response = send_file(path, mimetype=MIMETYPES[format], etag=etag,
+                                         max_age=self.max_age, conditional=True)
+                    if (request.args.get('format') or 'auto').lower() == 'auto':
+                        response.vary.add('Accept')
+                    return response
+        return send_file(source, mimetype=sniff_mimetype(source), max_age=self.max_age, conditional=True)
@@ -0,0 +1,260 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobQueue:
+    """
+    Persistent queue of background jobs in a SQLite file, shared by every
+    gunicorn worker and any separate ``flask run-jobs`` process.
+
+    A worker claims the oldest runnable job by taking a lease on it. Jobs
+    whose lease runs out (the worker was killed or restarted mid-job) are
+    claimed again, up to ``max_attempts`` runs in total, so queued and
+    interrupted work survives restarts. A late result from an expired lease
+    is ignored. Finished jobs are kept for ``retention`` seconds so clients
+    can still collect them.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3, retention=86400, poll_interval=0.5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        # Wakes waiters in this process at once; other processes are seen by polling
+        self._changed = threading.Condition()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+        except (OSError, sqlite3.Error) as e:
+            # Read-only filesystems (e.g. serverless) fall back to the temp dir
+            print(f"Job queue unavailable at {self.path}: {e}")
+            self.path = os.path.join(tempfile.gettempdir(), os.path.basename(self.path))
+            conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                user_id INTEGER,
+                status TEXT NOT NULL,
+                result TEXT,
+                status_code INTEGER,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_token TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+        """)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait_for_change(self, timeout):
+        """Sleep until a job is queued or finished in this process, at most ``timeout`` seconds."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def enqueue(self, kind, payload, user_id=None, job_id=None):
+        """Queue a ``kind`` job with a JSON-serializable payload and return its id."""
+        job_id = job_id or uuid.uuid4().hex
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, payload, user_id, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, json.dumps(payload), user_id, QUEUED, time.time())
+        )
+        self._notify()
+        return job_id
+
+    def claim(self):
+        """
+        Lease the oldest runnable job. Returns the job dict, with its
+        ``lease_token``, or None when there is nothing to do.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_token = NULL '
+                'WHERE status = ? AND lease_expires_at < ? AND attempts >= ?',
+                (FAILED, 'Job did not finish before its lease expired', now, RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_token = ?, lease_expires_at = ?, '
+                'started_at = ? WHERE id = ('
+                '  SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_expires_at < ?) '
+                '  ORDER BY created_at LIMIT 1'
+                ') RETURNING *',
+                (RUNNING, token, now + self.lease_seconds, now, QUEUED, RUNNING, now)
+            ).fetchone()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return self._to_dict(row, include_lease=True) if row else None
+
+    def _finish(self, job, status, result=None, status_code=None, error=None):
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, result = ?, status_code = ?, error = ?, finished_at = ?, '
+            'lease_token = NULL WHERE id = ? AND lease_token = ?',
+            (status, None if result is None else json.dumps(result), status_code, error, time.time(),
+             job['id'], job['lease_token'])
+        )
+        self._notify()
+        return cursor.rowcount == 1
+
+    def complete(self, job, result, status_code=200):
+        """Store a claimed job's result. False if its lease expired and it was claimed again."""
+        return self._finish(job, SUCCEEDED, result=result, status_code=status_code)
+
+    def fail(self, job, error):
+        return self._finish(job, FAILED, error=error)
+
+    def get(self, job_id):
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def wait(self, job_id, timeout):
+        """The job once its state changes (or it has finished), or as it is after ``timeout`` seconds."""
+        job = self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while job and job['status'] not in FINISHED:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.wait_for_change(min(remaining, self.poll_interval))
+            current = self.get(job_id)
+            if current != job:
+                return current
+        return job
+
+    def purge(self):
+        """Delete finished jobs older than ``retention``. Returns how many were removed."""
+        cursor = self._connect().execute(
+            'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+            (SUCCEEDED, FAILED, time.time() - self.retention)
+        )
+        return cursor.rowcount
+
+    def stats(self):
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    @staticmethod
+    def _to_dict(row, include_lease=False):
+        job = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'user_id': row['user_id'],
+            'status': row['status'],
+            'result': None if row['result'] is None else json.loads(row['result']),
+            'status_code': row['status_code'],
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+        }
+        if include_lease:
+            job['lease_token'] = row['lease_token']
+        return job
+
+
+class JobWorkerPool:
+    """
+    Threads that claim jobs from ``queue`` and run ``handlers[job['kind']](payload)``,
+    which returns ``(result, status_code)``. An exception fails the job.
+    """
+
+    def __init__(self, queue, handlers, workers=2, idle_interval=1.0, purge_interval=300):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.idle_interval = idle_interval
+        self.purge_interval = purge_interval
+        self._last_purge = 0
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def run_once(self):
+        """Claim and run one job. Returns False when the queue had nothing runnable."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+        handler = self.handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind '{job['kind']}'")
+            result, status_code = handler(job['payload'])
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            self.queue.fail(job, str(e))
+        else:
+            if not self.queue.complete(job, result, status_code):
+                print(f"Job {job['id']} finished after its lease expired; keeping the newer run")
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+                if time.monotonic() - self._last_purge > self.purge_interval:
+                    self._last_purge = time.monotonic()
+                    self.queue.purge()
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            self.queue.wait_for_change(self.idle_interval)
+
+    def start(self):
+        """Start the worker threads once; later calls do nothing."""
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.queue._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
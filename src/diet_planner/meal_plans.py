@@ -0,0 +1,183 @@
+import concurrent.futures
+import json
+import random
+import re
+import time
+
+from .ai_executor import AIExecutorBusy
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MEAL_SLOTS = ['breakfast', 'lunch', 'dinner', 'snack']
+
+# Calorie targets are rounded to this step before hitting Gemini or the cache
+CALORIE_BUCKET_SIZE = 100
+
+SCALABLE_FIELDS = ['calories', 'protein', 'carbs', 'fat']
+
+# Days of one plan that may be in the shared AI executor at once. All seven by
+# default: every day shares one deadline, so running them in waves multiplies
+# latency and times out the later days. The executor's own worker and queue
+# bounds keep plans from starving the chatbot and recipe routes.
+DAY_CONCURRENCY = len(DAYS)
+
+
+def _normalize_list(values):
+    if isinstance(values, str):
+        values = values.split(',')
+    return sorted({' '.join(str(v).lower().split()) for v in values or [] if str(v).strip()})
+
+
+def bucket_calories(calorie_target):
+    try:
+        calories = float(calorie_target)
+    except (TypeError, ValueError):
+        calories = 2000
+    return max(CALORIE_BUCKET_SIZE, int(round(calories / CALORIE_BUCKET_SIZE)) * CALORIE_BUCKET_SIZE)
+
+
+def plan_bucket(goal, calorie_target, diet_preference, non_veg_preference, allergies, medical_conditions):
+    """
+    Normalize diet plan inputs into the bucket used as the cache key.
+
+    Two requests that only differ in calorie target within the same 100 kcal
+    step, list ordering or letter case share a generated plan.
+    """
+    return {
+        'goal': str(goal or 'maintain').strip().lower(),
+        'calories': bucket_calories(calorie_target),
+        'diet_preference': str(diet_preference or 'balanced').strip().lower(),
+        'non_veg': bool(non_veg_preference),
+        'allergies': _normalize_list(allergies),
+        'medical_conditions': _normalize_list(medical_conditions)
+    }
+
+
+def scale_plan(plan, factor):
+    """Return a copy of ``plan`` with every meal's macros scaled by ``factor``."""
+    if not isinstance(plan, dict) or abs(factor - 1) < 0.005:
+        return plan
+    scaled = {}
+    for day, meals in plan.items():
+        if not isinstance(meals, dict):
+            scaled[day] = meals
+            continue
+        scaled[day] = {}
+        for slot, items in meals.items():
+            if not isinstance(items, list):
+                scaled[day][slot] = items
+                continue
+            scaled_items = []
+            for item in items:
+                if isinstance(item, dict):
+                    item = dict(item)
+                    for field in SCALABLE_FIELDS:
+                        value = item.get(field)
+                        if isinstance(value, (int, float)) and not isinstance(value, bool):
+                            item[field] = round(value * factor) if field == 'calories' else round(value * factor, 1)
+                scaled_items.append(item)
+            scaled[day][slot] = scaled_items
+    return scaled
+
+
+def describe_preferences(bucket):
+    """Prompt fragment describing the bucket's goal, calories and restrictions."""
+    food_type = "non-vegetarian" if bucket['non_veg'] else "vegetarian"
+    allergen_info = f" avoiding: {', '.join(bucket['allergies'])}" if bucket['allergies'] else ""
+    medical_info = f" with considerations for: {', '.join(bucket['medical_conditions'])}" if bucket['medical_conditions'] else ""
+    return (f"Goal: {bucket['goal']}, Target calories: ~{bucket['calories']} kcal per day, Diet type: {food_type}, "
+            f"Preference: {bucket['diet_preference']}{allergen_info}{medical_info}.")
+
+
+def build_day_prompt(day, bucket):
+    day_number = DAYS.index(day) + 1
+    return f"""
+        Generate a Pakistani meal plan for {day.capitalize()} (day {day_number} of a 7-day plan) with breakfast, lunch, dinner, and a snack.
+        {describe_preferences(bucket)}
+        Pick dishes that suit {day.capitalize()} so the week has variety rather than the same meals every day.
+        Structure the response as a JSON object with breakfast, lunch, dinner, and snack keys, each holding an array of meal objects.
+        Each meal object should include: name, calories (integer), protein (in grams), carbs (in grams), fat (in grams), description.
+        Example:
+        {{
+          "breakfast": [
+            {{"name": "meal name", "calories": 300, "protein": 12, "carbs": 35, "fat": 8, "description": "detailed description"}}
+          ],
+          "lunch": [...],
+          "dinner": [...],
+          "snack": [...]
+        }}
+        Return ONLY the JSON object with no additional text.
+        """
+
+
+def parse_json_response(text):
+    """Parse a Gemini answer that may wrap its JSON in a ```json code block."""
+    raw = (text or '').strip()
+    json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', raw, re.DOTALL)
+    if json_match:
+        raw = json_match.group(1).strip()
+    return json.loads(raw)
+
+
+def fallback_day(recommendations):
+    return {slot: [random.choice(recommendations[slot])] for slot in MEAL_SLOTS}
+
+
+def _parse_day(response):
+    day_plan = parse_json_response(response.text if response and hasattr(response, 'text') else '')
+    if not isinstance(day_plan, dict) or not all(isinstance(day_plan.get(slot), list) for slot in MEAL_SLOTS):
+        raise ValueError('day plan is missing meal slots')
+    return {slot: day_plan[slot] for slot in MEAL_SLOTS}
+
+
+def generate_plan_by_day(model, executor, bucket, recommendations, timeout=30, max_concurrent=DAY_CONCURRENCY):
+    """
+    Generate the week as seven one-day requests, at most ``max_concurrent``
+    of them in ``executor`` at a time; the next day is submitted as soon as
+    one finishes.
+
+    Returns ``(plan, fallback_days)``. Days whose request fails, returns
+    malformed JSON, is rejected by a full executor or misses the shared
+    deadline are filled from ``recommendations``; the other days keep
+    their AI output.
+    """
+    deadline = time.monotonic() + timeout
+    waiting = list(DAYS)
+    futures = {}
+    running = set()
+    while waiting:
+        while waiting and len(running) < max_concurrent:
+            day = waiting.pop(0)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                futures[day] = executor.submit(
+                    model.generate_content, build_day_prompt(day, bucket),
+                    timeout=remaining, request_options={'timeout': remaining}
+                )
+            except AIExecutorBusy:
+                continue
+            running.add(futures[day])
+        remaining = deadline - time.monotonic()
+        if not running or remaining <= 0:
+            break
+        _, running = concurrent.futures.wait(running, timeout=remaining,
+                                             return_when=concurrent.futures.FIRST_COMPLETED)
+
+    concurrent.futures.wait(running, timeout=max(0, deadline - time.monotonic()))
+
+    plan = {}
+    fallback_days = []
+    for day in DAYS:
+        future = futures.get(day)
+        try:
+            if future is None or not future.done():
+                raise concurrent.futures.TimeoutError(f'{day} was not generated in time')
+            plan[day] = _parse_day(future.result())
+        except Exception as e:
+            print(f"Falling back for {day}: {e}")
+            if future is not None:
+                future.cancel()
+            plan[day] = fallback_day(recommendations)
+            fallback_days.append(day)
+    return plan, fallback_days
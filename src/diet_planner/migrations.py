@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+# Versioned schema changes applied on top of db.create_all().
+#
+# create_all() only creates missing tables, so anything that alters an existing
+# table (indexes, backfills, new columns) belongs here. Each migration lists its
+# statements per dialect; 'default' is used when the dialect has no entry.
+# Postgres statements run in autocommit mode so CREATE INDEX CONCURRENTLY can
+# build indexes without blocking writes to the table.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'name': 'nutrition_entry_user_date_indexes',
+        'postgresql': [
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nutrition_entry_user_date '
+            'ON nutrition_entry (user_id, date)',
+            # Covers the history/summary aggregates with an index-only scan
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nutrition_entry_user_date_macros '
+            'ON nutrition_entry (user_id, date) INCLUDE (meal_type, calories, protein, carbs, fat)',
+        ],
+        'default': [
+            'CREATE INDEX IF NOT EXISTS ix_nutrition_entry_user_date '
+            'ON nutrition_entry (user_id, date)',
+            'CREATE INDEX IF NOT EXISTS ix_nutrition_entry_user_date_macros '
+            'ON nutrition_entry (user_id, date, meal_type, calories, protein, carbs, fat)',
+        ],
+    },
+]
+
+def rebuild_daily_nutrition_summary(conn, user_id=None):
+    """
+    Recompute the daily_nutrition_summary rollup from nutrition_entry.
+
+    Rebuilds every user, or only ``user_id``. Run it inside a transaction so
+    readers never see the table half-empty. Returns the number of rollup rows.
+    """
+    user_filter = ' WHERE user_id = :user_id' if user_id is not None else ''
+    params = {'user_id': user_id} if user_id is not None else {}
+    conn.execute(text('DELETE FROM daily_nutrition_summary' + user_filter), params)
+    result = conn.execute(text(
+        'INSERT INTO daily_nutrition_summary (user_id, date, meal_type, calories, protein, carbs, fat, entry_count) '
+        'SELECT user_id, date, meal_type, SUM(calories), SUM(protein), SUM(carbs), SUM(fat), COUNT(*) '
+        'FROM nutrition_entry' + user_filter + ' GROUP BY user_id, date, meal_type'
+    ), params)
+    return result.rowcount
+
+
+def _create_and_backfill_daily_summary(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS daily_nutrition_summary ('
+        'user_id INTEGER NOT NULL REFERENCES "user" (id), '
+        'date DATE NOT NULL, '
+        'meal_type VARCHAR(20) NOT NULL, '
+        'calories INTEGER NOT NULL DEFAULT 0, '
+        'protein FLOAT NOT NULL DEFAULT 0, '
+        'carbs FLOAT NOT NULL DEFAULT 0, '
+        'fat FLOAT NOT NULL DEFAULT 0, '
+        'entry_count INTEGER NOT NULL DEFAULT 0, '
+        'PRIMARY KEY (user_id, date, meal_type))'
+    ))
+    # The migration connection is in autocommit mode; rebuild in one real transaction
+    with conn.engine.begin() as tx:
+        if tx.dialect.name == 'postgresql':
+            # A fresh pooled connection, so lift the profile's statement timeout here too
+            tx.execute(text('SET LOCAL statement_timeout = 0'))
+        rebuild_daily_nutrition_summary(tx)
+
+
+MIGRATIONS.append({
+    'version': 2,
+    'name': 'daily_nutrition_summary_backfill',
+    'default': [_create_and_backfill_daily_summary],
+})
+
+
+# Arbitrary constant identifying this app's migration lock in pg_advisory_lock
+MIGRATION_LOCK_ID = 74201
+
+
+def _statements(migration, dialect):
+    statements = migration.get(dialect, migration.get('default', []))
+    return [statements] if isinstance(statements, str) else statements
+
+
+def run_migrations(engine):
+    """
+    Apply pending migrations and record them in ``schema_migrations``.
+
+    Safe to call from every worker at startup: on Postgres the run is
+    serialized with an advisory lock, and every statement is idempotent.
+    Returns the list of versions applied by this call.
+    """
+    dialect = engine.dialect.name
+    applied_now = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if dialect == 'postgresql':
+            # The runtime profiles set a statement_timeout for request queries. A
+            # CREATE INDEX CONCURRENTLY cancelled by it leaves an INVALID index that
+            # IF NOT EXISTS then skips forever, so migrations run without one.
+            conn.execute(text('SET statement_timeout = 0'))
+            conn.execute(text('SELECT pg_advisory_lock(:lock_id)'), {'lock_id': MIGRATION_LOCK_ID})
+        try:
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS schema_migrations ('
+                'version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+            ))
+            applied = {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+            for migration in sorted(MIGRATIONS, key=lambda m: m['version']):
+                if migration['version'] in applied:
+                    continue
+                print(f"Applying migration {migration['version']}: {migration['name']}")
+                for statement in _statements(migration, dialect):
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(text(statement))
+                try:
+                    conn.execute(
+                        text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                        {'version': migration['version'], 'name': migration['name'], 'applied_at': datetime.utcnow()}
+                    )
+                except IntegrityError:
+                    # Another worker applied and recorded it at the same time (SQLite has no advisory lock)
+                    continue
+                applied_now.append(migration['version'])
+        finally:
+            if dialect == 'postgresql':
+                conn.execute(text('SELECT pg_advisory_unlock(:lock_id)'), {'lock_id': MIGRATION_LOCK_ID})
+                # This connection goes back to the pool; give request queries their timeout back
+                conn.execute(text('RESET statement_timeout'))
+    return applied_now
@@ -0,0 +1,180 @@
+import csv
+import os
+
+try:
+    import numpy as np
+except ImportError:  # Entries then keep their client-supplied macros
+    np = None
+
+
+MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+# Units every food supports, in grams per unit. Volumes assume water density
+# unless the portion table has a food-specific weight.
+GENERIC_UNIT_GRAMS = {
+    'g': 1.0,
+    'kg': 1000.0,
+    'oz': 28.35,
+    'lb': 453.592,
+    'ml': 1.0,
+    'l': 1000.0,
+    'tsp': 5.0,
+    'tbsp': 15.0,
+    'cup': 240.0,
+    'plate': 300.0,
+}
+# One serving/piece is the food's serving_g; 'roti' only exists in the portion table
+SERVING_UNITS = ('serving', 'piece')
+UNITS = tuple(GENERIC_UNIT_GRAMS) + SERVING_UNITS + ('roti',)
+# Largest quantity one item may ask for, in any unit; also keeps the macros
+# well inside what int()/float columns can hold
+MAX_QUANTITY = 10000
+
+UNIT_ALIASES = {
+    'gram': 'g', 'grams': 'g', 'gm': 'g', 'kilogram': 'kg', 'kgs': 'kg',
+    'liter': 'l', 'litre': 'l', 'milliliter': 'ml', 'millilitre': 'ml',
+    'tablespoon': 'tbsp', 'teaspoon': 'tsp', 'cups': 'cup', 'plates': 'plate',
+    'pieces': 'piece', 'pcs': 'piece', 'pc': 'piece', 'servings': 'serving', 'rotis': 'roti',
+}
+
+
+def normalize_unit(unit):
+    unit = str(unit or '').strip().lower()
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def load_portions(path):
+    """Read ``key,unit,grams`` rows from the portion table CSV, or nothing if it is missing."""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['key'].strip(), normalize_unit(row['unit']), float(row['grams']))
+                for row in csv.DictReader(f) if (row.get('key') or '').strip()]
+
+
+def _columns(foods, names):
+    """Food columns as float arrays; reads a FoodStore's mapped columns directly."""
+    if hasattr(foods, 'column'):
+        return {name: (np.asarray(foods.column(name), dtype=float) if name in foods.nutrients
+                       else np.full(len(foods), np.nan)) for name in names}
+    values = {name: [] for name in names}
+    for food in foods.values():
+        for name in names:
+            value = food.get(name)
+            values[name].append(np.nan if value is None else value)
+    return {name: np.asarray(column, dtype=float) for name, column in values.items()}
+
+
+class MacroCalculator:
+    """
+    Computes entry macros from a food, a quantity and a unit.
+
+    Per-serving values and ``serving_g`` from the food data are turned into a
+    per-100g matrix once, and every (food, unit) pair gets its weight in a
+    grams table: generic units for all foods, serving/piece from serving_g,
+    then food-specific rows from the portion table (a cup of rice, a plate of
+    biryani, one roti). A batch is a few array lookups and one multiply, so a
+    day's log or a bulk import is computed in one pass.
+    """
+
+    def __init__(self, foods, portions=()):
+        self.foods = foods
+        self.keys = list(foods)
+        self._positions = {key: i for i, key in enumerate(self.keys)}
+        columns = _columns(foods, MACROS + ('serving_g',))
+        serving_g = columns['serving_g']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.per_100g = np.column_stack([columns[macro] for macro in MACROS]) * 100 / serving_g[:, None]
+
+        self._unit_codes = {unit: code for code, unit in enumerate(UNITS)}
+        self.unit_grams = np.full((len(self.keys), len(UNITS)), np.nan)
+        for unit, grams in GENERIC_UNIT_GRAMS.items():
+            self.unit_grams[:, self._unit_codes[unit]] = grams
+        for unit in SERVING_UNITS:
+            self.unit_grams[:, self._unit_codes[unit]] = serving_g
+        for key, unit, grams in portions:
+            if key in self._positions and unit in self._unit_codes:
+                self.unit_grams[self._positions[key], self._unit_codes[unit]] = grams
+
+    def name(self, food_id):
+        return self.foods[food_id].get('name', food_id)
+
+    def calculate(self, food_ids, quantities, units):
+        """
+        Vectorized core. Returns ``(grams, macros, errors)``: grams per item,
+        an (n, 4) array in MACROS order, and an error message or None per item.
+        """
+        count = len(food_ids)
+        positions = np.fromiter((self._positions.get(str(food_id), -1) for food_id in food_ids), dtype=np.int64, count=count)
+        unit_codes = np.fromiter((self._unit_codes.get(normalize_unit(unit), -1) for unit in units), dtype=np.int64, count=count)
+        quantities = np.asarray(quantities, dtype=float)
+
+        known = (positions >= 0) & (unit_codes >= 0)
+        grams = np.full(count, np.nan)
+        grams[known] = quantities[known] * self.unit_grams[positions[known], unit_codes[known]]
+        macros = grams[:, None] * self.per_100g[np.where(known, positions, 0)] / 100
+
+        errors = [None] * count
+        for i in np.flatnonzero(~known | np.isnan(grams) | np.isnan(macros).any(axis=1)):
+            if positions[i] < 0:
+                errors[i] = f"Unknown food '{food_ids[i]}'"
+            elif unit_codes[i] < 0:
+                errors[i] = f"Unknown unit '{units[i]}'"
+            elif np.isnan(self.per_100g[positions[i]]).any():
+                errors[i] = f"{self.name(food_ids[i])} has no serving weight to calculate from"
+            else:
+                errors[i] = f"'{units[i]}' is not a known portion of {self.name(food_ids[i])}"
+        return grams, macros, errors
+
+    def calculate_items(self, items):
+        """
+        Calculate a batch of ``{'food_id', 'quantity', 'unit'}`` dicts.
+
+        Returns one dict per item: the normalized inputs, ``grams`` and the
+        macros rounded like NutritionEntry stores them, or ``{'error': ...}``.
+        """
+        results = [None] * len(items)
+        batch = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or item.get('food_id') is None:
+                results[index] = {'error': 'food_id is required'}
+                continue
+            try:
+                quantity = float(item.get('quantity', 1))
+            except (TypeError, ValueError):
+                quantity = -1
+            if not (np.isfinite(quantity) and quantity > 0):
+                results[index] = {'error': 'quantity must be a positive number'}
+                continue
+            if quantity > MAX_QUANTITY:
+                results[index] = {'error': f'quantity must be at most {MAX_QUANTITY}'}
+                continue
+            batch.append((index, str(item['food_id']), quantity, item.get('unit') or 'serving'))
+
+        if batch:
+            indexes, food_ids, quantities, units = zip(*batch)
+            grams, macros, errors = self.calculate(food_ids, quantities, units)
+            for row, index in enumerate(indexes):
+                if errors[row]:
+                    results[index] = {'error': errors[row]}
+                    continue
+                results[index] = {
+                    'food_id': food_ids[row],
+                    'food_name': self.name(food_ids[row]),
+                    'quantity': quantities[row],
+                    'unit': normalize_unit(units[row]),
+                    'grams': round(float(grams[row]), 1),
+                    'calories': int(round(macros[row, 0])),
+                    'protein': round(float(macros[row, 1]), 1),
+                    'carbs': round(float(macros[row, 2]), 1),
+                    'fat': round(float(macros[row, 3]), 1),
+                }
+        return results
+
+
+def create_calculator(foods, portions_path):
+    """MacroCalculator over ``foods``, or None when NumPy is not installed."""
+    if np is None:
+        print("NumPy is not installed; nutrition entries keep client-supplied macros")
+        return None
+    return MacroCalculator(foods, load_portions(portions_path))
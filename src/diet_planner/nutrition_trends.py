@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+
+TREND_BUCKETS = ('day', 'week', 'month')
+
+# Days of history needed before the range so the first rolling window is full
+ROLLING_LOOKBACK_DAYS = 29
+
+# Per-dialect SQL fragments: an integer day number for RANGE windows, and the
+# first day of each bucket (weeks start on Monday on both databases)
+DIALECT_SQL = {
+    'postgresql': {
+        'day_number': "(date - DATE '1970-01-01')",
+        'day': 'date',
+        'week': "CAST(date_trunc('week', date) AS DATE)",
+        'month': "CAST(date_trunc('month', date) AS DATE)",
+    },
+    'sqlite': {
+        'day_number': 'CAST(julianday(date) AS INTEGER)',
+        'day': 'date',
+        'week': "date(date, 'weekday 0', '-6 days')",
+        'month': "date(date, 'start of month')",
+    },
+}
+
+
+def trends_query(dialect, bucket):
+    """
+    Build the trends SQL for ``dialect`` and ``bucket``.
+
+    Daily totals come from the rollup. Rolling 7/30-day averages are window
+    sums over a RANGE of calendar days divided by the window length, so days
+    with nothing logged count as zero. Each bucket reports the rolling values
+    as of its last logged day.
+    """
+    fragments = DIALECT_SQL.get(dialect, DIALECT_SQL['sqlite'])
+    return text(f"""
+        WITH daily AS (
+            SELECT date,
+                   SUM(calories) AS calories,
+                   SUM(protein) AS protein,
+                   SUM(carbs) AS carbs,
+                   SUM(fat) AS fat,
+                   SUM(entry_count) AS entry_count
+            FROM daily_nutrition_summary
+            WHERE user_id = :user_id AND date >= :lookback_start AND date <= :end
+            GROUP BY date
+        ),
+        windowed AS (
+            SELECT date, calories, protein, carbs, fat, entry_count,
+                   {fragments[bucket]} AS bucket,
+                   SUM(calories) OVER (ORDER BY {fragments['day_number']}
+                                       RANGE BETWEEN 6 PRECEDING AND CURRENT ROW) / 7.0 AS rolling_7,
+                   SUM(calories) OVER (ORDER BY {fragments['day_number']}
+                                       RANGE BETWEEN 29 PRECEDING AND CURRENT ROW) / 30.0 AS rolling_30
+            FROM daily
+        ),
+        ranked AS (
+            SELECT windowed.*,
+                   ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY date DESC) AS recency
+            FROM windowed
+            WHERE date >= :start
+        )
+        SELECT bucket,
+               SUM(calories) AS calories,
+               SUM(protein) AS protein,
+               SUM(carbs) AS carbs,
+               SUM(fat) AS fat,
+               SUM(entry_count) AS food_count,
+               COUNT(*) AS days_logged,
+               SUM(calories) * 1.0 / COUNT(*) AS avg_daily_calories,
+               SUM(CASE WHEN ABS(calories - :target) <= :target * :tolerance THEN 1 ELSE 0 END) AS days_on_target,
+               MAX(CASE WHEN recency = 1 THEN rolling_7 END) AS rolling_7_avg_calories,
+               MAX(CASE WHEN recency = 1 THEN rolling_30 END) AS rolling_30_avg_calories
+        FROM ranked
+        GROUP BY bucket
+        ORDER BY bucket
+    """)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, date) else str(value)[:10]
+
+
+def _round(value, digits=1):
+    return round(float(value), digits) if value is not None else None
+
+
+def nutrition_trends(conn, user_id, bucket, start, end, target=None, tolerance=0.1):
+    """Run the trends query and shape its rows for the API."""
+    params = {
+        'user_id': user_id,
+        'start': start,
+        'end': end,
+        'lookback_start': start - timedelta(days=ROLLING_LOOKBACK_DAYS),
+        # Without a calorie target nothing counts as on target
+        'target': target if target else -1,
+        'tolerance': tolerance
+    }
+    rows = conn.execute(trends_query(conn.dialect.name, bucket), params)
+    trends = []
+    for row in rows:
+        avg_daily = float(row.avg_daily_calories)
+        trends.append({
+            'period_start': _iso(row.bucket),
+            'total_calories': int(row.calories),
+            'total_protein': _round(row.protein),
+            'total_carbs': _round(row.carbs),
+            'total_fat': _round(row.fat),
+            'food_count': int(row.food_count),
+            'days_logged': int(row.days_logged),
+            'avg_daily_calories': _round(avg_daily),
+            'rolling_7_avg_calories': _round(row.rolling_7_avg_calories),
+            'rolling_30_avg_calories': _round(row.rolling_30_avg_calories),
+            'adherence_pct': _round(avg_daily * 100 / target) if target else None,
+            'days_on_target': int(row.days_on_target) if target else None
+        })
+    return trends
@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import Response
+
+from .assets import extract_assets, link_bundles, load_bundle
+
+try:
+    import brotli
+except ImportError:  # Pages are still served gzipped or uncompressed
+    brotli = None
+
+
+# Encodings in order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip', 'identity')
+# Extracted assets are named by their content hash, so a URL never changes meaning
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# One servable page. ``route``/``endpoint`` may be None for pages that are only
+# reachable by file name; ``logged_in_redirect`` names the endpoint a logged-in
+# visitor is sent to instead (the landing page).
+Page = namedtuple('Page', 'route endpoint filename login_required logged_in_redirect',
+                  defaults=(False, None))
+
+
+def page_manifest(pages):
+    """
+    Immutable lookup of every servable URL path: each page's route and its
+    ``/<filename>`` alias. Anything missing from it is a 404 without a syscall.
+    """
+    manifest = {}
+    for page in pages:
+        for path in (page.route, '/' + page.filename):
+            if path is None:
+                continue
+            if path in manifest:
+                raise ValueError(f'{path} is listed twice in the page manifest')
+            manifest[path] = page
+    return MappingProxyType(manifest)
+
+
+class CachedPage:
+    """One page's (or asset's) bytes in every encoding, with a strong ETag per encoding."""
+
+    def __init__(self, path, body, mtime, mimetype='text/html'):
+        self.path = path
+        self.mtime = mtime
+        self.mimetype = mimetype
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+        # Each encoding is a different representation, so it gets its own strong ETag
+        self.etags = {encoding: digest if encoding == 'identity' else f'{digest}-{encoding}' for encoding in self.bodies}
+
+
+class PageCache:
+    """
+    The ``names`` pages in ``directory`` (default: every ``*.html`` file), read
+    and compressed once at startup.
+
+    Requests are answered from memory: the encoding is negotiated from
+    Accept-Encoding, and If-None-Match against the strong ETag returns 304.
+    Names that were not loaded are unknown; nothing is looked up on disk per
+    request. With ``reload`` (development), each hit stats its file and
+    re-reads it when it changed, and new files are picked up.
+
+    With ``extract``, inline ``<style>``/``<script>`` blocks are moved into
+    content-hashed assets (see assets.py) that are served from memory with a
+    one-year immutable Cache-Control, so only the small HTML shell is
+    revalidated on each visit.
+
+    ``bundles`` are CSS/JS files shared by many pages (e.g. static/js/common.js).
+    Each is served as one content-hashed asset, and page links to
+    ``/assets/<file name>`` are rewritten to it, so the browser downloads it
+    once for the whole site.
+    """
+
+    def __init__(self, directory, names=None, reload=False, cache_control='no-cache', extract=False, bundles=()):
+        self.directory = directory
+        self.reload = reload
+        self.cache_control = cache_control
+        self.extract = extract
+        self.bundles = list(bundles)
+        self._pages = {}
+        self._assets = {}
+        self._bundle_files = {}
+        self._bundle_mtimes = {}
+        self._lock = threading.Lock()
+        self._load_bundles()
+        if names is None:
+            names = [name for name in os.listdir(directory) if name.endswith('.html')]
+        for name in sorted(set(names)):
+            self._load(name)
+
+    def _load_bundles(self):
+        for path in self.bundles:
+            filename, mimetype, data = load_bundle(path)
+            with self._lock:
+                self._assets.setdefault(filename, CachedPage(None, data, None, mimetype))
+                self._bundle_files[os.path.basename(path)] = filename
+                self._bundle_mtimes[path] = os.path.getmtime(path)
+
+    def _bundles_changed(self):
+        return any(os.path.getmtime(path) != mtime for path, mtime in self._bundle_mtimes.items())
+
+    def bundle_url(self, name):
+        """The hashed /assets/ URL a page link to ``/assets/<name>`` is rewritten to."""
+        return '/assets/' + self._bundle_files[name]
+
+    def _load(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, 'rb') as f:
+            body = f.read()
+        html = link_bundles(body.decode('utf-8'), self._bundle_files)
+        assets = {}
+        if self.extract:
+            html, extracted = extract_assets(html)
+            assets = {filename: CachedPage(None, data, None, mimetype)
+                      for filename, (mimetype, data) in extracted.items() if filename not in self._assets}
+        body = html.encode('utf-8')
+        page = CachedPage(path, body, os.path.getmtime(path))
+        with self._lock:
+            # Assets a reloaded page no longer uses are kept: an old copy of the
+            # page may still be cached somewhere and refer to them
+            self._assets.update(assets)
+            self._pages[name] = page
+        return page
+
+    def names(self):
+        return sorted(self._pages)
+
+    def asset_names(self):
+        return sorted(self._assets)
+
+    def get(self, name):
+        page = self._pages.get(name)
+        if not self.reload:
+            return page
+        if self._bundles_changed():
+            # Every loaded page links the old bundle URL; re-link them all
+            self._load_bundles()
+            for loaded in list(self._pages):
+                self._load(loaded)
+            page = self._pages.get(name)
+        path = page.path if page else os.path.join(self.directory, name)
+        if not name.endswith('.html') or os.path.dirname(os.path.normpath(path)) != os.path.normpath(self.directory):
+            return None
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        return page if page and page.mtime == mtime else self._load(name)
+
+    @staticmethod
+    def negotiate(page, accept_encodings):
+        best = max((accept_encodings.quality(encoding), -ENCODINGS.index(encoding), encoding)
+                   for encoding in page.bodies if encoding != 'identity')
+        return best[2] if best[0] > 0 else 'identity'
+
+    def response(self, name, request):
+        """The Flask response for page ``name``, or None if there is no such page."""
+        page = self.get(name)
+        if page is None:
+            return None
+        return self._respond(page, request, self.cache_control)
+
+    def asset_response(self, filename, request):
+        """The Flask response for an extracted asset, or None if there is no such asset."""
+        asset = self._assets.get(filename)
+        if asset is None:
+            return None
+        return self._respond(asset, request, ASSET_CACHE_CONTROL)
+
+    def _respond(self, page, request, cache_control):
+        encoding = self.negotiate(page, request.accept_encodings)
+        response = Response(mimetype=page.mimetype)
+        response.set_etag(page.etags[encoding])
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        if request.if_none_match.contains(page.etags[encoding]):
+            response.status_code = 304
+            return response
+        response.set_data(page.bodies[encoding])
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response
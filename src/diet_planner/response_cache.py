@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def make_cache_key(namespace, parts):
+    """
+    Build a stable key from the prompt inputs.
+
+    Strings are lower-cased and whitespace-collapsed so "Chicken  Karahi" and
+    "chicken karahi" share an entry; dict ordering does not matter.
+    """
+    def normalize(value):
+        if isinstance(value, str):
+            return ' '.join(value.lower().split())
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        return value
+
+    payload = json.dumps(normalize(parts), sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache for AI responses, shared by every gunicorn worker.
+
+    Entries expire after their TTL and the least recently used ones are
+    evicted once ``max_entries`` is exceeded. Hit/miss counters live in the
+    same file so they cover all workers. With ``track_reads=False`` a read is
+    a single SELECT: no counters, and eviction drops the oldest writes
+    instead. Any cache failure is logged and treated as a miss; it never
+    fails the request.
+    """
+
+    def __init__(self, path, default_ttl=86400, max_entries=5000, track_reads=True):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.track_reads = track_reads
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+        except (OSError, sqlite3.Error) as e:
+            # Read-only filesystems (e.g. serverless) fall back to the temp dir
+            print(f"Response cache unavailable at {self.path}: {e}")
+            self.path = os.path.join(tempfile.gettempdir(), os.path.basename(self.path))
+            conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access ON cache_entries (last_access);
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_namespace ON cache_entries (namespace);
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+
+    def _count(self, conn, namespace, column):
+        conn.execute(
+            f"INSERT INTO cache_stats (namespace, {column}) VALUES (?, 1) "
+            f"ON CONFLICT(namespace) DO UPDATE SET {column} = {column} + 1",
+            (namespace,)
+        )
+
+    def get(self, namespace, parts):
+        """Return the cached value for ``parts`` or None on a miss."""
+        key = make_cache_key(namespace, parts)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+            if not self.track_reads:
+                return json.loads(row[0]) if row else None
+            if row is None:
+                self._count(conn, namespace, 'misses')
+                return None
+            conn.execute('UPDATE cache_entries SET last_access = ? WHERE key = ?', (now, key))
+            self._count(conn, namespace, 'hits')
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, namespace, parts, value, ttl=None):
+        key = make_cache_key(namespace, parts)
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, namespace, value, created_at, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, namespace, json.dumps(value), now, expires_at, now)
+            )
+            self._evict(conn, now)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Response cache write failed: {e}")
+
+    def delete(self, namespace, parts):
+        """Drop the entry for ``parts``. Returns True when one was removed."""
+        try:
+            conn = self._connect()
+            cursor = conn.execute('DELETE FROM cache_entries WHERE key = ?', (make_cache_key(namespace, parts),))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Response cache delete failed: {e}")
+            return False
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+        overflow = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN '
+                '(SELECT key FROM cache_entries ORDER BY last_access ASC LIMIT ?)',
+                (overflow,)
+            )
+
+    def invalidate(self, namespace=None):
+        """Drop every entry, or only those of one namespace. Returns the number removed."""
+        try:
+            conn = self._connect()
+            if namespace:
+                cursor = conn.execute('DELETE FROM cache_entries WHERE namespace = ?', (namespace,))
+            else:
+                cursor = conn.execute('DELETE FROM cache_entries')
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Response cache invalidation failed: {e}")
+            return 0
+
+    def stats(self):
+        try:
+            conn = self._connect()
+            entries = dict(conn.execute(
+                'SELECT namespace, COUNT(*) FROM cache_entries WHERE expires_at > ? GROUP BY namespace',
+                (time.time(),)
+            ).fetchall())
+            counters = conn.execute('SELECT namespace, hits, misses FROM cache_stats').fetchall()
+        except sqlite3.Error as e:
+            print(f"Response cache stats failed: {e}")
+            return {}
+        stats = {}
+        for namespace, hits, misses in counters:
+            stats[namespace] = {'hits': hits, 'misses': misses, 'entries': entries.get(namespace, 0)}
+        for namespace, count in entries.items():
+            stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'entries': count})
+        return stats
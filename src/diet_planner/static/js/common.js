@@ -0,0 +1,53 @@
+// Shared by every page: the header's profile and logout buttons, and the
+// signed-in user. Pages link it as /assets/common.js; the page cache swaps in
+// a content-hashed URL so browsers keep one copy across all pages.
+(function () {
+    let currentUser = null;
+
+    // The signed-in user from /api/current_user, or null. Fetched once per page
+    // load however many scripts ask; pass refresh after changing the profile.
+    window.getCurrentUser = function (refresh) {
+        if (!currentUser || refresh) {
+            currentUser = fetch('/api/current_user', { method: 'GET', credentials: 'include' })
+                .then(response => response.ok ? response.json() : null)
+                .then(result => (result && result.user) || null)
+                .catch(error => {
+                    console.error('Error loading user data:', error);
+                    return null;
+                });
+        }
+        return currentUser;
+    };
+
+    window.logout = async function () {
+        if (!confirm('Are you sure you want to logout?')) {
+            return;
+        }
+        try {
+            const response = await fetch('/api/logout', {
+                method: 'POST',
+                credentials: 'include'
+            });
+            if (!response.ok) {
+                console.error('Logout failed:', await response.text());
+            }
+        } catch (error) {
+            console.error('Error during logout:', error);
+        }
+        // Back to login even if the API call failed
+        window.location.href = '/login';
+    };
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const profileButton = document.getElementById('profile-btn');
+        if (profileButton) {
+            profileButton.addEventListener('click', () => {
+                window.location.href = '/profile';
+            });
+        }
+        const logoutButton = document.getElementById('logout-btn');
+        if (logoutButton) {
+            logoutButton.addEventListener('click', window.logout);
+        }
+    });
+})();
@@ -0,0 +1,57 @@
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.ai_executor import AIExecutor, AIExecutorBusy
+
+
+def test_timeout_returns_without_waiting_for_the_stuck_call():
+    executor = AIExecutor(max_workers=1, max_queue=0, default_timeout=0.1)
+    release = threading.Event()
+
+    started = time.perf_counter()
+    with pytest.raises(concurrent.futures.TimeoutError):
+        executor.run(release.wait, 5)
+    assert time.perf_counter() - started < 1
+    release.set()
+
+
+def test_calls_beyond_workers_and_queue_are_rejected():
+    executor = AIExecutor(max_workers=1, max_queue=1, default_timeout=5)
+    release = threading.Event()
+    executor.submit(release.wait, 5)
+    executor.submit(release.wait, 5)
+
+    with pytest.raises(AIExecutorBusy):
+        executor.submit(release.wait, 5)
+    assert executor.stats()['rejected'] == 1
+
+    release.set()
+    time.sleep(0.1)
+    assert executor.stats()['in_flight'] == 0
+
+
+def test_generate_passes_the_deadline_to_the_model():
+    class Model:
+        def generate_content(self, prompt, request_options=None):
+            return request_options
+
+    executor = AIExecutor(max_workers=1, max_queue=0, default_timeout=12)
+    assert executor.generate(Model(), 'Salam') == {'timeout': 12}
+
+
+def test_reserved_slots_count_against_the_limit():
+    executor = AIExecutor(max_workers=1, max_queue=0)
+    release = executor.reserve()
+    with pytest.raises(AIExecutorBusy):
+        executor.submit(time.sleep, 0)
+    release()
+    release()
+    assert executor.stats()['in_flight'] == 0
+    assert executor.run(lambda: 'ok') == 'ok'
@@ -4,13 +4,14 @@ import sys
 # Add the project root to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from diet_planner.app import app, model
+from diet_planner.app import app, gemini
 
 print("Checking if app loads correctly...")
 
 # Test model configuration
+model = gemini.get_model(wait=30)
 if model:
-    print("[OK] Gemini model is configured and available")
+    print(f"[OK] Gemini model ({gemini.model_name}) is configured and available")
 else:
     print("[ERROR] Gemini model is NOT available - this could be why diet plans aren't generating")
 
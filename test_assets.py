@@ -0,0 +1,130 @@
+import gzip
+import os
+import re
+
+from flask import Flask, request
+
+from diet_planner.assets import extract_assets, link_bundles, minify_css
+from diet_planner.page_cache import PageCache
+
+
+PAGE = '''<html><head>
+<style>
+    /* layout */
+    body { margin : 0; font-family: "Open  Sans"; }
+    .card > h2 , .card p { padding: 4px  8px; }
+</style>
+</head><body>
+<script src="https://cdn.example.com/lib.js"></script>
+<script>
+    // greet
+    const message = 'a  // not a comment';
+    const ratio = total / count / 2;
+    const pattern = /\\/\\*[^/]*\\//g;
+    const html = `<p>${items.map(i => `${i} / 2`).join('  ')}</p>`;
+    let x = 1
+    /* no semicolon above */
+    x++
+</script>
+</body></html>'''
+
+
+def test_minify_css_keeps_strings():
+    css = minify_css('a { content: "/* kept */  x" ; color: red; }  /* gone */ b , i { margin: 0 }')
+    assert css == 'a{content: "/* kept */  x";color: red}b,i{margin: 0}'
+
+
+def test_scripts_are_extracted_verbatim():
+    _, assets = extract_assets(PAGE)
+    js = next(data for content_type, data in assets.values() if content_type == 'application/javascript')
+    assert js.decode('utf-8') == re.search(r'<script>(.*?)</script>', PAGE, re.S).group(1).strip()
+
+
+def test_link_bundles_only_rewrites_known_names():
+    html = '<script src="/assets/common.js"></script><script src="/assets/other.js"></script>'
+    assert link_bundles(html, {'common.js': 'common.0123abcd.js'}) == (
+        '<script src="/assets/common.0123abcd.js"></script><script src="/assets/other.js"></script>')
+
+
+def test_extract_assets_rewrites_inline_blocks():
+    html, assets = extract_assets(PAGE)
+    assert '<style>' not in html and '<script>\n' not in html
+    assert '<script src="https://cdn.example.com/lib.js"></script>' in html
+    css, js = sorted(assets, key=lambda name: name.endswith('.js'))
+    assert f'<link rel="stylesheet" href="/assets/{css}">' in html
+    assert f'<script src="/assets/{js}"></script>' in html
+    assert assets[css][0] == 'text/css' and assets[js][0] == 'application/javascript'
+
+    # Identical blocks on different pages become the same asset
+    _, again = extract_assets('<p>other page</p>' + PAGE)
+    assert again == assets
+
+
+def test_assets_are_served_immutable(tmp_path):
+    (tmp_path / 'one.html').write_text(PAGE)
+    (tmp_path / 'two.html').write_text(PAGE.replace('<body>', '<body><h1>Two</h1>'))
+    pages = PageCache(str(tmp_path), extract=True)
+    app = Flask(__name__)
+
+    @app.route('/assets/<name>')
+    def asset(name):
+        return pages.asset_response(name, request) or ('missing', 404)
+
+    @app.route('/<name>')
+    def page(name):
+        return pages.response(name, request) or ('missing', 404)
+
+    client = app.test_client()
+    assert len(pages.asset_names()) == 2
+    shell = client.get('/one.html', headers={'Accept-Encoding': 'identity'})
+    assert shell.headers['Cache-Control'] == 'no-cache'
+    names = re.findall(r'/assets/([0-9a-f]+\.(?:css|js))', shell.get_data(as_text=True))
+    assert sorted(names) == pages.asset_names()
+
+    css = next(name for name in names if name.endswith('.css'))
+    response = client.get(f'/assets/{css}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.data).startswith(b'body{margin')
+    assert client.get(f'/assets/{css}', headers={'Accept-Encoding': 'gzip',
+                                                   'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/assets/0000000000000000.css').status_code == 404
+
+
+def test_pages_share_one_bundle(tmp_path):
+    bundle = tmp_path / 'common.js'
+    bundle.write_text('window.getCurrentUser = () => null;\n')
+    linked = '<script src="/assets/common.js"></script>\n'
+    (tmp_path / 'one.html').write_text(PAGE.replace('<script>', linked + '<script>', 1))
+    (tmp_path / 'two.html').write_text('<h1>Two</h1>' + linked)
+    pages = PageCache(str(tmp_path), names=['one.html', 'two.html'], extract=True, reload=True, bundles=[str(bundle)])
+    app = Flask(__name__)
+
+    @app.route('/assets/<name>')
+    def asset(name):
+        return pages.asset_response(name, request) or ('missing', 404)
+
+    client = app.test_client()
+    url = pages.bundle_url('common.js')
+    assert re.fullmatch(r'/assets/common\.[0-9a-f]{16}\.js', url)
+    for name in ('one.html', 'two.html'):
+        assert f'<script src="{url}"></script>' in pages.get(name).bodies['identity'].decode('utf-8')
+    response = client.get(url)
+    assert response.data == b'window.getCurrentUser = () => null;\n'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    # Editing the bundle gives it a new URL, and every page links the new one
+    bundle.write_text('window.getCurrentUser = () => undefined;\n')
+    os.utime(bundle, (1, 1))
+    pages.get('one.html')
+    assert pages.bundle_url('common.js') != url
+    assert pages.bundle_url('common.js') in pages.get('two.html').bodies['identity'].decode('utf-8')
+
+
+def test_every_app_page_links_the_common_bundle():
+    from diet_planner import app as app_module
+
+    url = app_module.pages.bundle_url('common.js')
+    for name in app_module.pages.names():
+        assert f'<script src="{url}"></script>' in app_module.pages.get(name).bodies['identity'].decode('utf-8'), name
+    assert app_module.app.test_client().get(url).status_code == 200
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner import app as app_module
+from diet_planner.ai_executor import AIExecutor
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    def generate_content(self, prompt, stream=False, request_options=None):
+        assert stream
+        return iter([FakeChunk('Daal '), FakeChunk('chawal '), FakeChunk('khayein.')])
+
+
+def read_events(response):
+    events = []
+    for frame in response.get_data(as_text=True).strip().split('\n\n'):
+        name, data = frame.split('\n')
+        events.append((name[len('event: '):], data[len('data: '):]))
+    return events
+
+
+def test_stream_pushes_tokens_then_done(monkeypatch):
+    monkeypatch.setattr(app_module.gemini, 'get_model', lambda wait=0: FakeStreamingModel())
+    client = app_module.app.test_client()
+
+    response = client.post('/api/chatbot/stream', json={'user_message': 'Breakfast mein kya khaun?'})
+
+    assert response.mimetype == 'text/event-stream'
+    events = read_events(response)
+    assert [name for name, _ in events] == ['token', 'token', 'token', 'done']
+    assert '"Daal "' in events[0][1]
+
+
+def test_stream_honours_expert_handoff_and_missing_model(monkeypatch):
+    monkeypatch.setattr(app_module.gemini, 'get_model', lambda wait=0: None)
+    client = app_module.app.test_client()
+
+    expert = read_events(client.post('/api/chatbot/stream', json={'user_message': 'Mujhe expert se baat karni hai'}))
+    assert expert[-1] == ('done', '{"needs_expert": true}')
+
+    fallback = read_events(client.post('/api/chatbot/stream', json={'user_message': 'Salam'}))
+    assert app_module.CHATBOT_MODEL_UNAVAILABLE in fallback[0][1]
+    assert fallback[-1][0] == 'done'
+
+
+def test_stream_holds_an_ai_executor_slot(monkeypatch):
+    executor = AIExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(app_module, 'ai_executor', executor)
+    seen = []
+
+    class Model:
+        def generate_content(self, prompt, stream=False, request_options=None):
+            seen.append(executor.stats()['in_flight'])
+            return iter([FakeChunk('Daal chawal.')])
+
+    monkeypatch.setattr(app_module.gemini, 'get_model', lambda wait=0: Model())
+    client = app_module.app.test_client()
+
+    assert read_events(client.post('/api/chatbot/stream', json={'user_message': 'Lunch?'}))[-1][0] == 'done'
+    assert seen == [1]
+    assert executor.stats()['in_flight'] == 0
+
+    release = executor.reserve()
+    busy = client.post('/api/chatbot/stream', json={'user_message': 'Dinner?'})
+    assert busy.status_code == 503 and seen == [1]
+    release()
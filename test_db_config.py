@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from diet_planner.db_config import engine_options, runtime_profile
+
+POSTGRES_URL = 'postgresql+psycopg2://user@localhost/db'
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ('DB_RUNTIME_PROFILE', 'VERCEL', 'AWS_LAMBDA_FUNCTION_NAME', 'DB_STATEMENT_TIMEOUT_MS'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_auto_profile_detects_serverless_platforms(monkeypatch):
+    assert runtime_profile() == 'server'
+    monkeypatch.setenv('VERCEL', '1')
+    assert runtime_profile() == 'serverless'
+    monkeypatch.setenv('DB_RUNTIME_PROFILE', 'server')
+    assert runtime_profile() == 'server'
+
+
+def test_unknown_profile_is_rejected(monkeypatch):
+    monkeypatch.setenv('DB_RUNTIME_PROFILE', 'lambda')
+    with pytest.raises(ValueError):
+        runtime_profile()
+
+
+def test_serverless_profile_opens_a_connection_per_request():
+    options = engine_options(POSTGRES_URL, 'serverless')
+    assert options['poolclass'] is NullPool
+    assert 'pool_size' not in options
+    assert options['connect_args']['connect_timeout'] == 5
+    assert options['connect_args']['options'] == '-c statement_timeout=10000'
+    assert isinstance(create_engine(POSTGRES_URL, **options).pool, NullPool)
+
+
+def test_server_profile_keeps_a_tuned_warm_pool(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_POOL_PRE_PING', '0')
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT_MS', '0')
+    options = engine_options(POSTGRES_URL, 'server')
+    assert options['pool_size'] == 3
+    assert options['pool_pre_ping'] is False
+    assert options['pool_recycle'] == 1800
+    assert options['connect_args']['keepalives'] == 1
+    assert 'options' not in options['connect_args']
+    engine = create_engine(POSTGRES_URL, **options)
+    assert isinstance(engine.pool, QueuePool) and engine.pool.size() == 3
+
+
+def test_sqlite_gets_no_engine_options():
+    assert engine_options('sqlite://', 'serverless') == {}
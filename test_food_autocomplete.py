@@ -0,0 +1,47 @@
+import time
+
+from diet_planner.app import app, autocomplete_payload, food_autocomplete, food_index
+from diet_planner.food_index import normalize
+
+
+def test_suggestions_are_ranked_with_per_serving_macros():
+    client = app.test_client()
+    response = client.get('/api/foods/autocomplete?q=Ro')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['query'] == 'ro'
+    assert data['suggestions'][0] == {'key': 'roti', 'name': 'Roti', 'match': 'prefix', 'unit': 'serving',
+                                      'serving_g': 40, 'calories': 70, 'protein': 3, 'carbs': 15, 'fat': 0.5}
+    assert len(client.get('/api/foods/autocomplete?q=r&limit=1').get_json()['suggestions']) == 1
+    assert client.get('/api/foods/autocomplete?q=').get_json()['suggestions'] == []
+    assert client.get('/api/foods/autocomplete?q=ro&limit=many').status_code == 400
+
+
+def test_responses_are_cacheable_and_revalidate_with_304():
+    client = app.test_client()
+    response = client.get('/api/foods/autocomplete?q=biryani')
+    etag = response.headers['ETag']
+    assert 'max-age' in response.headers['Cache-Control']
+
+    revalidated = client.get('/api/foods/autocomplete?q=biryani', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    # Same normalized query, same representation
+    assert client.get('/api/foods/autocomplete?q=BIRYANI%20').headers['ETag'] == etag
+
+
+def test_uncached_server_time_p99_under_20ms():
+    # Every prefix of every food name, plus a few typos that fall through to fuzzy matching
+    queries = {key[:n] for key in food_index.keys for n in range(1, min(len(key), 6) + 1)}
+    queries |= {'bryani', 'chiken', 'rotti', 'dahl', 'samosaa'}
+    queries = sorted({normalize(query) for query in queries})
+    autocomplete_payload.cache_clear()
+    timings = []
+    for query, limit in ((query, limit) for query in queries for limit in (1, 5, 10)):
+        with app.test_request_context('/api/foods/autocomplete', query_string={'q': query, 'limit': limit}):
+            started = time.perf_counter()
+            food_autocomplete()
+            timings.append((time.perf_counter() - started) * 1000)
+    assert autocomplete_payload.cache_info().hits == 0
+    timings.sort()
+    assert timings[int(len(timings) * 0.99) - 1] < 20
@@ -0,0 +1,70 @@
+import random
+import string
+import time
+
+from diet_planner.food_index import FoodIndex, edit_distance
+
+FOODS = {
+    'roti': {'name': 'Roti'},
+    'roti_canai': {'name': 'Roti Canai'},
+    'rice': {'name': 'Rice'},
+    'fried_rice': {'name': 'Fried Rice'},
+    'aloo': {'name': 'Aloo (Potato)'},
+    'biryani': {'name': 'Biryani'},
+    'chicken': {'name': 'Chicken'},
+    'kheer': {'name': 'Kheer'},
+}
+
+
+def matches(index, query, limit=20):
+    return [(key, match) for key, _, match in index.search(query, limit=limit)]
+
+
+def test_results_rank_exact_prefix_substring_fuzzy():
+    index = FoodIndex(FOODS)
+    assert matches(index, 'rice') == [('rice', 'exact'), ('fried_rice', 'prefix')]
+    assert matches(index, 'roti') == [('roti', 'exact'), ('roti_canai', 'prefix')]
+    assert matches(index, 'otat') == [('aloo', 'substring')]
+    assert matches(index, 'bryani') == [('biryani', 'fuzzy')]
+    assert matches(index, 'Chiken!') == [('chicken', 'fuzzy')]
+    assert matches(index, 'pizza') == []
+
+
+def test_limit_caps_results():
+    index = FoodIndex(FOODS)
+    assert len(index.search('r', limit=2)) == 2
+    assert index.search('rice', limit=0) == []
+
+
+def test_edit_distance_stops_past_the_bound():
+    assert edit_distance('kitten', 'sitting', 3) == 3
+    assert edit_distance('kitten', 'sitting', 1) == 2
+    assert edit_distance('a', 'abcdef', 2) == 3
+
+
+def test_large_index_stays_fast():
+    rng = random.Random(7)
+    foods = {f'food_{i}': {'name': ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + f' {i}'}
+             for i in range(30000)}
+    foods['chicken_karahi'] = {'name': 'Chicken Karahi'}
+    index = FoodIndex(foods)
+
+    assert matches(index, 'chicken karahi', limit=1) == [('chicken_karahi', 'exact')]
+    queries = ['ch', 'chick', 'kara', 'chiken', 'xq', 'abc']
+    started = time.perf_counter()
+    for _ in range(20):
+        for query in queries:
+            index.search(query, limit=10)
+    per_query_ms = (time.perf_counter() - started) * 1000 / (20 * len(queries))
+    assert per_query_ms < 20
+
+
+def test_food_search_route_is_ranked_and_limited():
+    from diet_planner.app import app
+
+    client = app.test_client()
+    response = client.get('/api/food_search?food_name=roti')
+    assert response.get_json()['results'][0]['name'] == 'Roti'
+    response = client.get('/api/food_search?food_name=r&limit=1')
+    assert response.get_json()['count'] == 1
+    assert client.get('/api/food_search?food_name=roti&limit=x').status_code == 400
@@ -0,0 +1,62 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from diet_planner.food_store import FoodStore, build_food_store, open_food_store
+
+CSV = """key,name,calories,protein,carbs,fat,fiber
+roti,Roti,70,3,15,0.5,2
+daal,Daal (Lentils),120,9,20,2,
+nihari,Nihāri,350,25,6,24,1.5
+"""
+
+
+def write_csv(tmp_path, text=CSV):
+    path = tmp_path / 'foods.csv'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_build_and_map_round_trips_foods(tmp_path):
+    store_path = str(tmp_path / 'store' / 'foods')
+    assert build_food_store(write_csv(tmp_path), store_path) == 3
+
+    store = FoodStore(store_path)
+    assert isinstance(store.table, np.memmap)
+    assert len(store) == 3 and list(store) == ['roti', 'daal', 'nihari']
+    assert store['roti'] == {'name': 'Roti', 'calories': 70, 'protein': 3, 'carbs': 15, 'fat': 0.5, 'fiber': 2}
+    assert store['daal']['fiber'] is None
+    assert store['nihari']['name'] == 'Nihāri'
+    assert store.column('calories').tolist() == [70, 120, 350]
+    assert 'paratha' not in store
+
+
+def test_invalid_csv_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        build_food_store(write_csv(tmp_path, 'key,calories\nroti,abc\n'), str(tmp_path / 'foods'))
+    with pytest.raises(ValueError):
+        build_food_store(write_csv(tmp_path, 'name,calories\nRoti,70\n'), str(tmp_path / 'foods'))
+    with pytest.raises(ValueError):
+        build_food_store(write_csv(tmp_path, 'key,name\nroti,Roti\nroti,Roti\n'), str(tmp_path / 'foods'))
+
+
+def test_open_rebuilds_when_the_csv_changes(tmp_path):
+    csv_path = write_csv(tmp_path)
+    store_path = str(tmp_path / 'foods')
+    assert len(open_food_store(csv_path, store_path)) == 3
+
+    write_csv(tmp_path, CSV + 'egg,Egg,70,6,0.6,5,0\n')
+    later = time.time() + 10
+    os.utime(csv_path, (later, later))
+    assert open_food_store(csv_path, store_path)['egg']['calories'] == 70
+    assert open_food_store(str(tmp_path / 'missing.csv'), str(tmp_path / 'nothing')) is None
+
+
+def test_app_searches_the_mapped_store():
+    from diet_planner.app import app, food_database
+
+    assert isinstance(food_database, FoodStore)
+    response = app.test_client().get('/api/food_search?food_name=daal')
+    assert response.get_json()['results'][0] == {'name': 'Daal (Lentils)', 'serving_g': 150, 'calories': 120, 'protein': 9, 'carbs': 20, 'fat': 2}
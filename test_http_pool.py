@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import diet_planner.app as app_module
+from diet_planner.http_pool import HTTPPool, HTTPPoolError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stands in for the food plate API: answers every request after ``server.delay``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests.append((self.path, self.headers.get('x-rapidapi-key')))
+        time.sleep(self.server.delay)
+        status = 200
+        if self.server.failures:
+            self.server.failures -= 1
+            status = 503
+        body = json.dumps({'nutrition': {'calories': 420}, 'path': self.path}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.connections, server.requests, server.delay, server.failures = 0, [], 0, 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+def test_connections_are_kept_alive(stub):
+    pool = HTTPPool(stub_url(stub))
+    for _ in range(20):
+        assert pool.request('POST', '/analyzeFoodPlate').status == 200
+    assert stub.connections == 1
+    assert pool.stats == {'connections': 1, 'requests': 20, 'retries': 0}
+    assert stub.requests[0][0] == '/v1/analyzeFoodPlate'
+    pool.close()
+
+
+def test_retries_are_bounded(stub):
+    pool = HTTPPool(stub_url(stub), retries=2, backoff=0)
+    stub.failures = 2
+    assert pool.request('GET', '/x').status == 200
+    assert pool.stats['retries'] == 2
+
+    stub.failures = 5
+    assert pool.request('GET', '/x').status == 503
+    assert len(stub.requests) == 6
+
+
+def test_post_is_not_resent_once_the_server_has_it(stub):
+    pool = HTTPPool(stub_url(stub), retries=2, backoff=0)
+    stub.failures = 1
+    assert pool.request('POST', '/x').status == 503
+    assert len(stub.requests) == 1
+
+    stub.delay = 0.3
+    pool = HTTPPool(stub_url(stub), read_timeout=0.1, retries=2, backoff=0)
+    with pytest.raises(HTTPPoolError, match='1 attempts'):
+        pool.request('POST', '/slow')
+    assert len(stub.requests) == 2
+    assert pool.stats['retries'] == 0
+
+
+def test_post_is_retried_when_it_could_not_connect(stub):
+    url = stub_url(stub)
+    stub.shutdown()
+    stub.server_close()
+    pool = HTTPPool(url, retries=2, backoff=0)
+    with pytest.raises(HTTPPoolError, match='3 attempts'):
+        pool.request('POST', '/x')
+    assert pool.stats['retries'] == 2
+    assert stub.requests == []
+
+
+def test_read_timeout(stub):
+    stub.delay = 0.5
+    pool = HTTPPool(stub_url(stub), read_timeout=0.1, retries=1, backoff=0)
+    start = time.perf_counter()
+    with pytest.raises(HTTPPoolError, match='2 attempts'):
+        pool.request('GET', '/slow')
+    assert time.perf_counter() - start < 0.5
+
+
+def test_total_timeout_covers_every_attempt(stub):
+    stub.delay = 1
+    pool = HTTPPool(stub_url(stub), read_timeout=0.3, retries=5, backoff=0, total_timeout=0.4)
+    start = time.perf_counter()
+    with pytest.raises(HTTPPoolError, match='2 attempts'):
+        pool.request('GET', '/slow')
+    assert time.perf_counter() - start < 0.6
+
+
+def test_analysis_is_cached_by_image(user_client, stub, monkeypatch):
+    client, _ = user_client
+    monkeypatch.setenv('RAPIDAPI_KEY', 'test-key')
+    monkeypatch.setattr(app_module, 'food_plate_api', HTTPPool(stub_url(stub)))
+    app_module.response_cache.invalidate('food_plate_analysis')
+    stub.delay = 0.05
+    url = 'https://example.com/plates/Lunch.jpg'
+
+    start = time.perf_counter()
+    first = client.post('/api/analyze-food-plate', json={'image_url': url})
+    miss = time.perf_counter() - start
+    assert first.get_json()['analysis']['nutrition'] == {'calories': 420}
+    assert 'imageUrl=https%3A%2F%2Fexample.com%2Fplates%2FLunch.jpg' in stub.requests[0][0]
+    assert stub.requests[0][1] == 'test-key'
+
+    start = time.perf_counter()
+    second = client.post('/api/analyze-food-plate', json={'image_url': url})
+    hit = time.perf_counter() - start
+    assert second.get_json()['cached'] is True
+    assert len(stub.requests) == 1
+    assert hit < miss
+
+    # URLs are case-sensitive
+    client.post('/api/analyze-food-plate', json={'image_url': url.lower()})
+    assert len(stub.requests) == 2
+    assert stub.connections == 1
+
+
+def test_upstream_errors_are_not_reported_as_analyses(user_client, stub, monkeypatch):
+    client, _ = user_client
+    monkeypatch.setenv('RAPIDAPI_KEY', 'test-key')
+    monkeypatch.setattr(app_module, 'food_plate_api', HTTPPool(stub_url(stub), retries=0))
+    app_module.response_cache.invalidate('food_plate_analysis')
+    stub.failures = 2
+    url = 'https://example.com/plates/Dinner.jpg'
+
+    failed = client.post('/api/analyze-food-plate', json={'image_url': url})
+    assert failed.status_code == 502
+    assert 'analysis' not in failed.get_json() and '503' in failed.get_json()['error']
+
+    # Errors are not cached: the next call asks the API again
+    assert client.post('/api/analyze-food-plate', json={'image_url': url}).status_code == 502
+    assert client.post('/api/analyze-food-plate', json={'image_url': url}).get_json()['analysis']['nutrition'] == {'calories': 420}
+    assert len(stub.requests) == 3
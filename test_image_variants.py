@@ -0,0 +1,80 @@
+import io
+import os
+
+import pytest
+from flask import Flask, request
+
+from diet_planner.image_variants import ImageVariants, snap_width
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_app(tmp_path):
+    source = tmp_path / 'images'
+    source.mkdir()
+    Image.new('RGB', (1000, 500), 'orange').save(source / 'photo.jpg')
+    (source / 'logo.svg').write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    images = ImageVariants(str(source), str(tmp_path / 'cache'))
+    app = Flask(__name__)
+
+    @app.route('/images/<path:filename>')
+    def image(filename):
+        try:
+            response = images.response(filename, request)
+        except ValueError as e:
+            return str(e), 400
+        return response or ('missing', 404)
+
+    return app.test_client(), images, tmp_path / 'cache'
+
+
+def test_widths_snap_to_standard_sizes():
+    assert snap_width(1) == 64
+    assert snap_width(300) == 384
+    assert snap_width(384) == 384
+    assert snap_width(10000) == 2560
+
+
+def test_variant_is_resized_converted_and_cached(tmp_path):
+    client, images, cache = make_app(tmp_path)
+    response = client.get('/images/photo.jpg?w=300&format=webp')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert Image.open(io.BytesIO(response.data)).size == (384, 192)
+    assert response.cache_control.max_age == 7 * 24 * 3600
+    assert not response.headers['ETag'].startswith('W/')
+    assert len(os.listdir(cache)) == 1
+
+    # Same variant: served from the cache directory, and revalidated by ETag
+    again = client.get('/images/photo.jpg?w=310&format=webp', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert len(os.listdir(cache)) == 1
+
+    # Never upscaled
+    assert Image.open(io.BytesIO(client.get('/images/photo.jpg?w=2000&format=png').data)).size == (1000, 500)
+
+
+def test_auto_format_follows_accept(tmp_path):
+    client, images, _ = make_app(tmp_path)
+    webp = client.get('/images/photo.jpg?w=128', headers={'Accept': 'image/webp,image/*,*/*;q=0.8'})
+    assert webp.mimetype == 'image/webp'
+    assert 'Accept' in webp.headers['Vary']
+    # Wildcards alone keep the source encoding
+    plain = client.get('/images/photo.jpg?w=128', headers={'Accept': 'image/*,*/*;q=0.8'})
+    assert plain.mimetype == 'image/jpeg'
+    assert Image.open(io.BytesIO(plain.data)).size == (128, 64)
+
+
+def test_originals_and_errors(tmp_path):
+    client, _, cache = make_app(tmp_path)
+    original = client.get('/images/photo.jpg')
+    assert original.status_code == 200
+    assert Image.open(io.BytesIO(original.data)).size == (1000, 500)
+    assert original.cache_control.max_age == 7 * 24 * 3600
+    # Files Pillow cannot read are passed through untouched
+    svg = client.get('/images/logo.svg?w=128')
+    assert svg.data.startswith(b'<svg') and svg.mimetype == 'image/svg+xml'
+    assert client.get('/images/photo.jpg?w=abc').status_code == 400
+    assert client.get('/images/photo.jpg?format=bmp').status_code == 400
+    assert client.get('/images/missing.jpg?w=64').status_code == 404
+    assert client.get('/images/../photo.jpg').status_code == 404
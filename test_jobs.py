@@ -0,0 +1,194 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from diet_planner import app as app_module
+from diet_planner.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobWorkerPool
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def generate_content(self, prompt, request_options=None):
+        return FakeResponse('Daal chawal khayein.')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.db'), lease_seconds=60)
+
+
+def test_jobs_run_once_and_keep_their_result(queue, tmp_path):
+    job_id = queue.enqueue('double', {'n': 21}, user_id=7)
+    assert queue.get(job_id)['status'] == QUEUED
+
+    workers = JobWorkerPool(queue, {'double': lambda payload: ({'n': payload['n'] * 2}, 200)})
+    assert workers.run_once()
+    assert not workers.run_once()
+
+    # A fresh queue on the same file (another process, or after a restart) sees it
+    job = JobQueue(queue.path).get(job_id)
+    assert (job['status'], job['result'], job['status_code'], job['user_id']) == (SUCCEEDED, {'n': 42}, 200, 7)
+
+
+def test_failures_are_recorded(queue):
+    def boom(payload):
+        raise RuntimeError('model exploded')
+
+    job_id = queue.enqueue('boom', {})
+    unknown_id = queue.enqueue('nope', {})
+    workers = JobWorkerPool(queue, {'boom': boom})
+    workers.run_once()
+    workers.run_once()
+    assert (queue.get(job_id)['status'], queue.get(job_id)['error']) == (FAILED, 'model exploded')
+    assert "No handler for job kind 'nope'" in queue.get(unknown_id)['error']
+
+
+def test_expired_leases_are_claimed_again(queue):
+    queue.lease_seconds = 0.05
+    queue.max_attempts = 2
+    job_id = queue.enqueue('slow', {})
+
+    crashed = queue.claim()
+    assert crashed['status'] == RUNNING
+    assert queue.claim() is None
+    time.sleep(0.1)
+
+    # The worker that held it died; the job is handed out again
+    retried = queue.claim()
+    assert (retried['id'], retried['attempts']) == (job_id, 2)
+    # A late result from the expired lease does not overwrite the new run
+    assert not queue.complete(crashed, {'stale': True})
+    time.sleep(0.1)
+    assert queue.claim() is None
+    assert queue.get(job_id)['status'] == FAILED
+
+
+def test_wait_returns_when_the_job_finishes(queue):
+    job_id = queue.enqueue('echo', {'text': 'hi'})
+    workers = JobWorkerPool(queue, {'echo': lambda payload: (payload, 200)}, workers=1, idle_interval=0.05)
+    threading.Timer(0.1, workers.start).start()
+    try:
+        start = time.monotonic()
+        job = queue.wait(job_id, 5)
+        while job['status'] != SUCCEEDED:
+            job = queue.wait(job_id, 5)
+        assert time.monotonic() - start < 2
+        assert job['result'] == {'text': 'hi'}
+    finally:
+        workers.stop(timeout=1)
+
+
+def test_async_request_is_queued_then_polled(user_client, monkeypatch):
+    client, user_id = user_client
+    monkeypatch.setattr(app_module.gemini, 'get_model', lambda wait=0: FakeModel())
+
+    queued = client.post('/api/chatbot?async=1', json={'user_message': 'Breakfast mein kya khaun?'})
+    assert queued.status_code == 202
+    job_id = queued.get_json()['job_id']
+    assert queued.headers['Location'] == f'/api/jobs/{job_id}'
+
+    pending = client.get(f'/api/jobs/{job_id}')
+    assert pending.get_json()['status'] == QUEUED
+    assert pending.headers['Retry-After'] == '1'
+    # Jobs are private to the user who queued them
+    assert app_module.app.test_client().get(f'/api/jobs/{job_id}').status_code == 404
+
+    assert app_module.job_workers.run_once()
+    done = client.get(f'/api/jobs/{job_id}').get_json()
+    assert done['status'] == SUCCEEDED
+    assert done['status_code'] == 200
+    assert done['result'] == {'response': 'Daal chawal khayein.', 'needs_expert': False}
+
+    # Without the flag the endpoint still answers inline
+    inline = client.post('/api/chatbot', json={'user_message': 'Lunch?'})
+    assert inline.status_code == 200 and inline.get_json()['response'] == 'Daal chawal khayein.'
+
+
+def test_job_events_stream_until_done(user_client, monkeypatch):
+    client, _ = user_client
+    monkeypatch.setattr(app_module.gemini, 'get_model', lambda wait=0: FakeModel())
+    job_id = client.post('/api/chatbot', json={'user_message': 'Dinner?'},
+                         headers={'Prefer': 'respond-async'}).get_json()['job_id']
+
+    threading.Timer(0.2, app_module.job_workers.run_once).start()
+    response = client.get(f'/api/jobs/{job_id}/events')
+    assert response.mimetype == 'text/event-stream'
+    frames = [frame for frame in response.get_data(as_text=True).strip().split('\n\n') if frame.startswith('event:')]
+    names = [frame.split('\n')[0][len('event: '):] for frame in frames]
+    assert names[0] == 'status' and names[-1] == 'done'
+    done = json.loads(frames[-1].split('\n')[1][len('data: '):])
+    assert done['result']['response'] == 'Daal chawal khayein.'
+
+
+def test_long_polls_and_streams_stay_under_the_hold_limit(user_client, monkeypatch):
+    client, _ = user_client
+    monkeypatch.setattr(app_module, 'JOB_HOLD_SECONDS', 0.3)
+    job_id = client.post('/api/chatbot?async=1', json={'user_message': 'Never run'}).get_json()['job_id']
+
+    start = time.monotonic()
+    assert client.get(f'/api/jobs/{job_id}?wait=60').get_json()['status'] == QUEUED
+    events = client.get(f'/api/jobs/{job_id}/events').get_data(as_text=True)
+    assert time.monotonic() - start < 2
+    assert 'event: timeout' in events
+    # Leave the queue empty for the other tests
+    app_module.job_workers.run_once()
+
+
+def test_restarted_process_picks_up_leftover_jobs(tmp_path):
+    """Jobs queued before a restart, or interrupted by one, run once the app is imported again."""
+    queue = JobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0)
+
+    def chatbot_job(message):
+        job_id = os.urandom(8).hex()
+        payload = {'job_id': job_id, 'endpoint': 'chatbot', 'method': 'POST', 'path': '/api/chatbot',
+                   'args': {}, 'json': {'user_message': message}, 'user_id': None}
+        return queue.enqueue('chatbot', payload, job_id=job_id)
+
+    interrupted = chatbot_job('Mujhe expert se baat karni hai')
+    assert queue.claim()['id'] == interrupted  # ...and the worker holding it died
+    waiting = chatbot_job('Mujhe expert se baat karni hai, please')
+
+    script = (
+        "import time\n"
+        "from diet_planner import app as m\n"
+        "deadline = time.time() + 20\n"
+        "while m.job_queue.stats()['succeeded'] < 2 and time.time() < deadline:\n"
+        "    time.sleep(0.1)\n"
+        "print('SUCCEEDED', m.job_queue.stats()['succeeded'])\n"
+    )
+    env = dict(os.environ, JOB_WORKERS='1', JOB_QUEUE_PATH=queue.path,
+               PYTHONPATH=os.path.join(os.path.dirname(__file__), 'src'))
+    output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, timeout=60).stdout
+    assert 'SUCCEEDED 2' in output
+    for job_id in (interrupted, waiting):
+        assert queue.get(job_id)['result']['needs_expert'] is True
+
+
+def test_workers_only_start_for_async_servers(tmp_path):
+    script = (
+        "import threading\n"
+        "from diet_planner import app as m\n"
+        "print('WORKERS', sum(t.name.startswith('job-worker') for t in threading.enumerate()))\n"
+    )
+    base = dict(os.environ, JOB_WORKERS='2', JOB_QUEUE_PATH=str(tmp_path / 'jobs.db'),
+                PYTHONPATH=os.path.join(os.path.dirname(__file__), 'src'))
+    base.pop('FLASK_RUN_FROM_CLI', None)
+
+    def workers(**env):
+        output = subprocess.run([sys.executable, '-c', script], env=dict(base, **env),
+                                capture_output=True, text=True, timeout=60).stdout
+        return output.split('WORKERS ')[-1].strip()
+
+    assert workers(ASYNC_JOBS='1') == '2'
+    assert workers(ASYNC_JOBS='0') == '0'
+    # Every `flask` command, e.g. db-upgrade or run-jobs
+    assert workers(ASYNC_JOBS='1', FLASK_RUN_FROM_CLI='true') == '0'
@@ -0,0 +1,76 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.meal_plans import plan_bucket, scale_plan
+
+
+def test_similar_requests_share_a_bucket():
+    first = plan_bucket('Lose', 1840, 'Balanced', False, ['Peanuts', 'milk'], [])
+    second = plan_bucket('lose', '1790', 'balanced', False, 'milk, peanuts', None)
+
+    assert first == second
+    assert first['calories'] == 1800
+    assert first['allergies'] == ['milk', 'peanuts']
+
+
+def test_different_goals_do_not_share_a_bucket():
+    assert plan_bucket('lose', 1800, 'balanced', False, [], []) != plan_bucket('gain', 1800, 'balanced', False, [], [])
+
+
+def test_scale_plan_adjusts_macros_to_exact_target():
+    plan = {'monday': {'breakfast': [{'name': 'Paratha', 'calories': 300, 'protein': 10, 'carbs': 40, 'fat': 12}]}}
+
+    scaled = scale_plan(plan, 1840 / 1800)
+
+    meal = scaled['monday']['breakfast'][0]
+    assert meal['name'] == 'Paratha'
+    assert meal['calories'] == 307
+    assert meal['protein'] == 10.2
+    assert plan['monday']['breakfast'][0]['calories'] == 300
+
+
+def test_per_day_generation_only_falls_back_for_failed_days():
+    import json
+    import threading
+    import time
+    from diet_planner.ai_executor import AIExecutor
+    from diet_planner.meal_plans import DAYS, generate_plan_by_day
+
+    class Response:
+        def __init__(self, text):
+            self.text = text
+
+    class Model:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.in_flight = self.peak = 0
+
+        def generate_content(self, prompt, request_options=None):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.05)
+            with self.lock:
+                self.in_flight -= 1
+            if 'Tuesday' in prompt:
+                return Response('{"breakfast": [oops')
+            if 'Friday' in prompt:
+                raise RuntimeError('quota exceeded')
+            meal = {'name': 'Chana Chaat', 'calories': 200}
+            return Response('```json\n' + json.dumps({slot: [meal] for slot in ['breakfast', 'lunch', 'dinner', 'snack']}) + '\n```')
+
+    recommendations = {slot: [{'name': f'Fallback {slot}', 'calories': 100}] for slot in ['breakfast', 'lunch', 'dinner', 'snack']}
+    bucket = plan_bucket('maintain', 2000, 'balanced', False, [], [])
+
+    model = Model()
+    plan, fallback_days = generate_plan_by_day(model, AIExecutor(max_workers=7, max_queue=0), bucket, recommendations,
+                                               timeout=5, max_concurrent=3)
+
+    # The executor could run all seven days; one plan only ever holds three of its workers
+    assert model.peak == 3
+    assert list(plan) == DAYS
+    assert fallback_days == ['tuesday', 'friday']
+    assert plan['monday']['lunch'][0]['name'] == 'Chana Chaat'
+    assert plan['tuesday']['lunch'][0]['name'] == 'Fallback lunch'
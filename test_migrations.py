@@ -0,0 +1,77 @@
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.migrations import MIGRATIONS, run_migrations
+
+
+def test_migrations_add_indexes_to_an_existing_table_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # A table created before the model declared any indexes
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE nutrition_entry (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, food_name VARCHAR(100), '
+            'quantity FLOAT, unit VARCHAR(20), meal_type VARCHAR(20), calories INTEGER, protein FLOAT, '
+            'carbs FLOAT, fat FLOAT, date DATE NOT NULL, created_at DATETIME)'
+        ))
+
+    assert run_migrations(engine) == [m['version'] for m in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('nutrition_entry')}
+    assert {'ix_nutrition_entry_user_date', 'ix_nutrition_entry_user_date_macros'} <= index_names
+
+
+def test_serverless_cold_starts_leave_migrations_to_db_upgrade(monkeypatch):
+    from diet_planner import app as app_module
+
+    calls = []
+    monkeypatch.setattr(app_module, 'run_migrations', lambda engine: calls.append(engine) or [])
+    monkeypatch.delenv('AUTO_MIGRATE', raising=False)
+
+    monkeypatch.setitem(app_module.app.config, 'DB_RUNTIME_PROFILE', 'serverless')
+    app_module.init_db()
+    assert calls == []
+    monkeypatch.setenv('AUTO_MIGRATE', '1')
+    app_module.init_db()
+    assert len(calls) == 1
+
+    monkeypatch.delenv('AUTO_MIGRATE')
+    monkeypatch.setitem(app_module.app.config, 'DB_RUNTIME_PROFILE', 'server')
+    app_module.init_db()
+    assert len(calls) == 2
+
+
+def test_postgres_migrations_lift_and_restore_the_statement_timeout(monkeypatch):
+    from diet_planner import migrations
+
+    executed = []
+
+    class Connection:
+        def execution_options(self, **options):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, statement, params=None):
+            executed.append(str(statement))
+            return [(version,) for version in (1, 2)] if 'SELECT version' in str(statement) else None
+
+    class Engine:
+        class dialect:
+            name = 'postgresql'
+
+        def connect(self):
+            return Connection()
+
+    assert migrations.run_migrations(Engine()) == []
+    assert executed[0] == 'SET statement_timeout = 0'
+    # The pooled connection gets the profile's timeout back before it is reused
+    assert executed[-1] == 'RESET statement_timeout'
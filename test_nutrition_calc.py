@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+from diet_planner.nutrition_calc import MacroCalculator, normalize_unit
+
+FOODS = {
+    'roti': {'name': 'Roti', 'serving_g': 40, 'calories': 70, 'protein': 3, 'carbs': 15, 'fat': 0.5},
+    'rice': {'name': 'Rice', 'serving_g': 155, 'calories': 200, 'protein': 4, 'carbs': 45, 'fat': 0.5},
+    'mystery': {'name': 'Mystery Dish', 'calories': 100, 'protein': 1, 'carbs': 1, 'fat': 1},
+}
+PORTIONS = [('roti', 'roti', 40), ('rice', 'plate', 310)]
+
+
+def test_units_convert_through_serving_and_portion_weights():
+    calculator = MacroCalculator(FOODS, PORTIONS)
+    roti, grams, plate = calculator.calculate_items([
+        {'food_id': 'roti', 'quantity': 2, 'unit': 'rotis'},
+        {'food_id': 'rice', 'quantity': 77.5, 'unit': 'gram'},
+        {'food_id': 'rice', 'quantity': 1, 'unit': 'plate'},
+    ])
+    assert roti == {'food_id': 'roti', 'food_name': 'Roti', 'quantity': 2.0, 'unit': 'roti', 'grams': 80.0,
+                    'calories': 140, 'protein': 6.0, 'carbs': 30.0, 'fat': 1.0}
+    assert (grams['calories'], grams['carbs']) == (100, 22.5)
+    assert plate['grams'] == 310.0 and plate['calories'] == 400
+
+
+def test_invalid_items_get_errors_without_failing_the_batch():
+    calculator = MacroCalculator(FOODS, PORTIONS)
+    results = calculator.calculate_items([
+        {'food_id': 'pizza', 'quantity': 1, 'unit': 'g'},
+        {'food_id': 'rice', 'quantity': 1, 'unit': 'bucket'},
+        {'food_id': 'rice', 'quantity': 1, 'unit': 'roti'},
+        {'food_id': 'mystery', 'quantity': 1, 'unit': 'piece'},
+        {'food_id': 'roti', 'quantity': 0},
+        {'quantity': 1},
+        {'food_id': 'roti'},
+    ])
+    assert [result.get('error', '').split(' ')[0] for result in results[:6]] == \
+        ['Unknown', 'Unknown', "'roti'", 'Mystery', 'quantity', 'food_id']
+    assert results[6]['calories'] == 70 and results[6]['unit'] == 'serving'
+    assert normalize_unit(' Grams ') == 'g'
+
+
+def test_non_finite_and_huge_quantities_are_item_errors():
+    calculator = MacroCalculator(FOODS, PORTIONS)
+    results = calculator.calculate_items([
+        {'food_id': 'roti', 'quantity': '1e309'},
+        {'food_id': 'roti', 'quantity': 'inf'},
+        {'food_id': 'roti', 'quantity': 'nan'},
+        {'food_id': 'rice', 'quantity': 10001, 'unit': 'kg'},
+        {'food_id': 'rice', 'quantity': 10000, 'unit': 'g'},
+    ])
+    assert [result.get('error') for result in results] == [
+        'quantity must be a positive number', 'quantity must be a positive number',
+        'quantity must be a positive number', 'quantity must be at most 10000', None]
+
+
+def test_large_batches_are_vectorized():
+    foods = {f'food_{i}': {'name': f'Food {i}', 'serving_g': 100, 'calories': i % 500, 'protein': 1, 'carbs': 2, 'fat': 3}
+             for i in range(5000)}
+    calculator = MacroCalculator(foods)
+    count = 50000
+    food_ids = [f'food_{i % 5000}' for i in range(count)]
+    started = time.perf_counter()
+    grams, macros, errors = calculator.calculate(food_ids, np.full(count, 2.0), ['g'] * count)
+    assert time.perf_counter() - started < 1
+    assert errors == [None] * count
+    assert macros[7].tolist() == [0.14, 0.02, 0.04, 0.06]
+
+
+def test_entries_with_food_id_use_server_macros(user_client):
+    client, _ = user_client
+    response = client.post('/api/nutrition/entries', json={
+        'food_id': 'roti', 'quantity': 3, 'unit': 'piece', 'meal_type': 'lunch', 'calories': 1, 'date': '2026-04-01'
+    })
+    assert response.status_code == 201
+    entry = response.get_json()['entry']
+    assert (entry['food_name'], entry['calories'], entry['protein'], entry['unit']) == ('Roti', 210, 9.0, 'piece')
+
+    response = client.post('/api/nutrition/entries/bulk', json={'entries': [
+        {'food_id': 'rice', 'quantity': 1, 'unit': 'cup', 'meal_type': 'dinner', 'date': '2026-04-01'},
+        {'food_id': 'rice', 'quantity': 1, 'unit': 'bucket', 'meal_type': 'dinner', 'date': '2026-04-01'},
+        {'food_name': 'Chai', 'quantity': 1, 'unit': 'cup', 'meal_type': 'snack', 'calories': 90,
+         'protein': 3, 'carbs': 10, 'fat': 4, 'date': '2026-04-01'},
+    ]})
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert results[0]['entry']['calories'] == 204
+    assert results[1]['error'] == "Unknown unit 'bucket'"
+    assert results[2]['entry']['calories'] == 90
+
+    assert client.post('/api/nutrition/entries', json={'food_id': 'pizza', 'quantity': 1, 'unit': 'g',
+                                                       'meal_type': 'lunch'}).status_code == 400
+
+
+def test_calculate_endpoint_returns_items_and_totals():
+    from diet_planner.app import app
+
+    response = app.test_client().post('/api/nutrition/calculate', json={'items': [
+        {'food_id': 'roti', 'quantity': 2, 'unit': 'roti'},
+        {'food_id': 'daal', 'quantity': 1, 'unit': 'cup'},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['totals']['calories'] == 140 + 160
+    assert app.test_client().post('/api/nutrition/calculate', json={'food_id': 'nope'}).status_code == 207
+
+    # 1e309 parses as inf; it is reported for that item instead of failing the batch
+    overflow = app.test_client().post('/api/nutrition/calculate', content_type='application/json',
+                                      data='{"items": [{"food_id": "roti", "quantity": 1e309}, {"food_id": "roti"}]}')
+    assert overflow.status_code == 207
+    assert overflow.get_json()['results'][0] == {'error': 'quantity must be a positive number'}
+    assert overflow.get_json()['totals']['calories'] == 70
@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.app import DailyNutritionSummary, NutritionEntry, app
+
+
+def entry(food_name, meal_type='lunch', calories=200, date='2026-04-01'):
+    return {'food_name': food_name, 'quantity': 1, 'unit': 'plate', 'meal_type': meal_type,
+            'calories': calories, 'protein': 8, 'carbs': 30, 'fat': 6, 'date': date}
+
+
+def test_bulk_insert_returns_per_item_results(user_client):
+    client, user_id = user_client
+    items = [entry('Roti', 'breakfast', 70), {'food_name': 'Mystery'}, entry('Daal'), entry('Rice', date='04/01/2026')]
+    items += [entry(f'Chana {i}', 'snack', 100) for i in range(300)]
+
+    response = client.post('/api/nutrition/entries/bulk', json={'entries': items})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (302, 2)
+    assert body['results'][1] == {'index': 1, 'status': 'error', 'error': 'quantity is required'}
+    assert body['results'][3]['error'] == 'date must be in YYYY-MM-DD format'
+    created_ids = [r['entry']['id'] for r in body['results'] if r['status'] == 'created']
+    assert body['results'][2]['entry']['food_name'] == 'Daal'
+
+    with app.app_context():
+        stored = {e.id: e.food_name for e in NutritionEntry.query.filter_by(user_id=user_id)}
+        assert sorted(stored) == sorted(created_ids)
+        assert stored[body['results'][2]['entry']['id']] == 'Daal'
+        snack = DailyNutritionSummary.query.filter_by(user_id=user_id, meal_type='snack').one()
+        assert (snack.calories, snack.entry_count) == (30000, 300)
+
+
+def test_bulk_insert_rejects_empty_and_oversized_requests(user_client):
+    client, _ = user_client
+    assert client.post('/api/nutrition/entries/bulk', json={'entries': []}).status_code == 400
+    too_many = [entry('Roti')] * 501
+    assert client.post('/api/nutrition/entries/bulk', json=too_many).status_code == 400
+
+
+def test_range_query_pages_through_entries_in_date_order(user_client):
+    client, _ = user_client
+    items = [entry(f'Day {day} item {i}', 'lunch' if i % 2 else 'dinner', date=f'2026-05-{day:02d}')
+             for day in (3, 1, 2) for i in range(3)]
+    client.post('/api/nutrition/entries/bulk', json=items)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/nutrition/entries/range?start=2026-05-01&end=2026-05-02&limit=4'
+        page = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        seen += [e['food_name'] for e in page['entries']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [f'Day {day} item {i}' for day in (1, 2) for i in range(3)]
+
+    lunches = client.get('/api/nutrition/entries/range?start=2026-05-01&end=2026-05-31&meal_type=lunch').get_json()
+    assert lunches['count'] == 3
+    assert lunches['next_cursor'] is None
+
+
+def test_range_query_validates_parameters(user_client):
+    client, _ = user_client
+    assert client.get('/api/nutrition/entries/range?start=2026-05-01').status_code == 400
+    assert client.get('/api/nutrition/entries/range?start=2026-05-02&end=2026-05-01').status_code == 400
+    assert client.get('/api/nutrition/entries/range?start=2026-05-01&end=2026-05-02&cursor=bad').status_code == 400
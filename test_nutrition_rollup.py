@@ -0,0 +1,95 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.app import DailyNutritionSummary, app, db
+from diet_planner.migrations import rebuild_daily_nutrition_summary
+
+
+def rollup_rows(user_id):
+    with app.app_context():
+        rows = DailyNutritionSummary.query.filter_by(user_id=user_id).order_by(
+            DailyNutritionSummary.date, DailyNutritionSummary.meal_type).all()
+        return [(r.date.isoformat(), r.meal_type, r.calories, r.protein, r.entry_count) for r in rows]
+
+
+def entry(food_name, meal_type, calories, protein, date='2026-03-01'):
+    return {'food_name': food_name, 'quantity': 1, 'unit': 'plate', 'meal_type': meal_type,
+            'calories': calories, 'protein': protein, 'carbs': 10, 'fat': 5, 'date': date}
+
+
+def test_rollup_follows_add_update_and_delete(user_client):
+    client, user_id = user_client
+    roti = client.post('/api/nutrition/entries', json=entry('Roti', 'breakfast', 70, 3)).get_json()['entry']
+    client.post('/api/nutrition/entries', json=entry('Daal', 'breakfast', 120, 9))
+    biryani = client.post('/api/nutrition/entries', json=entry('Biryani', 'lunch', 250, 8)).get_json()['entry']
+    assert rollup_rows(user_id) == [
+        ('2026-03-01', 'breakfast', 190, 12.0, 2),
+        ('2026-03-01', 'lunch', 250, 8.0, 1),
+    ]
+
+    client.put(f"/api/nutrition/entries/{roti['id']}", json={'meal_type': 'dinner', 'date': '2026-03-02'})
+    client.delete(f"/api/nutrition/entries/{biryani['id']}")
+    assert rollup_rows(user_id) == [
+        ('2026-03-01', 'breakfast', 120, 9.0, 1),
+        ('2026-03-02', 'dinner', 70, 3.0, 1),
+    ]
+
+    summary = client.get('/api/nutrition/daily-summary?date=2026-03-01').get_json()
+    assert summary['summary']['total_calories'] == 120
+    assert summary['meals']['breakfast']['entries'][0]['food_name'] == 'Daal'
+
+    history = client.get('/api/nutrition/history').get_json()['history']
+    assert history == [
+        {'date': '2026-03-02', 'total_calories': 70, 'food_count': 1},
+        {'date': '2026-03-01', 'total_calories': 120, 'food_count': 1},
+    ]
+
+
+def test_rebuild_matches_incremental_rollup(user_client):
+    client, user_id = user_client
+    for meal_type, calories in [('lunch', 300), ('lunch', 200), ('snack', 100)]:
+        client.post('/api/nutrition/entries', json=entry('Chana', meal_type, calories, 5))
+    incremental = rollup_rows(user_id)
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            rebuild_daily_nutrition_summary(conn, user_id=user_id)
+    assert rollup_rows(user_id) == incremental
+
+
+def test_bulk_rollup_and_response_use_stored_values(user_client):
+    client, user_id = user_client
+    # Each 100.4 is stored as 100; summing first would have rolled up 301
+    items = [entry('Samosa', 'snack', 100.4, '2.5') for _ in range(3)] + [entry('Chai', 'snack', 'lots', 1)]
+    body = client.post('/api/nutrition/entries/bulk', json={'entries': items}).get_json()
+
+    assert [r['entry']['calories'] for r in body['results'][:3]] == [100, 100, 100]
+    assert body['results'][0]['entry']['protein'] == 2.5
+    assert body['results'][3]['status'] == 'error'
+    incremental = rollup_rows(user_id)
+    assert incremental == [('2026-03-01', 'snack', 300, 7.5, 3)]
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            rebuild_daily_nutrition_summary(conn, user_id=user_id)
+    assert rollup_rows(user_id) == incremental
+
+
+def test_update_stores_converted_values_and_rejects_bad_input(user_client):
+    client, user_id = user_client
+    daal = client.post('/api/nutrition/entries', json=entry('Daal', 'lunch', 120, 9)).get_json()['entry']
+
+    updated = client.put(f"/api/nutrition/entries/{daal['id']}", json={'calories': 100.4, 'protein': '7.5'})
+    assert updated.status_code == 200
+    assert (updated.get_json()['entry']['calories'], updated.get_json()['entry']['protein']) == (100, 7.5)
+    assert client.put(f"/api/nutrition/entries/{daal['id']}", json={'calories': 'abc'}).status_code == 400
+    assert client.put(f"/api/nutrition/entries/{daal['id']}", json={'date': '01/03/2026'}).status_code == 400
+
+    incremental = rollup_rows(user_id)
+    assert incremental == [('2026-03-01', 'lunch', 100, 7.5, 1)]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            rebuild_daily_nutrition_summary(conn, user_id=user_id)
+    assert rollup_rows(user_id) == incremental
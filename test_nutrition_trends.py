@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def log(client, date, calories):
+    client.post('/api/nutrition/entries', json={
+        'food_name': 'Daal Chawal', 'quantity': 1, 'unit': 'plate', 'meal_type': 'lunch',
+        'calories': calories, 'protein': 10, 'carbs': 50, 'fat': 5, 'date': date
+    })
+
+
+def test_daily_trends_include_rolling_averages_and_adherence(user_client):
+    client, _ = user_client
+    # 2026-06-01 is a Monday; nothing is logged on 06-03
+    for day, calories in [('2026-06-01', 2100), ('2026-06-02', 1400), ('2026-06-04', 2000), ('2026-06-08', 700)]:
+        log(client, day, calories)
+
+    body = client.get('/api/nutrition/trends?bucket=day&start=2026-06-01&end=2026-06-08').get_json()
+
+    days = {t['period_start']: t for t in body['trends']}
+    assert list(days) == ['2026-06-01', '2026-06-02', '2026-06-04', '2026-06-08']
+    assert days['2026-06-04']['rolling_7_avg_calories'] == round(5500 / 7, 1)
+    # The 06-01 entry has left the 7-day window on 06-08
+    assert days['2026-06-08']['rolling_7_avg_calories'] == round(4100 / 7, 1)
+    assert days['2026-06-08']['rolling_30_avg_calories'] == round(6200 / 30, 1)
+    assert days['2026-06-01']['adherence_pct'] == 105.0
+    assert days['2026-06-01']['days_on_target'] == 1
+    assert days['2026-06-02']['days_on_target'] == 0
+    assert days['2026-06-01']['total_protein'] == 10.0
+
+
+def test_weekly_and_monthly_buckets(user_client):
+    client, _ = user_client
+    for day, calories in [('2026-06-29', 1000), ('2026-07-01', 2000), ('2026-07-06', 1500)]:
+        log(client, day, calories)
+
+    weeks = client.get('/api/nutrition/trends?bucket=week&start=2026-06-29&end=2026-07-12').get_json()['trends']
+    assert [(w['period_start'], w['total_calories'], w['days_logged']) for w in weeks] == [
+        ('2026-06-29', 3000, 2), ('2026-07-06', 1500, 1)
+    ]
+    assert weeks[0]['avg_daily_calories'] == 1500.0
+
+    months = client.get('/api/nutrition/trends?bucket=month&start=2026-06-01&end=2026-07-31').get_json()['trends']
+    assert [(m['period_start'], m['total_calories']) for m in months] == [('2026-06-01', 1000), ('2026-07-01', 3500)]
+
+    assert client.get('/api/nutrition/trends?bucket=year').status_code == 400
@@ -0,0 +1,125 @@
+import gzip
+import os
+import time
+
+import pytest
+from flask import Flask, request, url_for
+
+from diet_planner.page_cache import PageCache
+
+
+def make_app(tmp_path, reload=False):
+    (tmp_path / 'home.html').write_text('<html>' + 'hello ' * 500 + '</html>')
+    pages = PageCache(str(tmp_path), reload=reload)
+    app = Flask(__name__)
+
+    @app.route('/<path:name>')
+    def page(name):
+        return pages.response(name, request) or ('missing', 404)
+
+    return app, pages
+
+
+def test_pages_are_served_compressed_with_strong_etags(tmp_path):
+    app, _ = make_app(tmp_path)
+    client = app.test_client()
+
+    plain = client.get('/home.html', headers={'Accept-Encoding': 'identity'})
+    assert plain.data.startswith(b'<html>hello')
+    assert 'Content-Encoding' not in plain.headers
+
+    zipped = client.get('/home.html', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.data) == plain.data
+    assert len(zipped.data) < len(plain.data) / 10
+    assert not zipped.headers['ETag'].startswith('W/')
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+    not_modified = client.get('/home.html', headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    # A gzip ETag does not validate the uncompressed representation
+    assert client.get('/home.html', headers={'If-None-Match': zipped.headers['ETag']}).status_code == 200
+
+
+def test_brotli_is_preferred_when_accepted(tmp_path):
+    brotli = pytest.importorskip('brotli')
+    app, _ = make_app(tmp_path)
+    client = app.test_client()
+    plain = client.get('/home.html', headers={'Accept-Encoding': 'identity'})
+
+    response = client.get('/home.html', headers={'Accept-Encoding': 'br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain.data
+    # Browsers send both; br wins over gzip at equal quality
+    assert client.get('/home.html', headers={'Accept-Encoding': 'gzip, deflate, br'}).headers['Content-Encoding'] == 'br'
+    assert client.get('/home.html', headers={'Accept-Encoding': 'gzip, br;q=0.5'}).headers['Content-Encoding'] == 'gzip'
+
+
+def test_unknown_pages_never_touch_the_disk(tmp_path):
+    app, pages = make_app(tmp_path)
+    (tmp_path / 'later.html').write_text('<html>later</html>')
+    client = app.test_client()
+    assert client.get('/later.html').status_code == 404
+    assert client.get('/../home.html').status_code == 404
+    assert pages.names() == ['home.html']
+
+
+def test_reload_mode_picks_up_changes(tmp_path):
+    app, _ = make_app(tmp_path, reload=True)
+    client = app.test_client()
+    first = client.get('/home.html', headers={'Accept-Encoding': 'identity'})
+
+    (tmp_path / 'home.html').write_text('<html>changed</html>')
+    later = time.time() + 5
+    os.utime(tmp_path / 'home.html', (later, later))
+    (tmp_path / 'new.html').write_text('<html>new</html>')
+
+    second = client.get('/home.html', headers={'Accept-Encoding': 'identity'})
+    assert second.data == b'<html>changed</html>'
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert client.get('/new.html').status_code == 200
+
+
+def test_app_pages_come_from_the_cache():
+    from diet_planner.app import app
+
+    client = app.test_client()
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'<html' in gzip.decompress(response.data).lower()
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag'], 'Accept-Encoding': 'gzip'}).status_code == 304
+    assert client.get('/login.html').status_code == 200
+    assert client.get('/nope.html').status_code == 404
+
+
+def test_manifest_routes_and_aliases():
+    from diet_planner.app import PAGES, app, page_routes
+
+    client = app.test_client()
+    assert '/register_new.html' not in page_routes
+    assert client.get('/register_new.html').status_code == 404
+    assert client.get('/profile-completion.html').status_code == 200
+    # The .html alias keeps the route's login rule
+    assert client.get('/dashboard').status_code == 302
+    assert client.get('/dashboard.html').status_code == 302
+    with app.test_request_context():
+        assert url_for('login_page') == '/login'
+        assert url_for('nutrition_tracking') == '/nutrition_tracking'
+    assert len({page.endpoint for page in PAGES if page.route}) == len([page for page in PAGES if page.route])
+
+
+def test_manifest_rejects_duplicate_paths():
+    from diet_planner.page_cache import Page, page_manifest
+
+    with pytest.raises(ValueError):
+        page_manifest([Page('/a', 'a', 'a.html'), Page('/a', 'b', 'b.html')])
+
+
+def test_logged_in_visitors_skip_the_landing_page(user_client):
+    client, _ = user_client
+    response = client.get('/')
+    assert response.status_code == 302 and response.headers['Location'].endswith('/dashboard')
+    assert client.get('/dashboard').status_code == 200
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from diet_planner.response_cache import ResponseCache
+
+
+def test_normalized_inputs_share_an_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.db'))
+    cache.set('recipes', {'query': 'Chicken  Karahi', 'meal_type': 'Dinner'}, [{'name': 'Karahi'}])
+
+    assert cache.get('recipes', {'meal_type': 'dinner', 'query': 'chicken karahi'}) == [{'name': 'Karahi'}]
+    assert cache.get('recipes', {'query': 'biryani'}) is None
+    assert cache.stats()['recipes'] == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_expired_and_least_recently_used_entries_are_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.db'), max_entries=2)
+    cache.set('recipes', {'query': 'old'}, 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('recipes', {'query': 'old'}) is None
+
+    cache.set('recipes', {'query': 'a'}, 'a')
+    cache.set('recipes', {'query': 'b'}, 'b')
+    cache.get('recipes', {'query': 'a'})
+    cache.set('recipes', {'query': 'c'}, 'c')
+    assert cache.get('recipes', {'query': 'b'}) is None
+    assert cache.get('recipes', {'query': 'a'}) == 'a'
+
+
+def test_entries_are_shared_between_instances_and_invalidated(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(path).set('pakistani_recipes', {'search': 'daal'}, ['Daal Chawal'])
+
+    # A second instance stands in for another gunicorn worker
+    other_worker = ResponseCache(path)
+    assert other_worker.get('pakistani_recipes', {'search': 'daal'}) == ['Daal Chawal']
+    assert other_worker.invalidate('pakistani_recipes') == 1
+    assert other_worker.get('pakistani_recipes', {'search': 'daal'}) is None
+
+
+def test_untracked_reads_do_not_write(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.db'), max_entries=2, track_reads=False)
+    cache.set('profiles', {'id': 'a'}, 'a')
+    cache.set('profiles', {'id': 'b'}, 'b')
+    conn = cache._connect()
+    changes = conn.total_changes
+    assert cache.get('profiles', {'id': 'a'}) == 'a'
+    assert cache.get('profiles', {'id': 'missing'}) is None
+    assert conn.total_changes == changes
+
+    # Without read tracking the oldest write goes first
+    cache.set('profiles', {'id': 'c'}, 'c')
+    assert cache.get('profiles', {'id': 'a'}) is None
+    assert cache.stats()['profiles']['entries'] == 2
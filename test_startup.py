@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Importing the app must not wait on Gemini, no matter how slow the API is
+IMPORT_BUDGET_SECONDS = 2.0
+STUB_DELAY_SECONDS = 5.0
+
+STARTUP_SCRIPT = textwrap.dedent("""
+    import sys, time
+    sys.path.insert(0, 'src')
+
+    import google.generativeai as genai
+
+    # Every network-touching genai call sleeps, like a slow cold start would
+    class SlowModel:
+        def __init__(self, name):
+            self.name = name
+        def generate_content(self, prompt, **kwargs):
+            time.sleep({delay})
+            return type('Response', (), {{'text': 'hello'}})()
+
+    def slow_list_models():
+        time.sleep({delay})
+        return []
+
+    genai.configure = lambda **kwargs: None
+    genai.list_models = slow_list_models
+    genai.GenerativeModel = SlowModel
+
+    started = time.perf_counter()
+    from diet_planner.app import app, gemini
+    elapsed = time.perf_counter() - started
+    print(f"{{elapsed:.3f}} {{gemini.status()['state']}}")
+""")
+
+
+def test_app_import_is_not_blocked_by_gemini():
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite://'
+    env['GEMINI_API_KEY'] = 'stub-key'
+    env['GEMINI_WARMUP'] = 'background'
+
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT.format(delay=STUB_DELAY_SECONDS)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+
+    elapsed, state = result.stdout.strip().splitlines()[-1].split()
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+    assert state == 'warming'
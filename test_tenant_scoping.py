@@ -0,0 +1,74 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from diet_planner.app import User, app, db
+from diet_planner.db_config import tenant_scoping_enabled
+
+
+@pytest.fixture
+def tenant_calls(monkeypatch):
+    """Force tenant scoping on SQLite and record every set_config call."""
+    monkeypatch.setitem(app.config, 'TENANT_SCOPING', '1')
+    calls = []
+
+    def register(dbapi_connection):
+        def set_config(name, value, is_local):
+            calls.append((id(dbapi_connection), name, value, is_local))
+            return value
+        dbapi_connection.create_function('set_config', 3, set_config)
+
+    with app.app_context():
+        engine = db.engine
+        # sqlite:// runs on a single shared connection, so register on it directly
+        with engine.connect() as conn:
+            register(conn.connection.dbapi_connection)
+        listener = lambda dbapi_connection, record: register(dbapi_connection)
+        event.listen(engine, 'connect', listener)
+    yield calls
+    event.remove(engine, 'connect', listener)
+
+
+def _logged_in_client(email):
+    with app.app_context():
+        user = User(email=email, daily_calories=2000)
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client, user_id
+
+
+def test_each_transaction_gets_its_own_tenant_on_a_reused_connection(tenant_calls):
+    first_client, first_id = _logged_in_client(f'{uuid.uuid4().hex[:12]}@example.com')
+    second_client, second_id = _logged_in_client(f'{uuid.uuid4().hex[:12]}@example.com')
+
+    tenant_calls.clear()
+    assert first_client.get('/api/current_user').status_code == 200
+    first_calls = list(tenant_calls)
+    tenant_calls.clear()
+    assert second_client.get('/api/current_user').status_code == 200
+    second_calls = list(tenant_calls)
+
+    assert first_calls and {value for _, _, value, _ in first_calls} == {str(first_id)}
+    assert second_calls and {value for _, _, value, _ in second_calls} == {str(second_id)}
+    # Transaction-local and bound, never baked into the connection
+    assert all(name == 'nile.tenant_id' and is_local == 1 for _, name, _, is_local in first_calls + second_calls)
+    assert {conn for conn, *_ in first_calls} == {conn for conn, *_ in second_calls}
+
+
+def test_anonymous_requests_do_not_set_a_tenant(tenant_calls):
+    tenant_calls.clear()
+    app.test_client().get('/api/current_user')
+    assert tenant_calls == []
+
+
+def test_tenant_scoping_defaults_to_postgres_only():
+    assert tenant_scoping_enabled('auto', 'postgresql')
+    assert not tenant_scoping_enabled('auto', 'sqlite')
+    assert tenant_scoping_enabled('1', 'sqlite')
+    assert not tenant_scoping_enabled('0', 'postgresql')
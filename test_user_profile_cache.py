@@ -0,0 +1,49 @@
+from sqlalchemy import event
+
+from diet_planner.app import app, db
+
+
+def count_user_selects(engine, statements):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM user' in statement.replace('"', ''):
+            statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return before_cursor_execute
+
+
+def test_repeated_profile_reads_skip_the_database(user_client):
+    client, user_id = user_client
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = count_user_selects(engine, statements)
+    try:
+        first = client.get('/api/current_user')
+        assert first.status_code == 200
+        assert len(statements) == 1
+
+        assert client.get('/api/subscription/status').status_code == 200
+        second = client.get('/api/current_user')
+        assert second.get_json()['user']['email'] == first.get_json()['user']['email']
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def test_profile_writes_invalidate_the_cache(user_client):
+    client, user_id = user_client
+    assert client.get('/api/current_user').get_json()['user']['current_weight'] is None
+
+    client.put('/api/current_user', json={'current_weight': 72})
+    assert client.get('/api/current_user').get_json()['user']['current_weight'] == 72
+
+    client.post('/api/register', json={'height': 170})
+    assert client.get('/api/current_user').get_json()['user']['height'] == 170
+
+    from diet_planner.app import profile_cache, response_cache
+    assert profile_cache.get('user_profiles', {'user_id': user_id}) is not None
+    # Profiles stay out of the Gemini response cache, so they never evict its entries
+    assert response_cache.get('user_profiles', {'user_id': user_id}) is None
+    response = client.post('/api/change-password', json={'current_password': 'secret', 'new_password': 'secret2'})
+    assert response.status_code == 200
+    assert profile_cache.get('user_profiles', {'user_id': user_id}) is None